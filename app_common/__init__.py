@@ -0,0 +1,5 @@
+"""Helpers shared by the Flask demo apps (bookstore, food_ordering, fullstack, fullstack_sqlite).
+
+The apps are run as scripts from their own folders, so each one puts the
+repository root on sys.path before importing from this package.
+"""
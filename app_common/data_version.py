@@ -0,0 +1,45 @@
+import sqlite3
+
+"""
+Per-table change counters in SQLite, maintained by triggers.
+
+    data_version.install(conn, ["books"])        # in init_db(); idempotent
+    stamp = data_version.read(db, "books")       # 7, or None before install()
+
+Every INSERT, UPDATE or DELETE on an installed table bumps its row in the
+data_version table inside the writing transaction, whoever writes it:
+the app, init_db.py, a JMeter JDBC sampler or the sqlite3 shell. A
+response cache keyed on the stamp therefore never serves data older than
+the stamp its request read, across processes, at the cost of one
+primary-key lookup per request.
+
+PRAGMA data_version is not a substitute here: its value is only
+meaningful within one connection (it changes when *other* connections
+commit), the apps open a connection per request, and it moves on any
+write to the file, e.g. a new user registering, not just the table a
+page shows.
+"""
+
+TABLE = "data_version"
+
+
+def install(conn, tables) -> None:
+    """Create the counter table and the triggers for tables (safe to run again)."""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    for table in tables:
+        conn.execute(f"INSERT OR IGNORE INTO {TABLE} (name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_{TABLE} AFTER {event} ON {table} "
+                f"BEGIN UPDATE {TABLE} SET version = version + 1 WHERE name = '{table}'; END"
+            )
+    conn.commit()
+
+
+def read(conn, table: str):
+    """The table's current counter, or None when install() has not run on this database."""
+    try:
+        row = conn.execute(f"SELECT version FROM {TABLE} WHERE name = ?", (table,)).fetchone()
+    except sqlite3.OperationalError:  # no such table
+        return None
+    return None if row is None else row[0]
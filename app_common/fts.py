@@ -0,0 +1,28 @@
+import re
+
+"""
+User search text -> SQLite FTS5 MATCH expressions.
+
+    match_query("Clean cod*")      -> '"clean" "cod"*'
+    search_terms("Clean cod*")     -> [("clean", False), ("cod", True)]
+
+Words are runs of letters and digits, lower-cased, which is how FTS5's
+default unicode61 tokenizer splits and folds text. Every word must match
+and a trailing * makes it a prefix. Each word is quoted, so nothing a
+user types is read as FTS5 syntax (AND, OR, NEAR, column filters, ^).
+"""
+
+_WORD = re.compile(r"([^\W_]+)(\*?)")
+
+
+def search_terms(query: str) -> list:
+    """(word, is_prefix) pairs of a search query, lower-cased; punctuation is dropped."""
+    return [(word.lower(), star == "*") for word, star in _WORD.findall(query)]
+
+
+def match_query(query: str):
+    """The FTS5 MATCH string for query, or None when it has no words."""
+    terms = search_terms(query)
+    if not terms:
+        return None
+    return " ".join('"{}"{}'.format(word, "*" if prefix else "") for word, prefix in terms)
@@ -0,0 +1,175 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+"""
+Single-writer group commit for SQLite.
+
+    writer = GroupCommitWriter(pool.connect, max_batch=64, max_wait=0.001,
+                               on_commit=task_cache.invalidate)
+    row = writer.execute("INSERT INTO tasks (text, completed) VALUES (?, ?) RETURNING *", [text, False])
+
+Request threads hand their statement to one background thread and block on
+a Future. The writer takes everything already queued (up to `max_batch`
+statements) and runs it in one BEGIN IMMEDIATE ... COMMIT. While the last
+batch held more than one statement, i.e. under concurrent load, it also
+waits up to `max_wait` seconds for stragglers; a lone caller is never
+delayed. N concurrent inserts cost one
+commit (and one fsync with synchronous=FULL) instead of N, and because
+only this thread writes, callers never race each other for the write lock
+or see "database is locked" from one another.
+
+Each statement runs inside its own SAVEPOINT, so a constraint violation
+fails only that caller's Future; the rest of the batch still commits. Use
+RETURNING to get the written rows back: execute() returns the fetched rows
+of the statement (fetchall()), or a single row with one_row=True.
+
+The writer connects lazily from `connect()` on first use; close() stops the
+thread and closes the connection, and the next execute() starts a new one
+(e.g. after the database file or schema changed). If connect() raises (a
+bad path, the file locked for longer than the busy timeout), every queued
+statement fails with that error and the thread exits, so the next submit()
+starts a new writer that connects again. Pass a timeout to execute() to
+bound the wait for anything else that keeps the writer from answering.
+"""
+
+_STOP = object()
+
+
+class _Op:
+    __slots__ = ("sql", "params", "future")
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.future = Future()
+
+
+class GroupCommitWriter:
+    def __init__(self, connect, max_batch: int = 64, max_wait: float = 0.001, on_commit=None):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.connect = connect
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.on_commit = on_commit
+        self.batches = 0
+        self.ops = 0
+        self._last_batch = 1
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, sql: str, params=()) -> Future:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+            op = _Op(sql, params)
+            self._queue.put(op)
+        return op.future
+
+    def execute(self, sql: str, params=(), one_row: bool = False, timeout: float = None):
+        """Run sql in the next group commit and wait for it; returns its rows."""
+        rows = self.submit(sql, params).result(timeout)
+        if one_row:
+            return rows[0] if rows else None
+        return rows
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "ops": self.ops,
+                "avg_batch": round(self.ops / self.batches, 2) if self.batches else 0.0}
+
+    def register_metrics(self, metrics) -> None:
+        """Expose the batch and statement counters on a Metrics /metrics page."""
+        metrics.register("group_commit_batches_total", "counter", "Transactions committed by the writer thread.",
+                         lambda: [({}, self.batches)])
+        metrics.register("group_commit_statements_total", "counter", "Statements applied by the writer thread.",
+                         lambda: [({}, self.ops)])
+
+    # writer thread
+
+    def _run(self) -> None:
+        try:
+            conn = self.connect()
+            conn.isolation_level = None  # explicit BEGIN/COMMIT below
+        except Exception as exc:
+            self._abandon(exc)
+            return
+        try:
+            stop = False
+            while not stop:
+                op = self._queue.get()
+                if op is _STOP:
+                    break
+                batch = [op]
+                wait = self.max_wait if self._last_batch > 1 else 0
+                deadline = time.monotonic() + wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        op = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if op is _STOP:
+                        stop = True
+                        break
+                    batch.append(op)
+                self._last_batch = len(batch)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _abandon(self, exc) -> None:
+        """Fail everything queued with exc and let the next submit() start a new writer thread."""
+        with self._lock:  # submit() queues under the lock: nothing slips in between the drain and the reset
+            if self._thread is threading.current_thread():
+                self._thread = None
+            elif self._thread is not None:  # close() and a new submit() came first: the queue is its writer's
+                return
+            while True:
+                try:
+                    op = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if op is not _STOP:
+                    op.future.set_exception(exc)
+
+    def _commit(self, conn, batch) -> None:
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append(conn.execute(op.sql, op.params).fetchall())
+                except sqlite3.Error as exc:
+                    conn.execute("ROLLBACK TO op")
+                    results.append(exc)
+                conn.execute("RELEASE op")
+            conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for op in batch:
+                op.future.set_exception(exc)
+            return
+        self.batches += 1
+        self.ops += len(batch)
+        if self.on_commit is not None:
+            self.on_commit()
+        for op, result in zip(batch, results):
+            if isinstance(result, Exception):
+                op.future.set_exception(result)
+            else:
+                op.future.set_result(result)
@@ -0,0 +1,273 @@
+import bisect
+import contextlib
+import contextvars
+import sqlite3
+import threading
+import time
+
+from flask import Response, request, template_rendered, before_render_template
+
+"""
+Request timing for the Flask demo apps, exposed in Prometheus text format.
+
+    metrics = Metrics(app, name="bookstore")            # adds GET /metrics
+    db = sqlite3.connect(DB_PATH, factory=TimedConnection)
+
+    with phase("password_hash"):
+        ok = check_password_hash(row["password_hash"], password)
+
+Per route (the URL rule, e.g. /api/tasks/<int:task_id>, not the raw path)
+this records a latency histogram, a request counter by status code and the
+seconds spent in each phase of the request:
+
+  db      SQL executed through a TimedConnection (execute, fetch*, commit)
+  render  Jinja templates rendered with render_template()
+  other   any `with phase(name):` block in the view
+
+plus a gauge of requests currently in flight. The bookkeeping is a couple of
+perf_counter() calls per SQL call or template and one short lock per
+request; nothing is recorded for /metrics itself.
+
+Counters live in the process, so with several worker processes each worker
+reports its own numbers.
+"""
+
+# upper bounds in seconds, as in the Prometheus client defaults plus a few sub-millisecond ones
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = "<unmatched>"
+
+# per-request phase totals; None outside a request
+_phases = contextvars.ContextVar("app_common_phases", default=None)
+
+
+def add_phase(name: str, seconds: float) -> None:
+    totals = _phases.get()
+    if totals is not None:
+        totals[name] = totals.get(name, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Attribute the time spent in the block to `name` for the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - start)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements count towards the "db" phase.
+
+    Use as sqlite3.connect(path, factory=TimedConnection). Rows read by
+    iterating a cursor directly are not timed; fetchall() and friends are.
+    """
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            add_phase("db", time.perf_counter() - start)
+
+
+class RouteStats:
+    __slots__ = ("buckets", "count", "total", "statuses", "phases")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.statuses = {}
+        self.phases = {}
+
+    def record(self, seconds: float, status: int, phases: dict) -> None:
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        for name, value in phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Per-route request metrics for one Flask app."""
+
+    def __init__(self, app=None, name: str = None, endpoint: str = "/metrics"):
+        self.name = name
+        self.endpoint = endpoint
+        self.routes = {}
+        self.in_flight = 0
+        self.collectors = []
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        self.name = self.name or app.name
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        before_render_template.connect(self._render_started, app, weak=False)
+        template_rendered.connect(self._render_finished, app, weak=False)
+        app.add_url_rule(self.endpoint, "metrics", self.view)
+        app.extensions["app_common.metrics"] = self
+
+    def register(self, name: str, kind: str, help_text: str, collect) -> None:
+        """Add an app-specific metric; collect() returns [(labels dict, value), ...] at scrape time."""
+        self.collectors.append((name, kind, help_text, collect))
+
+    # request hooks
+
+    def _before(self):
+        if request.path == self.endpoint:
+            return
+        state = {"start": time.perf_counter(), "status": 500, "phases": {}}
+        _phases.set(state["phases"])
+        request.environ["app_common.metrics"] = state
+        with self._lock:
+            self.in_flight += 1
+
+    def _after(self, response):
+        state = request.environ.get("app_common.metrics")
+        if state is not None:
+            state["status"] = response.status_code
+        return response
+
+    def _teardown(self, exception):
+        state = request.environ.pop("app_common.metrics", None)
+        if state is None:
+            return
+        elapsed = time.perf_counter() - state["start"]
+        # set, not reset(token): a streamed response tears down from inside its generator
+        _phases.set(None)
+        rule = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+        key = (request.method, rule)
+        with self._lock:
+            self.in_flight -= 1
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.record(elapsed, state["status"], state["phases"])
+
+    def _render_started(self, sender, template, context, **extra):
+        request.environ["app_common.render_start"] = time.perf_counter()
+
+    def _render_finished(self, sender, template, context, **extra):
+        start = request.environ.pop("app_common.render_start", None)
+        if start is not None:
+            add_phase("render", time.perf_counter() - start)
+
+    # exposition
+
+    def render(self) -> str:
+        app_label = f'app="{_escape(self.name)}"'
+        with self._lock:
+            routes = sorted(self.routes.items())
+            in_flight = self.in_flight
+            snapshot = [(key, list(s.buckets), s.count, s.total, dict(s.statuses), dict(s.phases)) for key, s in routes]
+
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight{{{app_label}}} {in_flight}",
+            "# HELP http_requests_total Requests handled, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, rule), _, _, _, statuses, _ in snapshot:
+            labels = f'{app_label},method="{method}",route="{_escape(rule)}"'
+            for status, n in sorted(statuses.items()):
+                lines.append(f'http_requests_total{{{labels},status="{status}"}} {n}')
+
+        lines += [
+            "# HELP http_request_duration_seconds Time from before_request to teardown, by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, rule), buckets, count, total, _, _ in snapshot:
+            labels = f'{app_label},method="{method}",route="{_escape(rule)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_phase_seconds_total Time spent in SQL (db), templates (render) and named phases, by route.",
+            "# TYPE http_request_phase_seconds_total counter",
+        ]
+        for (method, rule), _, _, _, _, phases in snapshot:
+            labels = f'{app_label},method="{method}",route="{_escape(rule)}"'
+            for name, seconds in sorted(phases.items()):
+                lines.append(f'http_request_phase_seconds_total{{{labels},phase="{_escape(name)}"}} {seconds:.6f}')
+
+        for metric, kind, help_text, collect in self.collectors:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for extra, value in collect():
+                labels = "".join(f',{k}="{_escape(str(v))}"' for k, v in extra.items())
+                lines.append(f"{metric}{{{app_label}{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def view(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,192 @@
+import collections
+import functools
+import os
+import threading
+import time
+
+"""
+A bounded, health-checked connection pool for MySQL.
+
+    pool = MySQLPool.from_env(DB_CONFIG)      # MYSQL_POOL_SIZE, MYSQL_POOL_TIMEOUT, ...
+    conn = pool.acquire()
+    try:
+        ...
+    finally:
+        pool.release(conn, failed=...)
+
+Opening a MySQL connection costs a TCP handshake, the server greeting,
+authentication (and TLS, if enabled) and a few session set-up queries:
+several round trips before the first real query. The pool keeps
+connections open between requests and hands out the most recently used
+one first (LIFO).
+
+Unlike SQLitePool it is bounded: at most `size` connections exist at once,
+because every connection is a thread and memory on the server, which has
+its own max_connections. When all of them are checked out, acquire() waits
+up to `timeout` seconds for one to be released and then raises
+PoolTimeout; connections are opened lazily, so an idle app holds none.
+
+Health checks:
+
+  on acquire  a connection that sat idle for more than `check_after`
+              seconds is pinged first (conn.is_connected()); a dead one,
+              e.g. dropped by the server's wait_timeout or a restart, is
+              closed and replaced instead of failing the request
+  on release  an unread streaming result means the connection is mid-
+              protocol, so it is closed rather than drained; an open
+              transaction, or any connection released with failed=True,
+              is rolled back, and if that fails the connection is dropped
+  max_age     connections older than this many seconds are closed when
+              released (None keeps them until they fail)
+
+`connect` is any zero-argument callable returning a mysql.connector (or
+compatible) connection; MySQLPool.from_config() builds one from
+connect() keyword arguments, with autocommit on (reads don't leave a
+transaction, and its snapshot, open on a pooled connection; writers call
+conn.start_transaction()) and CLIENT_FOUND_ROWS, so UPDATE reports rows
+matched, as SQLite does.
+"""
+
+ENV = {
+    "MYSQL_POOL_SIZE": ("size", int),
+    "MYSQL_POOL_TIMEOUT": ("timeout", float),
+    "MYSQL_POOL_CHECK_AFTER": ("check_after", float),
+    "MYSQL_POOL_MAX_AGE": ("max_age", float),
+}
+
+
+class PoolTimeout(RuntimeError):
+    """No connection was released within the pool's timeout."""
+
+
+def _connect_mysql(config: dict):
+    import mysql.connector
+    from mysql.connector.constants import ClientFlag
+    return mysql.connector.connect(**{"autocommit": True, "client_flags": [ClientFlag.FOUND_ROWS], **config})
+
+
+class MySQLPool:
+    def __init__(self, connect, size: int = 8, timeout: float = 5.0, check_after: float = 5.0, max_age: float = None):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_age = max_age
+        self._idle = collections.deque()  # (conn, released_at)
+        self._opened_at = {}
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+
+    @classmethod
+    def from_config(cls, config: dict, **kwargs) -> "MySQLPool":
+        """A pool of mysql.connector connections made with connect(**config)."""
+        return cls(functools.partial(_connect_mysql, config), **kwargs)
+
+    @classmethod
+    def from_env(cls, config: dict, environ=None, **kwargs) -> "MySQLPool":
+        """from_config() with size, timeout, check_after and max_age overridable by MYSQL_POOL_* variables."""
+        environ = os.environ if environ is None else environ
+        for name, (key, convert) in ENV.items():
+            value = environ.get(name)
+            if value is not None:
+                kwargs[key] = None if value == "" else convert(value)
+        return cls.from_config(config, **kwargs)
+
+    def acquire(self):
+        deadline = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("pool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1  # reserve the slot; connect outside the lock
+                    conn = None
+                    break
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                    self.waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"no MySQL connection free within {self.timeout}s (size={self.size})")
+                self._cond.wait(remaining)
+        if conn is not None:
+            if time.monotonic() - released_at <= self.check_after or self._alive(conn):
+                with self._cond:
+                    self.reused += 1
+                return conn
+            self._drop(conn, keep_slot=True)
+        return self._open_connection()
+
+    def release(self, conn, failed: bool = False) -> None:
+        """Return a connection; pass failed=True when the caller hit an error using it."""
+        opened_at = self._opened_at.get(id(conn), 0.0)
+        if getattr(conn, "unread_result", False):
+            self._drop(conn)
+            return
+        if failed or conn.in_transaction:
+            try:
+                conn.rollback()
+            except Exception:
+                self._drop(conn)
+                return
+        with self._cond:
+            if not self._closed and (self.max_age is None or time.monotonic() - opened_at < self.max_age):
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._drop(conn)
+
+    def close(self) -> None:
+        """Close the idle connections; connections still checked out are closed on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), collections.deque()
+        for conn, _ in idle:
+            self._drop(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"size": self.size, "open": self._open, "idle": len(self._idle), "opened": self.opened,
+                    "reused": self.reused, "discarded": self.discarded, "waits": self.waits}
+
+    def _open_connection(self):
+        try:
+            conn = self.connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.opened += 1
+            self._opened_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _alive(self, conn) -> bool:
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def _drop(self, conn, keep_slot: bool = False) -> None:
+        """Close conn and give its slot back (or keep it for a replacement)."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._opened_at.pop(id(conn), None)
+            self.discarded += 1
+            if not keep_slot:
+                self._open -= 1
+                self._cond.notify()
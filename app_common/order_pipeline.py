@@ -0,0 +1,299 @@
+import collections
+import queue
+import threading
+import time
+
+"""
+Order ingestion for food_ordering: /pay queues the order, one thread writes.
+
+    order_pipeline.install(conn)                       # init_db(): orders, order_items
+    orders = OrderPipeline(connect, max_pending=10000)
+    orders.submit(Order(username, key, total, coupon, [(item_id, name, price, quantity)]))
+    orders.status(db, username, key)                   # {"status": "queued" | "paid" | "failed", ...} or None
+
+submit() appends the order to an in-process queue and returns at once; a
+background thread takes everything queued (up to `max_batch` orders) and
+writes it in one BEGIN IMMEDIATE ... COMMIT with two executemany() calls,
+so a burst of N orders costs N/max_batch transactions instead of N. Like
+GroupCommitWriter, the writer only waits `max_wait` seconds for more
+orders while the previous batch held more than one; a lone order is never
+delayed.
+
+Idempotency: an order is identified by (username, key), where key is
+chosen by the client (/order hands one out with the payment form) and is
+sent again when a /pay is retried. A retry that finds the order still in
+the queue is dropped by submit(); one that arrives after the write is
+skipped by the UNIQUE (username, idempotency_key) constraint (ON CONFLICT
+DO NOTHING), so a key is written at most once, also with several app
+processes writing to the same file. Order ids are assigned by the writer
+(max(id) + 1 ..., under the write lock), which tells it afterwards which
+orders of the batch were new and need their order_items.
+
+Backpressure: at most `max_pending` orders wait in the queue. submit()
+waits up to `queue_timeout` seconds for room and then raises
+OrderQueueFull (the app answers 503 with Retry-After).
+
+Durability: an order is on disk once its status is "paid"; until then it
+lives in this process only. close() (registered with atexit by the app)
+writes what is queued before the process exits, but a crash loses the
+queue, which is why clients poll the status and retry with the same key.
+If the writer cannot connect, it retries `retries` times, then reports
+the batch as "failed" and connects again for the next one; the thread
+keeps running either way, so flush() and close() return. A batch that
+fails to commit (e.g. the database stayed locked by another
+process) is retried `retries` times, then written again one order per
+transaction, so that a single bad order does not take the rest of its
+batch down with it; the orders that still fail are reported as "failed"
+by status().
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+  id INTEGER PRIMARY KEY,
+  username TEXT NOT NULL,
+  idempotency_key TEXT NOT NULL,
+  total REAL NOT NULL,
+  coupon TEXT,
+  status TEXT NOT NULL DEFAULT 'paid',
+  created_at REAL NOT NULL,
+  UNIQUE (username, idempotency_key)
+);
+CREATE TABLE IF NOT EXISTS order_items (
+  order_id INTEGER NOT NULL REFERENCES orders (id),
+  item_id INTEGER NOT NULL,
+  name TEXT NOT NULL,
+  price REAL NOT NULL,
+  quantity INTEGER NOT NULL DEFAULT 1,
+  PRIMARY KEY (order_id, item_id)
+) WITHOUT ROWID;
+"""
+
+# items: [(item_id, name, unit price, quantity)]; created_at defaults to the time of submit()
+Order = collections.namedtuple("Order", "username key total coupon items created_at", defaults=[None])
+
+_STOP = object()
+# failed orders remembered for status(), oldest dropped first
+MAX_FAILED = 10000
+
+
+class OrderQueueFull(RuntimeError):
+    """No room in the order queue within queue_timeout."""
+
+
+def install(conn) -> None:
+    """Create orders and order_items; safe to run on every start."""
+    conn.executescript(SCHEMA)
+    conn.commit()
+
+
+class OrderPipeline:
+    def __init__(self, connect, max_pending: int = 10000, max_batch: int = 1000, max_wait: float = 0.005,
+                 queue_timeout: float = 0.5, retries: int = 3):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.connect = connect
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue_timeout = queue_timeout
+        self.retries = retries
+        self.batches = 0
+        self.ops = 0
+        self.written = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.failed = 0
+        self._last_batch = 1
+        self._queue = queue.Queue(max_pending)
+        self._pending = {}  # (username, key) -> Order, until written or failed
+        self._failed = collections.OrderedDict()  # (username, key) -> error message
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, order: Order) -> bool:
+        """Queue order; False if the same (username, key) is already queued."""
+        if order.created_at is None:
+            order = order._replace(created_at=time.time())
+        ident = (order.username, order.key)
+        with self._lock:
+            if ident in self._pending:
+                self.duplicates += 1
+                return False
+            self._pending[ident] = order
+            self._failed.pop(ident, None)  # a retry after a failure gets another chance
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put(order, timeout=self.queue_timeout)
+        except queue.Full:
+            with self._lock:
+                del self._pending[ident]
+                self.rejected += 1
+            raise OrderQueueFull(f"{self.max_pending} orders already queued")
+        return True
+
+    def flush(self, timeout: float = None) -> None:
+        """Wait until every order submitted so far has been written (or has failed)."""
+        with self._lock:
+            if self._thread is None:
+                return
+        done = threading.Event()
+        self._queue.put(done)  # not under _lock: the writer needs it to finish the batch ahead
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """Write what is queued and stop the thread; the next submit() starts a new one."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def status(self, conn, username: str, key: str):
+        """The order (username, key) as a dict with its status, or None if unknown."""
+        ident = (username, key)
+        with self._lock:
+            order = self._pending.get(ident)
+            error = self._failed.get(ident)
+        if order is not None:
+            return {"key": key, "status": "queued", "total": order.total, "coupon": order.coupon,
+                    "created_at": order.created_at,
+                    "items": [dict(zip(("item_id", "name", "price", "quantity"), item)) for item in order.items]}
+        row = conn.execute("SELECT id, total, coupon, status, created_at FROM orders"
+                           " WHERE username = ? AND idempotency_key = ?", [username, key]).fetchone()
+        if row is None:
+            return {"key": key, "status": "failed", "error": error} if error is not None else None
+        order_id, total, coupon, status, created_at = row
+        items = conn.execute("SELECT item_id, name, price, quantity FROM order_items WHERE order_id = ?"
+                             " ORDER BY item_id", [order_id]).fetchall()
+        return {"key": key, "status": status, "id": order_id, "total": total, "coupon": coupon,
+                "created_at": created_at,
+                "items": [dict(zip(("item_id", "name", "price", "quantity"), tuple(item))) for item in items]}
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "batches": self.batches, "written": self.written,
+                "duplicates": self.duplicates, "rejected": self.rejected, "failed": self.failed,
+                "avg_batch": round(self.ops / self.batches, 2) if self.batches else 0.0}
+
+    def register_metrics(self, metrics) -> None:
+        """Expose the queue depth and write counters on a Metrics /metrics page."""
+        metrics.register("order_queue_depth", "gauge", "Orders waiting for the writer thread.",
+                         lambda: [({}, self._queue.qsize())])
+        metrics.register("order_batches_total", "counter", "Transactions committed by the order writer.",
+                         lambda: [({}, self.batches)])
+        metrics.register("orders_total", "counter",
+                         "Orders by outcome: written, duplicate (idempotency key seen before), rejected (queue "
+                         "full, 503) and failed (not written after retries).",
+                         lambda: [({"outcome": "written"}, self.written), ({"outcome": "duplicate"}, self.duplicates),
+                                  ({"outcome": "rejected"}, self.rejected), ({"outcome": "failed"}, self.failed)])
+
+    # writer thread
+
+    def _run(self) -> None:
+        conn, _ = self._try_connect()  # up front, so the first batch doesn't wait for it; retried per batch
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                batch, flushed = [], None
+                wait = self.max_wait if self._last_batch > 1 else 0
+                deadline = time.monotonic() + wait
+                while True:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    if isinstance(item, threading.Event):  # flush(): write what we have now
+                        flushed = item
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.max_batch:
+                        break
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._last_batch = len(batch)
+                if batch and conn is None:
+                    conn, error = self._try_connect()
+                    if conn is None:
+                        self._record(batch, 0, error)
+                if conn is not None:
+                    self._commit(conn, batch)
+                if flushed is not None:
+                    flushed.set()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _try_connect(self):
+        """(connection, None), or (None, the last error) after `retries` failed retries."""
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self.connect()
+                conn.isolation_level = None  # explicit BEGIN/COMMIT in _write()
+                return conn, None
+            except Exception as exc:  # a bad path, a locked file, ...: the next batch connects again
+                error = exc
+                if attempt < self.retries:
+                    time.sleep(0.05 * 2 ** attempt)
+        return None, error
+
+    def _commit(self, conn, batch) -> None:
+        if not batch:
+            return
+        new, error = self._try_write(conn, batch, self.retries)
+        if error is None or len(batch) == 1:
+            self._record(batch, new, error)
+            return
+        # one bad order must not fail the whole batch: write them one at a time, without further retries
+        for order in batch:
+            self._record([order], *self._try_write(conn, [order], 0))
+
+    def _try_write(self, conn, batch, retries: int):
+        """_write() batch, retrying up to retries times; returns (orders new, None) or (0, the last error)."""
+        for attempt in range(retries + 1):
+            try:
+                return self._write(conn, batch), None
+            except Exception as exc:  # sqlite3.Error, or an order whose fields can't be bound
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                error = exc
+                if attempt < retries:
+                    time.sleep(0.05 * 2 ** attempt)
+        return 0, error
+
+    def _record(self, batch, new: int, error) -> None:
+        with self._lock:
+            for order in batch:
+                ident = (order.username, order.key)
+                self._pending.pop(ident, None)
+                if error is not None:
+                    self._failed[ident] = str(error)
+            if error is not None:
+                while len(self._failed) > MAX_FAILED:
+                    self._failed.popitem(last=False)
+                self.failed += len(batch)
+                return
+            self.batches += 1
+            self.ops += len(batch)
+            self.written += new
+            self.duplicates += len(batch) - new
+
+    def _write(self, conn, batch) -> int:
+        """Insert batch in one transaction; returns how many orders were new."""
+        conn.execute("BEGIN IMMEDIATE")
+        first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM orders").fetchone()[0]
+        ids = range(first, first + len(batch))
+        conn.executemany(
+            "INSERT INTO orders (id, username, idempotency_key, total, coupon, created_at) VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (username, idempotency_key) DO NOTHING",
+            [(order_id, o.username, o.key, o.total, o.coupon, o.created_at) for order_id, o in zip(ids, batch)])
+        # we hold the write lock, so every id from `first` on is one of ours
+        new = {row[0] for row in conn.execute("SELECT id FROM orders WHERE id >= ?", [first])}
+        conn.executemany(
+            "INSERT INTO order_items (order_id, item_id, name, price, quantity) VALUES (?, ?, ?, ?, ?)",
+            [(order_id, *item) for order_id, o in zip(ids, batch) if order_id in new for item in o.items])
+        conn.execute("COMMIT")
+        return len(new)
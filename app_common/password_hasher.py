@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+"""
+Password hashing off the request threads, in a pool of worker processes.
+
+    hasher = PasswordHasher.from_env()            # PASSWORD_HASH_* variables, see below
+    hasher.register_metrics(metrics)
+
+    password_hash = hasher.hash(password)         # raises HasherBusy when the queue is full
+    ok = hasher.verify(row["password_hash"], password)
+
+generate_password_hash() and check_password_hash() are deliberately slow
+key derivations (werkzeug's default is scrypt with n=32768, ~50-150 ms of
+CPU). Run on the request threads, a burst of logins puts one hash per
+thread on the CPU at once: every login slows down together and the pages
+that need no hashing queue behind them. Here at most `workers` hashes run
+at a time, each in its own process, so they use every core and leave the
+web process free.
+
+Backpressure: at most `max_pending` hashes are admitted (running or queued
+for a worker). A caller that finds no room waits up to `queue_timeout`
+seconds and then gets HasherBusy, which the apps answer with 503 and
+Retry-After, instead of letting the queue and the latency grow without
+bound.
+
+Environment (from_env):
+
+  PASSWORD_HASH_PROFILE        default: werkzeug's default method;
+                               loadtest: pbkdf2:sha256:1000, for load-test
+                               rigs where the KDF would dominate every run
+  PASSWORD_HASH_METHOD         any generate_password_hash() method string;
+                               overrides the profile
+  PASSWORD_HASH_WORKERS        worker processes (default: CPU count);
+                               0 hashes on the calling thread
+  PASSWORD_HASH_QUEUE          max_pending (default: 4 per worker)
+  PASSWORD_HASH_QUEUE_TIMEOUT  seconds to wait for room (default 2)
+
+The method only applies to new hashes: verify() always uses the
+parameters stored in the hash, so users registered under one profile
+cost the same to log in under another.
+
+Workers are started with the "spawn" method (as on Windows), not forked
+from the threaded server; they are started on first use, or up front with
+start().
+"""
+
+PROFILES = {
+    "default": None,  # werkzeug's default (scrypt)
+    "loadtest": "pbkdf2:sha256:1000",
+}
+
+
+class HasherBusy(RuntimeError):
+    """No room in the hashing queue within queue_timeout."""
+
+
+def _run(op: str, args: tuple):
+    """Executed in a worker: (result, CPU seconds spent)."""
+    start = time.perf_counter()
+    result = generate_password_hash(*args) if op == "hash" else check_password_hash(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    def __init__(self, method: str = None, workers: int = None, max_pending: int = None,
+                 queue_timeout: float = 2.0):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or 4 * max(1, self.workers)
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.counts = {"hash": 0, "verify": 0}
+        self.seconds = {"hash": 0.0, "verify": 0.0}
+
+    @classmethod
+    def from_env(cls, environ=None, **kwargs) -> "PasswordHasher":
+        environ = os.environ if environ is None else environ
+        profile = environ.get("PASSWORD_HASH_PROFILE", "default")
+        if profile not in PROFILES:
+            raise ValueError(f"PASSWORD_HASH_PROFILE must be one of {', '.join(PROFILES)}")
+        kwargs.setdefault("method", environ.get("PASSWORD_HASH_METHOD") or PROFILES[profile])
+        if environ.get("PASSWORD_HASH_WORKERS"):
+            kwargs.setdefault("workers", int(environ["PASSWORD_HASH_WORKERS"]))
+        if environ.get("PASSWORD_HASH_QUEUE"):
+            kwargs.setdefault("max_pending", int(environ["PASSWORD_HASH_QUEUE"]))
+        if environ.get("PASSWORD_HASH_QUEUE_TIMEOUT"):
+            kwargs.setdefault("queue_timeout", float(environ["PASSWORD_HASH_QUEUE_TIMEOUT"]))
+        return cls(**kwargs)
+
+    def hash(self, password: str) -> str:
+        args = (password,) if self.method is None else (password, self.method)
+        return self._call("hash", args)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return self._call("verify", (pwhash, password))
+
+    def start(self) -> None:
+        """Start the worker processes now rather than on the first hash."""
+        executor = self._pool()
+        if executor is not None:
+            for future in [executor.submit(_run, "verify", ("", "")) for _ in range(self.workers)]:
+                future.result()
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _pool(self):
+        if self.workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _call(self, op: str, args: tuple):
+        submitted = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        admitted = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                raise HasherBusy(f"{self.max_pending} password hashes already pending")
+            self.pending += 1
+        try:
+            executor = self._pool()
+            if executor is None:
+                result, seconds = _run(op, args)
+            else:
+                result, seconds = executor.submit(_run, op, args).result()
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.pending -= 1
+        with self._lock:
+            self.counts[op] += 1
+            self.seconds[op] += seconds
+            self.wait_seconds += max(0.0, time.perf_counter() - submitted - seconds)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "max_pending": self.max_pending, "pending": self.pending,
+                    "waiting": self.waiting, "rejected": self.rejected, "wait_seconds": self.wait_seconds,
+                    "counts": dict(self.counts), "seconds": dict(self.seconds)}
+
+    def register_metrics(self, metrics) -> None:
+        """Expose queue depth, rejections and hash time on a Metrics /metrics page."""
+        metrics.register("password_hash_queue_depth", "gauge",
+                         "Hashes admitted and not finished (pending, at most max_pending) and callers waiting "
+                         "for room (waiting).",
+                         lambda: [({"state": state}, self.stats()[state]) for state in ("pending", "waiting")])
+        metrics.register("password_hash_rejected_total", "counter",
+                         "Hashes refused with HasherBusy (503) because the queue stayed full.",
+                         lambda: [({}, self.stats()["rejected"])])
+        metrics.register("password_hash_seconds_total", "counter", "Worker time spent hashing, by operation.",
+                         lambda: [({"op": op}, f"{s:.6f}") for op, s in self.stats()["seconds"].items()])
+        metrics.register("password_hash_total", "counter", "Hashes computed, by operation.",
+                         lambda: [({"op": op}, n) for op, n in self.stats()["counts"].items()])
+        metrics.register("password_hash_wait_seconds_total", "counter",
+                         "Time hashes spent queued (waiting for room or a worker) and in transit.",
+                         lambda: [({}, f"{self.stats()['wait_seconds']:.6f}")])
@@ -0,0 +1,196 @@
+import collections
+import datetime
+import sqlite3
+import threading
+import time
+
+from app_common import data_version
+
+"""
+In-memory prices for food_ordering: the menu by id and the coupons, compiled.
+
+    pricing.install(conn)                           # init_db(): coupons table (seeded with FOOD10)
+    engine = PricingEngine(check_interval=1.0)
+    book = engine.book(get_db)                      # current PriceBook; get_db() only called to re-check
+    quote = book.quote([(item_id, quantity), ...], coupon="FOOD10")
+    quote.total, quote.lines[0].unit_price
+
+/order used to look its item up with a SELECT and apply a hard-coded
+FOOD10. A PriceBook holds the whole menu in a dict by id and every coupon
+pre-applied: per coupon, the discounted unit price of the item it is
+for, the factor of a percentage off everything, or the amount off the
+order. Pricing a cart is a dict lookup or a multiplication per line,
+with no SQL.
+
+Coupons (table coupons, one row per code):
+
+  kind percent, item_id NULL    amount % off every item
+  kind percent, item_id N       amount % off item N
+  kind fixed,   item_id N       amount off each unit of item N (down to 0)
+  kind fixed,   item_id NULL    amount off the order total (down to 0)
+  expires_at                    ISO 8601 (UTC unless it has an offset);
+                                from then on the code is ignored, as an
+                                unknown code is
+
+Freshness: the book is rebuilt when the data_version counters of menu or
+coupons move, i.e. after a write from any process (see data_version).
+Reading them is a query, so book() re-checks at most every
+`check_interval` seconds and calls connect() only then; in between a
+request prices without touching the database, and a price change is
+visible after at most check_interval seconds (0: checked on every call).
+invalidate() forces the check on the next call.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS coupons (
+  code TEXT PRIMARY KEY,
+  kind TEXT NOT NULL CHECK (kind IN ('percent', 'fixed')),
+  amount REAL NOT NULL CHECK (amount > 0),
+  item_id INTEGER REFERENCES menu (id),
+  expires_at TEXT
+);
+"""
+DEFAULT_COUPONS = [("FOOD10", "percent", 10, None, None)]
+
+MenuItem = collections.namedtuple("MenuItem", "id name price")
+# unit_prices: item id -> discounted unit price; factor: multiplies every other unit price (None: 1);
+# order_off: amount off the order; expires_at: epoch seconds or None
+Coupon = collections.namedtuple("Coupon", "code unit_prices factor order_off expires_at")
+# unit_price is after the coupon's per-item discount; total = unit_price * quantity
+Line = collections.namedtuple("Line", "item_id name unit_price quantity total")
+# subtotal at menu prices; coupon: the code applied, or None
+Quote = collections.namedtuple("Quote", "lines subtotal discount total coupon")
+
+
+def install(conn) -> None:
+    """Create coupons (seeded with DEFAULT_COUPONS) and the menu/coupons counters; safe to run on every start."""
+    new = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'coupons'").fetchone() is None
+    conn.executescript(SCHEMA)
+    if new:
+        conn.executemany("INSERT INTO coupons (code, kind, amount, item_id, expires_at) VALUES (?, ?, ?, ?, ?)",
+                         DEFAULT_COUPONS)
+    conn.commit()
+    data_version.install(conn, ["menu", "coupons"])
+
+
+def parse_expiry(value):
+    """expires_at as epoch seconds (None: never)."""
+    if value is None:
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return float("-inf")  # unreadable: treated as expired rather than as never expiring
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+def compile_coupon(code, kind, amount, item_id, expires_at, items) -> Coupon:
+    """A Coupon with its discounts worked out against items (id -> MenuItem)."""
+    target = items.get(item_id)
+    unit_prices, factor, order_off = {}, None, 0.0
+    if kind == "percent" and item_id is None:
+        factor = max(0.0, 1 - amount / 100)
+    elif kind == "percent":
+        if target is not None:
+            unit_prices[target.id] = round(target.price * max(0.0, 1 - amount / 100), 2)
+    elif item_id is not None:
+        if target is not None:
+            unit_prices[target.id] = max(0.0, round(target.price - amount, 2))
+    else:
+        order_off = amount
+    return Coupon(code, unit_prices, factor, order_off, parse_expiry(expires_at))
+
+
+class PriceBook:
+    def __init__(self, items, coupons, stamp=None):
+        self.items = items  # id -> MenuItem
+        self.coupons = coupons  # code -> Coupon
+        self.stamp = stamp
+
+    @classmethod
+    def load(cls, conn, stamp=None) -> "PriceBook":
+        items = {row[0]: MenuItem(*row) for row in conn.execute("SELECT id, name, price FROM menu")}
+        try:
+            rows = conn.execute("SELECT code, kind, amount, item_id, expires_at FROM coupons").fetchall()
+        except sqlite3.OperationalError:  # database from before coupons existed
+            rows = []
+        return cls(items, {row[0]: compile_coupon(*row, items) for row in rows}, stamp)
+
+    def coupon(self, code, now: float = None):
+        """The Coupon for code, or None if there is none or it has expired."""
+        coupon = self.coupons.get(code) if code else None
+        if coupon is not None and coupon.expires_at is not None:
+            if (time.time() if now is None else now) >= coupon.expires_at:
+                return None
+        return coupon
+
+    def quote(self, lines, coupon: str = None, now: float = None) -> Quote:
+        """Price a cart of (item_id, quantity); KeyError for an unknown item, ValueError for a quantity < 1."""
+        applied = self.coupon(coupon, now)
+        unit_prices = applied.unit_prices if applied is not None else {}
+        factor = applied.factor if applied is not None else None
+        priced, subtotal, total = [], 0, 0
+        for item_id, quantity in lines:
+            item = self.items[item_id]
+            if quantity < 1:
+                raise ValueError("quantity must be at least 1")
+            unit = unit_prices.get(item_id)
+            if unit is None:
+                unit = item.price if factor is None else round(item.price * factor, 2)
+            line_total = round(unit * quantity, 2)
+            priced.append(Line(item.id, item.name, unit, quantity, line_total))
+            subtotal += item.price * quantity
+            total += line_total
+        if applied is not None and applied.order_off:
+            total = max(0.0, total - applied.order_off)
+        subtotal, total = round(subtotal, 2), round(total, 2)
+        return Quote(priced, subtotal, round(subtotal - total, 2), total,
+                     applied.code if applied is not None and total != subtotal else None)
+
+
+class PricingEngine:
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.checks = 0
+        self._book = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def book(self, connect) -> PriceBook:
+        """The current PriceBook; connect() is called for a connection only when it is time to re-check."""
+        book = self._book
+        if book is not None and time.monotonic() < self._next_check:
+            return book
+        with self._lock:  # one thread re-checks, the others wait for its result
+            if self._book is not None and time.monotonic() < self._next_check:
+                return self._book
+            conn = connect()
+            stamp = tuple(data_version.read(conn, table) for table in ("menu", "coupons"))
+            self.checks += 1
+            if None in stamp:  # no counters on this database: nothing to compare, always reload
+                stamp = None
+            if self._book is None or stamp is None or stamp != self._book.stamp:
+                self._book = PriceBook.load(conn, stamp)
+                self.reloads += 1
+            self._next_check = time.monotonic() + self.check_interval
+            return self._book
+
+    def invalidate(self) -> None:
+        self._next_check = 0.0
+
+    def stats(self) -> dict:
+        book = self._book
+        return {"checks": self.checks, "reloads": self.reloads,
+                "items": len(book.items) if book else 0, "coupons": len(book.coupons) if book else 0}
+
+    def register_metrics(self, metrics) -> None:
+        """Expose reloads and the size of the current book on a Metrics /metrics page."""
+        metrics.register("pricing_checks_total", "counter", "Reads of the menu/coupons change counters.",
+                         lambda: [({}, self.checks)])
+        metrics.register("pricing_reloads_total", "counter", "Price books rebuilt from menu and coupons.",
+                         lambda: [({}, self.reloads)])
+        metrics.register("pricing_book_entries", "gauge", "Menu items and coupons in the current price book.",
+                         lambda: [({"kind": kind}, self.stats()[kind]) for kind in ("items", "coupons")])
@@ -0,0 +1,124 @@
+import collections
+import hashlib
+import threading
+
+"""
+Versioned cache of serialized responses, with strong ETags.
+
+    task_cache = SnapshotCache("tasks")
+
+    body, etag, extra = task_cache.get(key, build)    # build() -> (body bytes, extra)
+    ...
+    db.commit()
+    task_cache.invalidate()                           # after every write
+
+Every write bumps the version and drops all entries, so readers never see
+data older than the last invalidate(). A snapshot records the version that
+was current when its build started; if a write invalidates the cache while
+the query is running, the result is still returned to that caller but not
+stored, so a slow reader cannot put pre-write data back in the cache.
+
+The ETag is a hash of the body, so it is strong (byte-identical bodies share
+it) and stays valid across restarts. Entries are kept LRU, up to
+`max_entries` (one per distinct query: page, filter, projection).
+
+The cache is per process. That matches the dev server and the thread pools
+used here; with several worker processes each one would need to see the
+others' writes. Where writes can come from anywhere, read a stamp that
+the database maintains (app_common.data_version) on every request, put
+it in the key and call sync(stamp), which invalidates when it moves:
+
+    stamp = data_version.read(db, "books")
+    catalogue_cache.sync(stamp)
+    html, _, _ = catalogue_cache.get(("html", stamp, user), build)
+
+Bodies are normally bytes; any other value (e.g. the rows a page is
+rendered from) is cached as is, with etag None.
+"""
+
+
+class Snapshot:
+    __slots__ = ("version", "body", "etag", "extra")
+
+    def __init__(self, version, body, etag, extra):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.extra = extra
+
+
+class SnapshotCache:
+    def __init__(self, name: str, max_entries: int = 256):
+        self.name = name
+        self.max_entries = max_entries
+        self.version = 0
+        self.source_version = None
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+    def get(self, key, build):
+        """Return (body, etag, extra) for key, calling build() -> (body, extra) on a miss."""
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return snapshot.body, snapshot.etag, snapshot.extra
+            self.misses += 1
+            version = self.version
+        body, extra = build()
+        etag = self.etag_for(body) if isinstance(body, bytes) else None
+        snapshot = Snapshot(version, body, etag, extra)
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = snapshot
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return snapshot.body, snapshot.etag, snapshot.extra
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def sync(self, source_version) -> None:
+        """invalidate() if source_version differs from the one seen last (None: not tracked)."""
+        if source_version is None or source_version == self.source_version:
+            return
+        with self._lock:
+            if source_version != self.source_version:
+                self.source_version = source_version
+                self.version += 1
+                self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified,
+                    "entries": len(self._entries), "evictions": self.evictions, "version": self.version}
+
+    def register_metrics(self, metrics) -> None:
+        """Expose the counters on a Metrics /metrics page."""
+        def requests():
+            stats = self.stats()
+            return [({"cache": self.name, "result": result}, stats[key])
+                    for result, key in (("hit", "hits"), ("miss", "misses"), ("not_modified", "not_modified"))]
+
+        metrics.register("app_cache_requests_total", "counter",
+                         "Cached responses served (hit), built (miss) and answered with 304 (not_modified).", requests)
+        metrics.register("app_cache_entries", "gauge", "Snapshots currently cached.",
+                         lambda: [({"cache": self.name}, self.stats()["entries"])])
+        metrics.register("app_cache_evictions_total", "counter", "Snapshots dropped to stay within max_entries.",
+                         lambda: [({"cache": self.name}, self.stats()["evictions"])])
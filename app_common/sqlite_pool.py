@@ -0,0 +1,135 @@
+import collections
+import os
+import sqlite3
+import threading
+
+"""
+Reusable, pre-configured SQLite connections for the Flask demo apps.
+
+    pool = SQLitePool.from_env(DATABASE, factory=TimedConnection)
+
+    def get_db():
+        if "_database" not in g:
+            g._database = pool.acquire()
+        return g._database
+
+    @app.teardown_appcontext
+    def close_connection(exception):
+        db = g.pop("_database", None)
+        if db is not None:
+            pool.release(db)
+
+Opening a connection costs a file open, a schema parse on first use and an
+empty statement cache. The pool keeps up to `size` idle connections (LIFO,
+so the warmest one is handed out first) and shares them between threads:
+the Werkzeug dev server starts a new thread per request, so a per-thread
+pool would never get a hit. acquire() never blocks; when the pool is empty
+it opens a new connection, and release() closes connections beyond `size`.
+Each connection keeps its own cache of `cached_statements` prepared
+statements, so reusing connections also reuses the compiled SQL.
+
+Every new connection runs the configured pragmas once:
+
+  journal_mode  "wal" lets readers run alongside one writer instead of
+                taking the whole-database lock of the rollback journal
+  synchronous   "normal" is durable across application crashes in WAL
+                mode and skips an fsync per commit
+  cache_size    page cache; negative values are KiB (-8000 = ~8 MB)
+  mmap_size     bytes of the file to memory-map for reads (0 = off)
+  busy_timeout  milliseconds to wait for a lock before "database is locked"
+
+A value of None leaves SQLite's default alone. SQLitePool.from_env() reads
+overrides from SQLITE_POOL_SIZE, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+SQLITE_CACHE_SIZE, SQLITE_MMAP_SIZE and SQLITE_BUSY_TIMEOUT, so a run can
+be tuned without editing the app. size=0 with every pragma None behaves
+like the old connect-per-request code (used as the baseline in
+tools/bench_sqlite_pool.py).
+"""
+
+PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout")
+DEFAULTS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -8000,
+    "mmap_size": 64 << 20,
+    "busy_timeout": 5000,
+}
+
+
+class SQLitePool:
+    def __init__(self, path: str, size: int = 8, factory=sqlite3.Connection, row_factory=sqlite3.Row,
+                 cached_statements: int = 256, **pragmas):
+        unknown = set(pragmas) - set(PRAGMAS)
+        if unknown:
+            raise TypeError("unknown pragma(s): " + ", ".join(sorted(unknown)))
+        self.path = path
+        self.size = size
+        self.factory = factory
+        self.row_factory = row_factory
+        self.cached_statements = cached_statements
+        self.pragmas = {**DEFAULTS, **pragmas}
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    @classmethod
+    def from_env(cls, path: str, environ=None, **kwargs) -> "SQLitePool":
+        """Build a pool whose size and pragmas can be overridden by SQLITE_* variables."""
+        environ = os.environ if environ is None else environ
+        if "SQLITE_POOL_SIZE" in environ:
+            kwargs["size"] = int(environ["SQLITE_POOL_SIZE"])
+        for name in PRAGMAS:
+            value = environ.get("SQLITE_" + name.upper())
+            if value is not None:
+                kwargs[name] = None if value == "" else value
+        return cls(path, **kwargs)
+
+    def connect(self):
+        """Open and configure a new connection (not tracked by the pool)."""
+        conn = sqlite3.connect(self.path, factory=self.factory, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = self.row_factory
+        for name in PRAGMAS:
+            value = self.pragmas.get(name)
+            if value is not None:
+                conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.pop()
+        except IndexError:
+            return self.connect()
+        with self._lock:
+            self.reused += 1
+        return conn
+
+    def release(self, conn) -> None:
+        """Return a connection; an open transaction is rolled back first."""
+        if conn.in_transaction:
+            conn.rollback()
+        if len(self._idle) < self.size:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections; connections still checked out are closed on release."""
+        self.size = 0
+        while self._idle:
+            self._idle.pop().close()
+
+    def reset(self, path: str = None) -> None:
+        """Drop idle connections (e.g. after the schema was recreated) and optionally switch files."""
+        size, self.size = self.size, 0
+        while self._idle:
+            self._idle.pop().close()
+        self.size = size
+        if path is not None:
+            self.path = path
+
+    def stats(self) -> dict:
+        return {"size": self.size, "idle": len(self._idle), "opened": self.opened, "reused": self.reused}
@@ -0,0 +1,192 @@
+import json
+
+from app_common.task_repository import TASK_FIELDS
+
+"""
+The /api/tasks contract, without a web framework.
+
+    after_id, limit, completed, fields = parse_task_query(request.args.get)
+    body, etag, next_after_id = task_list(tasks, cache, after_id, limit, completed, fields)
+    chunks = stream_chunks(tasks.iter_batches(...), fields, 'ndjson')
+    created = tasks.add_many(batch_texts(request_json))
+
+Query strings, batch bodies, cached pages and streamed lists are read and
+written here once, for the Flask routes in app_common.task_routes (which
+fullstack/, fullstack_sqlite/ and fullstack_mysql/ register) and for
+fullstack_sqlite/asgi_app.py. Bad input raises ApiError; each app turns it
+into {"error": message} with the status.
+
+Bodies are encoded like Flask's jsonify (compact, sorted keys, trailing
+newline), so every app sends the same bytes, and the same ETags, for the
+same tasks.
+"""
+
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 1000
+SEARCH_LIMIT = 20
+STREAM_BATCH_SIZE = 500
+_json_encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+_row_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def dumps(obj) -> bytes:
+    return (_json_encoder.encode(obj) + '\n').encode()
+
+
+def parse_task_query(arg):
+    """after_id, limit, completed and fields from a query string; arg(name) returns the value or None."""
+    def int_arg(name, default, minimum, maximum=None):
+        value = arg(name) or ''
+        if value == '':
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise ApiError(400, f'{name} must be an integer')
+        if number < minimum or (maximum is not None and number > maximum):
+            raise ApiError(400, f'{name} out of range')
+        return number
+
+    after_id = int_arg('after_id', 0, 0)
+    limit = int_arg('limit', None, 1, MAX_PAGE_SIZE)
+    completed = (arg('completed') or '').lower()
+    if completed in ('', 'all'):
+        completed = None
+    elif completed in ('1', 'true'):
+        completed = 1
+    elif completed in ('0', 'false'):
+        completed = 0
+    else:
+        raise ApiError(400, 'completed must be true or false')
+    fields = [f for f in (arg('fields') or '').split(',') if f] or list(TASK_FIELDS)
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        raise ApiError(400, 'unknown field(s): ' + ', '.join(unknown))
+    return after_id, limit, completed, fields
+
+
+def parse_search_query(arg):
+    """q, limit, completed and fields for GET /api/tasks/search."""
+    q = (arg('q') or '').strip()
+    if not q:
+        raise ApiError(400, 'q is required')
+    _, limit, completed, fields = parse_task_query(arg)
+    return q, limit or SEARCH_LIMIT, completed, fields
+
+
+def stream_format(stream, prefers_ndjson):
+    """'ndjson', 'json' or None, from ?stream= or (prefers_ndjson) the Accept header."""
+    stream = (stream or '').lower()
+    if stream in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    return 'ndjson' if prefers_ndjson else None
+
+
+def without_id(rows, fields):
+    """Drop the id the repository always returns when ?fields= left it out."""
+    if 'id' not in fields:
+        for row in rows:
+            del row['id']
+    return rows
+
+
+def cached(cache, tasks, key, build):
+    """cache.get() after syncing with the tasks counter, which writes from other processes move too."""
+    cache.sync(tasks.version())
+    return cache.get(key, build)
+
+
+def task_list(tasks, cache, after_id, limit, completed, fields):
+    """(body, etag, next_after_id) of a GET /api/tasks page, served from cache until the next write."""
+    def build():
+        rows = tasks.page(after_id, None if limit is None else limit + 1, completed, fields)
+        more = limit is not None and len(rows) > limit
+        if more:
+            rows = rows[:limit]
+        next_after_id = str(rows[-1]['id']) if more else None
+        return dumps(without_id(rows, fields)), next_after_id
+
+    return cached(cache, tasks, (after_id, limit, completed, tuple(fields)), build)
+
+
+def task_search(tasks, cache, q, limit, completed, fields):
+    """(body, etag, None) of a GET /api/tasks/search, cached and invalidated with the task lists."""
+    def build():
+        return dumps(without_id(tasks.search(q, limit, completed, fields), fields)), None
+
+    return cached(cache, tasks, ('search', q, limit, completed, tuple(fields)), build)
+
+
+def stream_chunks(batches, fields, fmt):
+    """Encode iter_batches() output as a JSON array or NDJSON, one chunk per batch.
+
+    The first chunk is only produced once the first batch has been read,
+    so a caller can pull it before starting the response and still report
+    a database error properly. Closing the generator closes `batches`,
+    which hands its connection back.
+    """
+    try:
+        sep = '[' if fmt == 'json' else ''
+        for rows in batches:
+            if not rows:
+                continue
+            rows = without_id(rows, fields)
+            if fmt == 'ndjson':
+                yield '\n'.join([_row_encoder.encode(row) for row in rows]) + '\n'
+            else:
+                yield sep + _row_encoder.encode(rows)[1:-1]
+                sep = ','
+        if fmt == 'json':
+            yield '[]\n' if sep == '[' else ']\n'
+    finally:
+        batches.close()
+
+
+def batch_items(body):
+    """The JSON array body of a batch request."""
+    if not isinstance(body, list) or not body:
+        raise ApiError(400, 'expected a non-empty JSON array')
+    if len(body) > MAX_BATCH_SIZE:
+        raise ApiError(400, f'at most {MAX_BATCH_SIZE} items per batch')
+    return body
+
+
+def batch_texts(body):
+    """[{"text": ...}, ...] for POST /api/tasks/batch -> the texts."""
+    texts = []
+    for item in batch_items(body):
+        if not isinstance(item, dict) or not isinstance(item.get('text'), str):
+            raise ApiError(400, 'each task needs a text')
+        texts.append(item['text'])
+    return texts
+
+
+def batch_updates(body):
+    """[{"id": ..., "completed": ...}, ...] for PUT /api/tasks/batch -> (id, completed) pairs."""
+    updates = []
+    for item in batch_items(body):
+        if (not isinstance(item, dict) or type(item.get('id')) is not int
+                or item.get('completed') not in (True, False)):
+            raise ApiError(400, 'each update needs an integer id and a boolean completed')
+        updates.append((item['id'], bool(item['completed'])))
+    return updates
+
+
+def batch_ids(body):
+    """[id, ...] or [{"id": ...}, ...] for DELETE /api/tasks/batch -> the ids."""
+    task_ids = []
+    for item in batch_items(body):
+        task_id = item.get('id') if isinstance(item, dict) else item
+        if type(task_id) is not int:
+            raise ApiError(400, 'expected task ids')
+        task_ids.append(task_id)
+    return task_ids
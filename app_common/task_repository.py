@@ -0,0 +1,516 @@
+import bisect
+import contextlib
+import threading
+from concurrent.futures import Future
+
+from app_common import data_version
+from app_common.fts import match_query, search_terms
+from app_common.metrics import phase
+
+"""
+Storage for the todo apps' tasks table behind one interface.
+
+    tasks = SQLiteTaskRepository(pool, writer=writer, on_change=task_cache.invalidate)
+    tasks = MySQLTaskRepository(MySQLPool.from_env(DB_CONFIG), on_change=task_cache.invalidate)
+    tasks = MemoryTaskRepository(on_change=task_cache.invalidate)
+
+    tasks.page(after_id=0, limit=100, completed=False, fields=("id", "text"))
+    tasks.add("write tests")                  -> {"id": 1, "text": "write tests", "completed": 0}
+    tasks.set_completed_many([(1, True)])     -> 1 (rows matched)
+    tasks.search("write test*", limit=20)     -> best matches first
+
+The routes in fullstack/, fullstack_sqlite/ and fullstack_mysql/ and the E2E
+helpers only talk to a repository, so the SQL (and its placeholder style)
+lives here once per backend, and the API can be benchmarked or tested with
+MemoryTaskRepository and no database at all.
+
+Tasks are plain dicts {"id", "text", "completed"} with completed as 0/1,
+which is what both SQL backends return. page() and iter_batches() return
+only the requested fields plus "id" (needed for the next after_id), in id
+order. Every method that writes calls on_change() once its change is
+committed, which is where the apps invalidate their response cache.
+That only sees this process's writes: SQLiteTaskRepository also keeps a
+data_version counter on tasks (moved by triggers, whoever writes), and
+version() reads it so a cache can sync() on it before serving.
+
+search() takes words, not SQL: every word must occur in the task's text
+(case-insensitively, split as in app_common.fts), and a word ending in *
+matches any word it is a prefix of. SQLite answers it from the tasks_fts
+index that fullstack_sqlite/schema.sql keeps in sync with triggers,
+ranked by bm25; MySQLTaskRepository does not implement it.
+
+  SQLiteTaskRepository  pooled connections from app_common.sqlite_pool; with
+                        a GroupCommitWriter, single inserts are committed in
+                        groups (INSERT ... RETURNING), everything else runs
+                        on a pooled connection in one transaction per call
+  MySQLTaskRepository   connections from app_common.mysql_pool, %s
+                        placeholders, streamed reads, one transaction per call
+  MemoryTaskRepository  a dict of id -> task plus an ascending list of ids
+                        for keyset pages; readers take no lock (see below)
+"""
+
+TASK_FIELDS = ("id", "text", "completed")
+# seconds add() waits for the group-commit writer before giving up with TimeoutError
+WRITE_TIMEOUT = 30.0
+
+
+def _columns(fields) -> list:
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        raise ValueError("unknown field(s): " + ", ".join(unknown))
+    return [c for c in TASK_FIELDS if c == "id" or c in fields]
+
+
+class TaskRepository:
+    """Interface shared by the backends; see the module docstring."""
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+    def exists(self) -> bool:
+        """True once the tasks table has been created."""
+        raise NotImplementedError
+
+    def create_schema(self, script: str) -> None:
+        """Drop and recreate the tasks table (script is the app's schema.sql)."""
+        raise NotImplementedError
+
+    def page(self, after_id: int = 0, limit: int = None, completed=None, fields=TASK_FIELDS) -> list:
+        """Tasks with id > after_id (and the given status), at most limit of them."""
+        raise NotImplementedError
+
+    def iter_batches(self, after_id: int = 0, limit: int = None, completed=None, fields=TASK_FIELDS,
+                     batch_size: int = 500):
+        """Like page(), but yields lists of at most batch_size tasks as they are read."""
+        raise NotImplementedError
+
+    def get(self, task_id: int):
+        raise NotImplementedError
+
+    def find_by_text(self, text: str):
+        """The first task with exactly this text, or None."""
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int = 20, completed=None, fields=TASK_FIELDS) -> list:
+        """Tasks containing every word of query (word* for prefixes), best match first."""
+        raise NotImplementedError
+
+    def add(self, text: str) -> dict:
+        raise NotImplementedError
+
+    def submit_add(self, text: str):
+        """Start add(text) without blocking; a Future of the task, or None if the backend can't."""
+        return None
+
+    def add_many(self, texts) -> list:
+        """Insert all texts in one transaction; returns the created tasks in order."""
+        raise NotImplementedError
+
+    def set_completed(self, task_id: int, completed) -> int:
+        return self.set_completed_many([(task_id, completed)])
+
+    def set_completed_many(self, updates) -> int:
+        """Apply (id, completed) pairs in one transaction; returns the number of tasks matched."""
+        raise NotImplementedError
+
+    def delete(self, task_id: int) -> int:
+        return self.delete_many([task_id])
+
+    def delete_many(self, task_ids) -> int:
+        """Delete in one transaction; returns the number of tasks deleted."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Delete every task."""
+        raise NotImplementedError
+
+    def version(self):
+        """Change counter of the tasks table, moved by writes from any process; None if not kept."""
+        return None
+
+    def track_changes(self) -> None:
+        """Start keeping the version() counter on an existing table (no-op where it isn't kept)."""
+
+    def close(self) -> None:
+        pass
+
+
+class _SQLRepository(TaskRepository):
+    """SQL shared by the SQLite and MySQL backends; subclasses set the placeholder."""
+
+    placeholder = "?"
+
+    def __init__(self, pool, on_change=None):
+        super().__init__(on_change)
+        self.pool = pool
+
+    @contextlib.contextmanager
+    def _connection(self, write=False):
+        """A pooled connection; with write=True the block runs in one transaction."""
+        conn = self.pool.acquire()
+        try:
+            if write:
+                self._begin(conn)
+            yield conn
+            if write:
+                conn.commit()
+        except BaseException:
+            self._release(conn, failed=True)
+            raise
+        self._release(conn)
+
+    def _begin(self, conn) -> None:
+        pass
+
+    def _release(self, conn, failed=False) -> None:
+        self.pool.release(conn)
+
+    def _cursor(self, conn):
+        return conn.cursor()
+
+    def _select(self, after_id, limit, completed, fields):
+        p = self.placeholder
+        sql = f"SELECT {', '.join(_columns(fields))} FROM tasks WHERE id > {p}"
+        params = [after_id]
+        if completed is not None:
+            sql += f" AND completed = {p}"
+            params.append(int(bool(completed)))
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += f" LIMIT {p}"
+            params.append(limit)
+        return sql, params
+
+    def _fetch(self, sql, params, one=False):
+        with self._connection() as conn:
+            cursor = self._cursor(conn)
+            cursor.execute(sql, params)
+            if one:
+                row = cursor.fetchone()
+                cursor.fetchall()  # MySQL: the rest of the result must be read before the next query
+                return None if row is None else dict(row)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def _write(self, sql, rows) -> int:
+        with self._connection(write=True) as conn:
+            cursor = self._cursor(conn)
+            cursor.executemany(sql, rows)
+            count = cursor.rowcount
+        self._changed()
+        return count
+
+    def page(self, after_id=0, limit=None, completed=None, fields=TASK_FIELDS):
+        return self._fetch(*self._select(after_id, limit, completed, fields))
+
+    def iter_batches(self, after_id=0, limit=None, completed=None, fields=TASK_FIELDS, batch_size=500):
+        sql, params = self._select(after_id, limit, completed, fields)
+        with self._connection() as conn:
+            cursor = self._cursor(conn)
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+
+    def get(self, task_id):
+        return self._fetch(f"SELECT * FROM tasks WHERE id = {self.placeholder}", [task_id], one=True)
+
+    def find_by_text(self, text):
+        return self._fetch(f"SELECT * FROM tasks WHERE text = {self.placeholder} ORDER BY id LIMIT 1",
+                           [text], one=True)
+
+    def set_completed_many(self, updates):
+        return self._write(f"UPDATE tasks SET completed = {self.placeholder} WHERE id = {self.placeholder}",
+                           [(completed, task_id) for task_id, completed in updates])
+
+    def delete_many(self, task_ids):
+        return self._write(f"DELETE FROM tasks WHERE id = {self.placeholder}", [(i,) for i in task_ids])
+
+    def clear(self):
+        with self._connection(write=True) as conn:
+            self._cursor(conn).execute("DELETE FROM tasks")
+        self._changed()
+
+
+class SQLiteTaskRepository(_SQLRepository):
+    def __init__(self, pool, writer=None, on_change=None, write_timeout: float = WRITE_TIMEOUT):
+        super().__init__(pool, on_change)
+        self.writer = writer
+        self.write_timeout = write_timeout
+
+    def exists(self):
+        row = self._fetch("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'", [], one=True)
+        return row is not None
+
+    def create_schema(self, script):
+        with self._connection() as conn:
+            conn.executescript(script)
+            conn.commit()
+            data_version.install(conn, ["tasks"])
+            # the table was recreated without firing a trigger: move the counter for other processes' caches
+            conn.execute(f"UPDATE {data_version.TABLE} SET version = version + 1 WHERE name = 'tasks'")
+            conn.commit()
+        if self.writer is not None:
+            self.writer.close()  # reconnects on the next insert, to the (possibly new) file
+        self._changed()
+
+    def version(self):
+        with self._connection() as conn:
+            return data_version.read(conn, "tasks")
+
+    def track_changes(self):
+        with self._connection() as conn:
+            data_version.install(conn, ["tasks"])
+
+    def add(self, text):
+        if self.writer is not None:
+            with phase("db"):
+                created = self.writer.execute("INSERT INTO tasks (text, completed) VALUES (?, ?) RETURNING *",
+                                              [text, False], one_row=True, timeout=self.write_timeout)
+            self._changed()
+            return dict(created)
+        return self.add_many([text])[0]
+
+    def submit_add(self, text):
+        if self.writer is None:
+            return None
+        future = Future()
+
+        def done(inserted):
+            try:
+                rows = inserted.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            self._changed()
+            future.set_result(dict(rows[0]))
+
+        self.writer.submit("INSERT INTO tasks (text, completed) VALUES (?, ?) RETURNING *",
+                           [text, False]).add_done_callback(done)
+        return future
+
+    def add_many(self, texts):
+        rows = [(text, False) for text in texts]
+        with self._connection(write=True) as conn:
+            conn.executemany("INSERT INTO tasks (text, completed) VALUES (?, ?)", rows)
+            # the inserts ran back to back under one write lock, so their ids are consecutive
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            created = [dict(row) for row in conn.execute("SELECT * FROM tasks WHERE id > ? ORDER BY id",
+                                                         [last_id - len(rows)]).fetchall()]
+        self._changed()
+        return created
+
+    def search(self, query, limit=20, completed=None, fields=TASK_FIELDS):
+        match = match_query(query)
+        if match is None:
+            return []
+        sql = (f"SELECT {', '.join('t.' + c for c in _columns(fields))} FROM tasks_fts"
+               " JOIN tasks AS t ON t.id = tasks_fts.rowid WHERE tasks_fts MATCH ?")
+        params = [match]
+        if completed is not None:
+            sql += " AND t.completed = ?"
+            params.append(int(bool(completed)))
+        sql += " ORDER BY tasks_fts.rank, t.id LIMIT ?"
+        params.append(limit)
+        return self._fetch(sql, params)
+
+
+class MySQLTaskRepository(_SQLRepository):
+    """mysql.connector backend on an app_common.mysql_pool.MySQLPool (autocommit connections).
+
+    Reads use the driver's default unbuffered cursors, so iter_batches()
+    pulls rows off the socket batch by batch instead of loading the whole
+    result; an abandoned stream makes the pool drop that connection. Batch
+    updates and deletes are sent as one `WHERE id IN (...)` statement per
+    IN_CHUNK ids rather than a round trip per row, and add_many() is a
+    single multi-row INSERT (mysql.connector's executemany rewrite).
+    """
+
+    placeholder = "%s"
+    IN_CHUNK = 1000
+
+    def _begin(self, conn):
+        conn.start_transaction()
+
+    def _release(self, conn, failed=False):
+        self.pool.release(conn, failed=failed)
+
+    def _cursor(self, conn):
+        return conn.cursor(dictionary=True)
+
+    def exists(self):
+        return self._fetch("SHOW TABLES LIKE 'tasks'", [], one=True) is not None
+
+    def create_schema(self, script):
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            lines = [line for line in script.splitlines() if not line.lstrip().startswith("--")]
+            for statement in "\n".join(lines).split(";"):
+                if statement.strip():
+                    cursor.execute(statement)
+        self._changed()
+
+    def add(self, text):
+        return self.add_many([text])[0]
+
+    def add_many(self, texts):
+        rows = [(text, False) for text in texts]
+        with self._connection(write=True) as conn:
+            cursor = conn.cursor(dictionary=True)
+            # executemany sends a single multi-row INSERT; InnoDB gives it consecutive ids
+            # and LAST_INSERT_ID() is the first of them
+            cursor.executemany("INSERT INTO tasks (text, completed) VALUES (%s, %s)", rows)
+            cursor.execute("SELECT * FROM tasks WHERE id >= LAST_INSERT_ID() ORDER BY id LIMIT %s", [len(rows)])
+            created = [dict(row) for row in cursor.fetchall()]
+        self._changed()
+        return created
+
+    def set_completed_many(self, updates):
+        by_value = {}
+        for task_id, completed in dict(updates).items():  # the last update of an id wins, as in a loop
+            by_value.setdefault(int(bool(completed)), []).append(task_id)
+        return self._write_in("UPDATE tasks SET completed = %s WHERE id IN ({})",
+                              [((value,), ids) for value, ids in by_value.items()])
+
+    def delete_many(self, task_ids):
+        return self._write_in("DELETE FROM tasks WHERE id IN ({})", [((), list(dict.fromkeys(task_ids)))])
+
+    def _write_in(self, sql, groups) -> int:
+        """Run sql for each (params, ids) group, IN_CHUNK ids at a time, in one transaction."""
+        count = 0
+        with self._connection(write=True) as conn:
+            cursor = conn.cursor()
+            for params, ids in groups:
+                for start in range(0, len(ids), self.IN_CHUNK):
+                    chunk = ids[start:start + self.IN_CHUNK]
+                    cursor.execute(sql.format(", ".join(["%s"] * len(chunk))), [*params, *chunk])
+                    count += cursor.rowcount
+        self._changed()
+        return count
+
+
+class MemoryTaskRepository(TaskRepository):
+    """Tasks in a dict, with an ascending list of ids for keyset pages.
+
+    Readers take no lock. Task dicts are never modified in place (an update
+    stores a new dict), ids only ever grow, so appending keeps the list
+    sorted, and a delete only removes the dict entry; the list is rebuilt
+    (and swapped in with a single assignment) once more than half of it
+    points at deleted tasks. A reader that started on the old list simply
+    skips ids that are gone. Writers are serialized by one lock so that id
+    allocation and the append happen in order.
+    """
+
+    def __init__(self, on_change=None):
+        super().__init__(on_change)
+        self._tasks = {}
+        self._ids = []
+        self._next_id = 1
+        self._write_lock = threading.Lock()
+
+    def exists(self):
+        return True
+
+    def create_schema(self, script=None):
+        with self._write_lock:
+            self._tasks, self._ids, self._next_id = {}, [], 1
+        self._changed()
+
+    def _scan(self, after_id, completed):
+        ids, tasks = self._ids, self._tasks
+        if completed is not None:
+            completed = int(bool(completed))
+        for i in range(bisect.bisect_right(ids, after_id), len(ids)):
+            task = tasks.get(ids[i])
+            if task is not None and (completed is None or task["completed"] == completed):
+                yield task
+
+    def _project(self, task, columns):
+        if len(columns) == len(TASK_FIELDS):
+            return dict(task)
+        return {c: task[c] for c in columns}
+
+    def page(self, after_id=0, limit=None, completed=None, fields=TASK_FIELDS):
+        columns = _columns(fields)
+        result = []
+        for task in self._scan(after_id, completed):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self._project(task, columns))
+        return result
+
+    def iter_batches(self, after_id=0, limit=None, completed=None, fields=TASK_FIELDS, batch_size=500):
+        rows = self.page(after_id, limit, completed, fields)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def get(self, task_id):
+        task = self._tasks.get(task_id)
+        return None if task is None else dict(task)
+
+    def find_by_text(self, text):
+        for task in self._scan(0, None):
+            if task["text"] == text:
+                return dict(task)
+        return None
+
+    def search(self, query, limit=20, completed=None, fields=TASK_FIELDS):
+        """A scan; shorter texts rank first, which is roughly what bm25 does when every word matches once."""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        columns = _columns(fields)
+        found = []
+        for task in self._scan(0, completed):
+            words = [w for w, _ in search_terms(task["text"])]
+            if all(any(w.startswith(term) if prefix else w == term for w in words) for term, prefix in terms):
+                found.append((len(words), task["id"], task))
+        found.sort(key=lambda item: item[:2])
+        return [self._project(task, columns) for _, _, task in found[:limit]]
+
+    def add(self, text):
+        return self.add_many([text])[0]
+
+    def add_many(self, texts):
+        created = []
+        with self._write_lock:
+            for text in texts:
+                task = {"id": self._next_id, "text": text, "completed": 0}
+                self._next_id += 1
+                self._tasks[task["id"]] = task
+                self._ids.append(task["id"])
+                created.append(dict(task))
+        self._changed()
+        return created
+
+    def set_completed_many(self, updates):
+        matched = 0
+        with self._write_lock:
+            for task_id, completed in updates:
+                task = self._tasks.get(task_id)
+                if task is not None:
+                    self._tasks[task_id] = {**task, "completed": int(bool(completed))}
+                    matched += 1
+        self._changed()
+        return matched
+
+    def delete_many(self, task_ids):
+        deleted = 0
+        with self._write_lock:
+            for task_id in task_ids:
+                if self._tasks.pop(task_id, None) is not None:
+                    deleted += 1
+            if len(self._ids) > 2 * len(self._tasks):
+                self._ids = [i for i in self._ids if i in self._tasks]
+        self._changed()
+        return deleted
+
+    def clear(self):
+        with self._write_lock:
+            self._tasks, self._ids = {}, []
+        self._changed()
@@ -0,0 +1,127 @@
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
+
+from app_common.task_api import (STREAM_BATCH_SIZE, ApiError, batch_ids, batch_texts, batch_updates,
+                                 parse_search_query, parse_task_query, stream_chunks, stream_format,
+                                 task_list, task_search)
+
+"""
+The todo apps' /api/tasks routes, as a Flask blueprint over a task repository.
+
+    routes = TaskRoutes(tasks, cache=task_cache, search=True)
+    app.register_blueprint(routes.blueprint)
+
+  GET    /api/tasks          after_id, limit, completed, fields; with a
+                             cache the page is served from it (ETag,
+                             If-None-Match, X-Next-After-Id), ?stream=1,
+                             ?stream=ndjson or Accept: application/x-ndjson
+                             stream it instead; without one it is always
+                             streamed
+  GET    /api/tasks/search   q, limit, completed, fields (search=True)
+  POST   /api/tasks          {"text": ...}
+  PUT    /api/tasks/<id>     {"completed": ...}
+  DELETE /api/tasks/<id>
+  POST/PUT/DELETE /api/tasks/batch   a JSON array, one transaction
+
+The routes read self.tasks on every request, so a test or benchmark can
+swap the repository on a running app. Parsing, caching and encoding are
+app_common.task_api, shared with the ASGI app. Bad input, and any other
+400 the app raises, is answered as {"error": message}.
+"""
+
+
+class TaskRoutes:
+    def __init__(self, tasks, cache=None, search=False, stream_batch_size: int = STREAM_BATCH_SIZE):
+        self.tasks = tasks
+        self.cache = cache
+        self.stream_batch_size = stream_batch_size
+        bp = self.blueprint = Blueprint('tasks', __name__)
+        bp.app_errorhandler(ApiError)(self.api_error)
+        bp.app_errorhandler(400)(self.bad_request)
+        bp.add_url_rule('/api/tasks', 'list', self.get_tasks, methods=['GET'])
+        if search:
+            bp.add_url_rule('/api/tasks/search', 'search', self.search_tasks, methods=['GET'])
+        bp.add_url_rule('/api/tasks', 'add', self.add_task, methods=['POST'])
+        bp.add_url_rule('/api/tasks/<int:task_id>', 'update', self.update_task, methods=['PUT'])
+        bp.add_url_rule('/api/tasks/<int:task_id>', 'delete', self.delete_task, methods=['DELETE'])
+        bp.add_url_rule('/api/tasks/batch', 'add_batch', self.add_tasks, methods=['POST'])
+        bp.add_url_rule('/api/tasks/batch', 'update_batch', self.update_tasks, methods=['PUT'])
+        bp.add_url_rule('/api/tasks/batch', 'delete_batch', self.delete_tasks, methods=['DELETE'])
+
+    def api_error(self, error):
+        return jsonify({'error': error.message}), error.status
+
+    def bad_request(self, error):
+        return jsonify({'error': error.description}), 400
+
+    def get_tasks(self):
+        after_id, limit, completed, fields = parse_task_query(request.args.get)
+        fmt = stream_format(request.args.get('stream'),
+                            request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+                            == 'application/x-ndjson')
+        if fmt or self.cache is None:
+            batches = self.tasks.iter_batches(after_id, limit, completed, fields, self.stream_batch_size)
+            return self.stream(stream_chunks(batches, fields, fmt or 'json'), fmt or 'json')
+        body, etag, next_after_id = task_list(self.tasks, self.cache, after_id, limit, completed, fields)
+        response = self.cached_response(body, etag)
+        if next_after_id:
+            response.headers['X-Next-After-Id'] = next_after_id
+        return response
+
+    def search_tasks(self):
+        q, limit, completed, fields = parse_search_query(request.args.get)
+        body, etag, _ = task_search(self.tasks, self.cache, q, limit, completed, fields)
+        return self.cached_response(body, etag)
+
+    def cached_response(self, body, etag):
+        """The cached body, or 304 when the client's If-None-Match already has it."""
+        if etag in request.if_none_match:
+            self.cache.record_not_modified()
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    def stream(self, chunks, fmt):
+        """Chunked response; memory stays flat however large the table is.
+
+        The first batch is read before the response starts, so a database
+        error is still a 500. The repository holds its connection until the
+        last batch has been sent, or the client goes away and the response
+        is closed.
+        """
+        first = next(chunks, '')
+
+        def generate():
+            try:
+                yield first
+                yield from chunks
+            finally:
+                chunks.close()
+
+        mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+        return current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+
+    def add_task(self):
+        new_task = request.json or {}
+        return jsonify(self.tasks.add(new_task.get('text', 'unnamed task'))), 201
+
+    def update_task(self, task_id):
+        update_data = request.json or {}
+        self.tasks.set_completed(task_id, update_data.get('completed', False))
+        return jsonify({'message': 'Task updated successfully'})
+
+    def delete_task(self, task_id):
+        self.tasks.delete(task_id)
+        return jsonify({'message': 'Task deleted successfully'})
+
+    def add_tasks(self):
+        return jsonify(self.tasks.add_many(batch_texts(request.get_json(silent=True)))), 201
+
+    def update_tasks(self):
+        updated = self.tasks.set_completed_many(batch_updates(request.get_json(silent=True)))
+        return jsonify({'message': 'Tasks updated successfully', 'updated': updated})
+
+    def delete_tasks(self):
+        deleted = self.tasks.delete_many(batch_ids(request.get_json(silent=True)))
+        return jsonify({'message': 'Tasks deleted successfully', 'deleted': deleted})
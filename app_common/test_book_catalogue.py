@@ -0,0 +1,64 @@
+import random
+import sqlite3
+
+import pytest
+
+from app_common import book_catalogue
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT NOT NULL, author TEXT, price REAL)")
+    rng = random.Random(7)
+    words = "alpha Beta gamma Clean code tale".split()
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?)", [
+        (i, " ".join(rng.choices(words, k=2)), rng.choice(["Ann", "bob", None]), rng.choice([None, 5.0, 7.5, 12.0]))
+        for i in range(1, 121)])
+    book_catalogue.install(conn)  # indexes the rows already there
+    yield conn
+    conn.close()
+
+
+def all_pages(conn, args):
+    ids, after = [], None
+    while True:
+        books, after = book_catalogue.page(conn, book_catalogue.parse_query(dict(args, limit="7", after=after or "")))
+        ids += [b["id"] for b in books]
+        if after is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", ["title", "-title", "author", "-author", "price", "-price", "id", "-id"])
+@pytest.mark.parametrize("filters", [{}, {"min_price": "6", "max_price": "12"}, {"q": "clean al*"},
+                                     {"q": "clean", "min_price": "6", "max_price": "12"}])
+@pytest.mark.parametrize("scan_rows", [1, 1000], ids=["wide", "narrow"])
+def test_pages_follow_sql_order_with_nulls(conn, monkeypatch, sort, filters, scan_rows):
+    monkeypatch.setattr(book_catalogue, "SEARCH_SCAN_ROWS", scan_rows)
+    monkeypatch.setattr(book_catalogue, "PRICE_SCAN_ROWS", scan_rows)
+    column = sort.lstrip("-")
+    where, params = ["1"], []
+    if filters.get("q"):
+        where.append("id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)")
+        params.append(book_catalogue.match_query(filters["q"]))
+    if filters.get("min_price"):
+        where.append("price BETWEEN 6 AND 12")
+    collate = " COLLATE NOCASE" if column in ("title", "author") else ""
+    direction = "DESC" if sort.startswith("-") else "ASC"
+    expected = [row[0] for row in conn.execute(
+        f"SELECT id FROM books WHERE {' AND '.join(where)} ORDER BY {column}{collate} {direction}, id {direction}",
+        params)]
+    assert expected and all_pages(conn, dict(filters, sort=sort)) == expected
+
+
+def test_index_follows_writes_and_bad_input_is_rejected(conn):
+    conn.execute("UPDATE books SET title = 'Zymurgy for brewers' WHERE id = 3")
+    books, _ = book_catalogue.page(conn, book_catalogue.parse_query({"q": "zymurgy"}))
+    assert [b["id"] for b in books] == [3]
+    for args in ({"sort": "isbn"}, {"limit": "0"}, {"min_price": "cheap"}, {"after": "not-a-cursor"},
+                 {"after": book_catalogue.encode_cursor("x", "1")}):
+        with pytest.raises(ValueError):
+            book_catalogue.parse_query(args)
+    query = book_catalogue.parse_query({"q": "clean", "sort": "-price", "limit": "50"})
+    assert book_catalogue.query_args(query, after="abc") == {"q": "clean", "sort": "-price", "after": "abc"}
@@ -0,0 +1,43 @@
+import sqlite3
+
+from app_common import data_version
+from app_common.snapshot_cache import SnapshotCache
+
+
+def test_counters_follow_writes_from_any_connection(tmp_path):
+    path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+    assert data_version.read(conn, "books") is None
+    data_version.install(conn, ["books"])
+    data_version.install(conn, ["books"])  # idempotent
+    assert data_version.read(conn, "books") == 0
+
+    other = sqlite3.connect(path)
+    other.executemany("INSERT INTO books (title) VALUES (?)", [("a",), ("b",)])
+    other.execute("UPDATE books SET title = 'c' WHERE id = 1")
+    other.execute("INSERT INTO users (name) VALUES ('x')")  # not tracked
+    assert data_version.read(conn, "books") == 0  # not committed yet
+    other.commit()
+    assert data_version.read(conn, "books") == 3
+    other.execute("DELETE FROM books")
+    other.rollback()
+    assert data_version.read(conn, "books") == 3
+
+
+def test_sync_drops_entries_when_the_stamp_moves():
+    cache = SnapshotCache("catalogue", max_entries=2)
+    cache.sync(1)
+    rows, etag, _ = cache.get(("rows", 1), lambda: ([{"id": 1}], None))
+    assert etag is None  # not bytes: cached as is
+    cache.get(("html", 1, None), lambda: (b"<p>anon</p>", None))
+    cache.get(("html", 1, "ann"), lambda: (b"<p>ann</p>", None))
+    assert cache.stats()["evictions"] == 1
+
+    cache.sync(1)
+    assert cache.get(("html", 1, "ann"), lambda: (b"rebuilt", None))[0] == b"<p>ann</p>"
+    cache.sync(2)
+    assert cache.stats()["entries"] == 0
+    cache.sync(None)  # untracked: leaves the cache alone
+    assert cache.source_version == 2
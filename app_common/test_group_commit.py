@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app_common.group_commit import GroupCommitWriter
+from app_common.sqlite_pool import SQLitePool
+
+
+@pytest.fixture
+def writer(tmp_path):
+    pool = SQLitePool(str(tmp_path / "writes.db"))
+    conn = pool.connect()
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE)")
+    conn.commit()
+    conn.close()
+    commits = []
+    writer = GroupCommitWriter(pool.connect, max_batch=16, max_wait=0.005, on_commit=lambda: commits.append(1))
+    writer.commits = commits
+    yield writer
+    writer.close()
+
+
+def test_concurrent_inserts_share_commits(writer):
+    results = []
+    barrier = threading.Barrier(40)
+
+    def insert(n):
+        barrier.wait()
+        results.append(writer.execute("INSERT INTO tasks (text) VALUES (?) RETURNING id, text", [f"t{n}"],
+                                      one_row=True))
+
+    threads = [threading.Thread(target=insert, args=(n,)) for n in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(r["text"] for r in results) == sorted(f"t{n}" for n in range(40))
+    assert len({r["id"] for r in results}) == 40
+    stats = writer.stats()
+    assert stats["ops"] == 40
+    assert stats["batches"] == len(writer.commits) < 40
+
+
+def test_failed_statement_does_not_sink_its_batch(writer):
+    writer.execute("INSERT INTO tasks (text) VALUES ('dup')")
+    futures = [writer.submit("INSERT INTO tasks (text) VALUES (?) RETURNING id", [text])
+               for text in ("a", "dup", "b")]
+    assert futures[0].result() and futures[2].result()
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert [r["text"] for r in writer.execute("SELECT text FROM tasks ORDER BY id")] == ["dup", "a", "b"]
+
+
+def test_close_and_restart(writer):
+    writer.execute("INSERT INTO tasks (text) VALUES ('before')")
+    writer.close()
+    assert writer.execute("SELECT COUNT(*) FROM tasks", one_row=True)[0] == 1
+
+
+def test_failed_connect_fails_the_queue_and_the_next_submit_reconnects(tmp_path):
+    pool = SQLitePool(str(tmp_path / "writes.db"))
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return pool.connect()
+
+    writer = GroupCommitWriter(connect)
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        writer.execute("CREATE TABLE t (x)", timeout=5)
+    writer.execute("CREATE TABLE t (x)", timeout=5)  # a new writer thread, connected this time
+    assert writer.execute("INSERT INTO t VALUES (1) RETURNING x", one_row=True, timeout=5)[0] == 1
+    assert len(attempts) == 2
+    writer.close()
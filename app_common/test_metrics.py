@@ -0,0 +1,69 @@
+import sqlite3
+
+from flask import Flask, render_template_string
+
+from app_common.metrics import Metrics, TimedConnection, phase
+
+
+def make_app(tmp_path):
+    app = Flask(__name__)
+    metrics = Metrics(app, name="demo")
+    db_path = str(tmp_path / "demo.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [("a",), ("b",)])
+    conn.commit()
+    conn.close()
+
+    @app.route("/items/<int:item_id>")
+    def item(item_id):
+        db = sqlite3.connect(db_path, factory=TimedConnection)
+        row = db.execute("SELECT name FROM items WHERE id = ?", (item_id,)).fetchone()
+        db.close()
+        with phase("hash"):
+            pass
+        if row is None:
+            return "missing", 404
+        return render_template_string("<p>{{ name }}</p>", name=row[0])
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return app, metrics
+
+
+def test_records_routes_statuses_and_phases(tmp_path):
+    app, metrics = make_app(tmp_path)
+    client = app.test_client()
+    assert client.get("/items/1").data == b"<p>a</p>"
+    client.get("/items/2")
+    assert client.get("/items/9").status_code == 404
+    assert client.get("/nowhere").status_code == 404
+
+    stats = metrics.routes[("GET", "/items/<int:item_id>")]
+    assert stats.count == 3 and sum(stats.buckets) == 3
+    assert stats.statuses == {200: 2, 404: 1}
+    assert set(stats.phases) == {"db", "render", "hash"}
+    assert 0 < stats.phases["db"] + stats.phases["render"] < stats.total
+    assert metrics.routes[("GET", "<unmatched>")].count == 1
+    assert metrics.in_flight == 0
+
+
+def test_metrics_endpoint_is_prometheus_text(tmp_path):
+    app, metrics = make_app(tmp_path)
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    client = app.test_client()
+    client.get("/items/1")
+    assert client.get("/boom").status_code == 500
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    labels = 'app="demo",method="GET",route="/items/<int:item_id>"'
+    assert f'http_requests_total{{{labels},status="200"}} 1' in text
+    assert 'http_requests_total{app="demo",method="GET",route="/boom",status="500"} 1' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f'http_request_phase_seconds_total{{{labels},phase="db"}}' in text
+    assert 'http_requests_in_flight{app="demo"} 0' in text
+    assert 'route="/metrics"' not in text
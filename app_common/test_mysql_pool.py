@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from app_common.mysql_pool import MySQLPool, PoolTimeout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from mysql_stub import MySQLStub  # noqa: E402
+
+pytest.importorskip("mysql.connector")
+
+
+@pytest.fixture
+def stub(tmp_path):
+    with MySQLStub(str(tmp_path / "stub.db")) as stub:
+        yield stub
+
+
+@pytest.fixture
+def pool(stub):
+    pool = MySQLPool.from_config({"host": stub.host, "port": stub.port, "user": "root", "password": "x",
+                                  "database": "todo_db", "use_pure": True}, size=2, timeout=0.2)
+    conn = pool.acquire()
+    conn.cursor().execute("CREATE TABLE tasks (id INT PRIMARY KEY AUTO_INCREMENT, text VARCHAR(255))")
+    pool.release(conn)
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused_and_bounded(pool, stub):
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    second = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(second)
+    waiter.join()
+    assert got == [second]
+    assert stub.stats()["connections"] == 2
+    assert pool.stats()["waits"] == 2
+
+
+def test_dead_idle_connection_is_replaced(pool, stub):
+    conn = pool.acquire()
+    pool.release(conn)
+    stub.disconnect_all()
+    pool.check_after = 0
+    fresh = pool.acquire()
+    assert fresh is not conn
+    cursor = fresh.cursor()
+    cursor.execute("SELECT COUNT(*) FROM tasks")
+    assert cursor.fetchall() == [(0,)]
+    assert pool.stats()["discarded"] == 1
+
+
+def test_release_rolls_back_and_drops_unread_streams(pool):
+    conn = pool.acquire()
+    conn.start_transaction()
+    conn.cursor().execute("INSERT INTO tasks (text) VALUES ('never committed')")
+    pool.release(conn, failed=True)
+
+    conn = pool.acquire()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO tasks (text) VALUES ('a'), ('b')")
+    cursor.execute("SELECT text FROM tasks ORDER BY id")
+    assert cursor.fetchone() == ("a",)  # 'b' is still unread on the socket
+    pool.release(conn)
+    assert pool.stats()["discarded"] == 1
+
+    conn = pool.acquire()
+    cursor = conn.cursor()
+    cursor.execute("SELECT text FROM tasks ORDER BY id")
+    assert cursor.fetchall() == [("a",), ("b",)]
+    pool.release(conn)
@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app_common import order_pipeline
+from app_common.order_pipeline import Order, OrderPipeline, OrderQueueFull
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "orders.db")
+    conn = sqlite3.connect(path)
+    order_pipeline.install(conn)
+    conn.close()
+    return path
+
+
+def connector(path, gate=None):
+    def connect():
+        if gate is not None:
+            gate.wait(5)
+        return sqlite3.connect(path, check_same_thread=False)
+    return connect
+
+
+def test_orders_are_batched_and_written_once_per_key(db_path):
+    pipeline = OrderPipeline(connector(db_path), max_batch=50)
+    submit = [Order(f"user{i % 3}", f"key{i}", 9.5, None, [(1, "Pizza", 9.5, 1), (2, "Salad", 5.0, 2)])
+              for i in range(400)]
+    threads = [threading.Thread(target=lambda part=part: [pipeline.submit(o) for o in part])
+               for part in (submit[:200], submit[200:], submit[100:300])]  # the last thread retries half of them
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pipeline.flush()
+    pipeline.submit(submit[0])  # retried after it was written
+    pipeline.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*), COUNT(DISTINCT idempotency_key) FROM orders").fetchone() == (400, 400)
+    assert conn.execute("SELECT COUNT(*) FROM order_items").fetchone() == (800,)
+    stats = pipeline.stats()
+    assert stats["written"] == 400 and stats["duplicates"] == 201 and stats["batches"] < 400
+    status = pipeline.status(conn, "user0", "key0")
+    assert status["status"] == "paid" and status["items"][1] == {"item_id": 2, "name": "Salad", "price": 5.0,
+                                                                 "quantity": 2}
+    assert pipeline.status(conn, "user1", "key0") is None  # keys belong to their user
+
+
+def test_full_queue_rejects_and_queued_orders_report_their_status(db_path):
+    gate = threading.Event()
+    pipeline = OrderPipeline(connector(db_path, gate), max_pending=1, queue_timeout=0.01)
+    assert pipeline.submit(Order("ann", "a", 5.0, "FOOD10", [(3, "Salad", 5.0, 1)]))
+    conn = sqlite3.connect(db_path)
+    assert pipeline.status(conn, "ann", "a")["status"] == "queued"
+    assert not pipeline.submit(Order("ann", "a", 5.0, "FOOD10", []))  # still queued: dropped
+    with pytest.raises(OrderQueueFull):
+        pipeline.submit(Order("ann", "b", 5.0, None, []))
+    gate.set()
+    pipeline.close()
+    assert pipeline.status(conn, "ann", "a")["status"] == "paid"
+    assert pipeline.status(conn, "ann", "b") is None
+    assert pipeline.stats()["rejected"] == 1
+
+
+def test_batches_that_cannot_be_written_are_reported_failed(tmp_path):
+    pipeline = OrderPipeline(connector(str(tmp_path / "no_tables.db")), retries=1)
+    pipeline.submit(Order("ann", "a", 5.0, None, []))
+    pipeline.flush()
+    conn = sqlite3.connect(str(tmp_path / "orders.db"))
+    order_pipeline.install(conn)
+    status = pipeline.status(conn, "ann", "a")
+    assert status["status"] == "failed" and "no such table" in status["error"]
+    pipeline.close()
+
+
+def test_a_bad_order_does_not_fail_the_rest_of_its_batch(db_path):
+    gate = threading.Event()
+    pipeline = OrderPipeline(connector(db_path, gate), max_batch=50, retries=0)
+    good = [Order("ann", f"k{i}", 5.0, None, [(1, "Pizza", 5.0, 1)]) for i in range(5)]
+    bad = Order("ann", "bad", 10.0, None, [(1, "Pizza", 5.0, 1), (1, "Pizza", 5.0, 1)])  # same item twice: PK error
+    for order in good[:2] + [bad] + good[2:]:
+        pipeline.submit(order)
+    gate.set()
+    pipeline.close()
+
+    conn = sqlite3.connect(db_path)
+    assert all(pipeline.status(conn, "ann", o.key)["status"] == "paid" for o in good)
+    status = pipeline.status(conn, "ann", "bad")
+    assert status["status"] == "failed" and "UNIQUE" in status["error"]
+    assert conn.execute("SELECT COUNT(*) FROM order_items").fetchone() == (5,)
+    stats = pipeline.stats()
+    assert stats["written"] == 5 and stats["failed"] == 1
+
+
+def test_failed_connect_fails_the_batch_and_the_writer_keeps_going(db_path):
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) <= 2:  # when the thread starts and again for the first batch
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(db_path, check_same_thread=False)
+
+    pipeline = OrderPipeline(connect, retries=0)
+    pipeline.submit(Order("ann", "a", 5.0, None, [(1, "Pizza", 5.0, 1)]))
+    pipeline.flush(timeout=5)
+    conn = sqlite3.connect(db_path)
+    status = pipeline.status(conn, "ann", "a")
+    assert status["status"] == "failed" and "unable to open" in status["error"]
+    pipeline.submit(Order("ann", "a", 5.0, None, [(1, "Pizza", 5.0, 1)]))  # the client retries its key
+    pipeline.close()
+    assert pipeline.status(conn, "ann", "a")["status"] == "paid"
+    assert len(attempts) == 3
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from app_common import password_hasher
+from app_common.metrics import Metrics
+from app_common.password_hasher import HasherBusy, PasswordHasher
+
+
+def test_hashes_in_worker_processes_with_the_configured_cost():
+    hasher = PasswordHasher.from_env({"PASSWORD_HASH_PROFILE": "loadtest", "PASSWORD_HASH_WORKERS": "1"})
+    try:
+        hasher.start()
+        pwhash = hasher.hash("s3cret")
+        assert pwhash.startswith("pbkdf2:sha256:1000$")
+        assert hasher.verify(pwhash, "s3cret") and not hasher.verify(pwhash, "guess")
+    finally:
+        hasher.close()
+    stats = hasher.stats()
+    assert stats["counts"] == {"hash": 1, "verify": 2} and stats["pending"] == 0
+
+
+def test_environment_overrides_the_profile():
+    hasher = PasswordHasher.from_env({"PASSWORD_HASH_METHOD": "pbkdf2:sha256:500", "PASSWORD_HASH_WORKERS": "0",
+                                      "PASSWORD_HASH_QUEUE": "3", "PASSWORD_HASH_QUEUE_TIMEOUT": "0.5"})
+    assert (hasher.method, hasher.workers, hasher.max_pending, hasher.queue_timeout) == ("pbkdf2:sha256:500", 0, 3, 0.5)
+    assert hasher.hash("pw").startswith("pbkdf2:sha256:500$")
+    assert PasswordHasher.from_env({}).method is None  # werkzeug's default
+    with pytest.raises(ValueError):
+        PasswordHasher.from_env({"PASSWORD_HASH_PROFILE": "fast"})
+
+
+def test_full_queue_rejects_and_is_reported(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_run(op, args):
+        started.set()
+        release.wait(5)
+        return "hash", 0.25
+
+    monkeypatch.setattr(password_hasher, "_run", slow_run)
+    hasher = PasswordHasher(workers=0, max_pending=1, queue_timeout=0.05)
+    app = Flask(__name__)
+    metrics = Metrics(app, name="demo")
+    hasher.register_metrics(metrics)
+
+    holder = threading.Thread(target=hasher.hash, args=("a",))
+    holder.start()
+    started.wait(5)
+    with pytest.raises(HasherBusy):
+        hasher.hash("b")
+    page = app.test_client().get("/metrics").get_data(as_text=True)
+    release.set()
+    holder.join()
+
+    assert 'password_hash_queue_depth{app="demo",state="pending"} 1' in page
+    assert 'password_hash_rejected_total{app="demo"} 1' in page
+    assert hasher.stats()["seconds"]["hash"] == 0.25 and hasher.stats()["pending"] == 0
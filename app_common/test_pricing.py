@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from app_common import pricing
+from app_common.pricing import PriceBook, PricingEngine
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "food.db"))
+    conn.execute("CREATE TABLE menu (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL)")
+    conn.executemany("INSERT INTO menu VALUES (?, ?, ?)", [(1, "Pizza", 8), (2, "Burger", 6), (3, "Salad", 5)])
+    pricing.install(conn)
+    conn.executemany("INSERT INTO coupons VALUES (?, ?, ?, ?, ?)", [
+        ("SALAD50", "percent", 50, 3, None),
+        ("PIZZA2", "fixed", 2, 1, None),
+        ("FIVEOFF", "fixed", 5, None, None),
+        ("OLD", "percent", 50, None, "2020-01-01T00:00:00"),
+        ("SOON", "percent", 50, None, "2030-01-01T00:00:00+02:00"),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("coupon, lines, total, applied", [
+    (None, [(1, 1)], 8, None),
+    ("FOOD10", [(1, 1)], 7.2, "FOOD10"),  # the seeded coupon: what the hard-coded check used to give
+    ("FOOD10", [(1, 2), (3, 1)], 18.9, "FOOD10"),
+    ("SALAD50", [(1, 1), (3, 2)], 13, "SALAD50"),
+    ("SALAD50", [(1, 1)], 8, None),  # nothing it applies to
+    ("PIZZA2", [(1, 3), (2, 1)], 24, "PIZZA2"),
+    ("FIVEOFF", [(2, 1), (3, 1)], 6, "FIVEOFF"),
+    ("FIVEOFF", [(3, 1)], 0, "FIVEOFF"),  # never below zero
+    ("OLD", [(1, 1)], 8, None),
+    ("SOON", [(1, 1)], 4, "SOON"),
+    ("NOPE", [(1, 1)], 8, None),
+])
+def test_quotes_apply_compiled_coupon_rules(conn, coupon, lines, total, applied):
+    quote = PriceBook.load(conn).quote(lines, coupon, now=1.8e9)  # 2027
+    assert (quote.total, quote.coupon) == (total, applied)
+    assert quote.discount == round(quote.subtotal - total, 2)
+    assert sum(line.total for line in quote.lines) >= total
+
+
+def test_book_follows_writes_only_when_rechecked(conn):
+    engine = PricingEngine(check_interval=3600)
+    calls = []
+
+    def connect():
+        calls.append(1)
+        return conn
+
+    assert engine.book(connect).quote([(1, 1)]).total == 8
+    conn.execute("UPDATE menu SET price = 9 WHERE id = 1")
+    conn.commit()
+    assert engine.book(connect).quote([(1, 1)]).total == 8 and len(calls) == 1  # no query until the next check
+    engine.invalidate()
+    assert engine.book(connect).quote([(1, 1)], "FOOD10").total == 8.1
+    engine.invalidate()
+    engine.book(connect)
+    assert (engine.stats()["checks"], engine.stats()["reloads"]) == (3, 2)
+    with pytest.raises(KeyError):
+        engine.book(connect).quote([(42, 1)])
+    with pytest.raises(ValueError):
+        engine.book(connect).quote([(1, 0)])
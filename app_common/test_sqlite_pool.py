@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from app_common.sqlite_pool import SQLitePool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=2)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, text TEXT)")
+    conn.commit()
+    pool.release(conn)
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused_and_configured(pool):
+    first = pool.acquire()
+    assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert first.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert first.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.stats()["opened"] == 1
+
+
+def test_release_rolls_back_and_caps_idle_connections(pool):
+    conns = [pool.acquire() for _ in range(3)]
+    conns[0].execute("INSERT INTO tasks (text) VALUES ('uncommitted')")
+    for conn in conns:
+        pool.release(conn)
+    assert pool.stats()["idle"] == 2
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 0
+
+
+def test_connections_can_move_between_threads(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(pool.acquire().execute("SELECT 1").fetchone()[0]))
+    thread.start()
+    thread.join()
+    assert seen == [1]
+
+
+def test_from_env_overrides_size_and_pragmas(tmp_path):
+    env = {"SQLITE_POOL_SIZE": "1", "SQLITE_JOURNAL_MODE": "delete", "SQLITE_MMAP_SIZE": ""}
+    pool = SQLitePool.from_env(str(tmp_path / "env.db"), environ=env)
+    assert pool.size == 1
+    assert pool.pragmas["journal_mode"] == "delete"
+    assert pool.pragmas["mmap_size"] is None
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    pool.close()
+    with pytest.raises(TypeError):
+        SQLitePool("x.db", journal="wal")
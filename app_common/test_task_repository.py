@@ -0,0 +1,118 @@
+import importlib.util
+import os
+import sys
+import threading
+
+import pytest
+
+from app_common.group_commit import GroupCommitWriter
+from app_common.mysql_pool import MySQLPool
+from app_common.sqlite_pool import SQLitePool
+from app_common.task_repository import MemoryTaskRepository, MySQLTaskRepository, SQLiteTaskRepository
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MYSQL_SCHEMA = os.path.join(ROOT, "fullstack_mysql", "schema.sql")
+SQLITE_SCHEMA = os.path.join(ROOT, "fullstack_sqlite", "schema.sql")  # with the tasks_fts index
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+from mysql_stub import MySQLStub  # noqa: E402
+
+SCHEMA = """
+DROP TABLE IF EXISTS tasks;
+CREATE TABLE tasks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  text TEXT NOT NULL,
+  completed BOOLEAN NOT NULL CHECK (completed IN (0, 1))
+);
+"""
+
+
+@pytest.fixture(params=["sqlite", "memory", "mysql"])
+def repo(request, tmp_path):
+    changes = []
+    pool = stub = None
+    schema = SCHEMA
+    if request.param == "sqlite":
+        pool = SQLitePool(str(tmp_path / "tasks.db"), size=2)
+        repo = SQLiteTaskRepository(pool, on_change=lambda: changes.append(1))
+        with open(SQLITE_SCHEMA) as f:
+            schema = f.read()
+    elif request.param == "mysql":
+        if importlib.util.find_spec("mysql") is None:
+            pytest.skip("mysql-connector-python is not installed")
+        stub = MySQLStub(str(tmp_path / "stub.db")).start()
+        pool = MySQLPool.from_config({"host": stub.host, "port": stub.port, "user": "root", "password": "x",
+                                      "database": "todo_db"}, size=2)
+        repo = MySQLTaskRepository(pool, on_change=lambda: changes.append(1))
+        with open(MYSQL_SCHEMA) as f:
+            schema = f.read()
+    else:
+        repo = MemoryTaskRepository(on_change=lambda: changes.append(1))
+    repo.create_schema(schema)
+    repo.changes = changes
+    repo.backend = request.param
+    yield repo
+    if pool is not None:
+        pool.close()
+    if stub is not None:
+        stub.stop()
+
+
+def test_writes_return_tasks_and_counts(repo):
+    assert repo.add("one") == {"id": 1, "text": "one", "completed": 0}
+    assert [t["id"] for t in repo.add_many(["two", "three", "four"])] == [2, 3, 4]
+    assert repo.set_completed_many([(2, True), (4, True), (99, True)]) == 2
+    assert repo.get(2)["completed"] == 1
+    assert repo.find_by_text("three") == {"id": 3, "text": "three", "completed": 0}
+    assert repo.delete_many([1, 3, 99]) == 2
+    assert repo.get(1) is None and repo.find_by_text("one") is None
+    assert len(repo.changes) == 5  # create_schema, add, add_many, set_completed_many, delete_many
+
+
+def test_keyset_pages_filters_and_projection(repo):
+    repo.add_many([f"task {i}" for i in range(1, 11)])
+    repo.set_completed_many([(i, True) for i in range(2, 11, 2)])
+    assert [t["id"] for t in repo.page(after_id=3, limit=4)] == [4, 5, 6, 7]
+    assert repo.page(after_id=4, limit=2, completed=True, fields=("text",)) == [
+        {"id": 6, "text": "task 6"}, {"id": 8, "text": "task 8"}]
+    batches = list(repo.iter_batches(completed=False, batch_size=2))
+    assert [[t["id"] for t in b] for b in batches] == [[1, 3], [5, 7], [9]]
+    with pytest.raises(ValueError):
+        repo.page(fields=("secret",))
+
+
+def test_ids_keep_growing_after_deletes_and_clear(repo):
+    repo.add_many([f"task {i}" for i in range(6)])
+    repo.delete_many([1, 2, 3, 4, 5])  # the memory index is compacted here
+    assert [t["id"] for t in repo.page()] == [6]
+    repo.clear()
+    assert repo.page() == []
+    assert repo.add("again")["id"] == 7
+
+
+def test_search_matches_all_words_and_prefixes(repo):
+    if repo.backend == "mysql":
+        pytest.skip("MySQLTaskRepository has no search()")
+    repo.add_many(["Pay the gas bill", "pay rent", "Paint the fence", "bill-paying day"])
+    assert [t["id"] for t in repo.search("PAY")] == [2, 1]
+    assert [t["id"] for t in repo.search("pa*", limit=3)] == [2, 3, 4]  # shortest texts first
+    assert repo.search("bill pay*", fields=("text",)) == [{"id": 4, "text": "bill-paying day"},
+                                                         {"id": 1, "text": "Pay the gas bill"}]
+    assert repo.search("pay", completed=True) == [] and repo.search("*") == []
+
+
+def test_add_through_a_stuck_writer_times_out(tmp_path):
+    pool = SQLitePool(str(tmp_path / "tasks.db"), size=1)
+    repo = SQLiteTaskRepository(pool)
+    repo.create_schema(SCHEMA)
+    release = threading.Event()
+
+    def connect():
+        release.wait(5)  # e.g. a connect waiting out another process's lock
+        return pool.connect()
+
+    writer = GroupCommitWriter(connect)
+    repo = SQLiteTaskRepository(pool, writer=writer, write_timeout=0.05)
+    with pytest.raises(TimeoutError):
+        repo.add("stuck")
+    release.set()
+    writer.close()
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from flask import Flask
+
+from app_common.snapshot_cache import SnapshotCache
+from app_common.task_api import ApiError, batch_ids, batch_updates, dumps, parse_task_query
+from app_common.task_repository import MemoryTaskRepository
+from app_common.task_routes import TaskRoutes
+
+
+def make_client(cache):
+    app = Flask(__name__)
+    routes = TaskRoutes(MemoryTaskRepository(on_change=cache and cache.invalidate), cache=cache,
+                        stream_batch_size=2)
+    app.register_blueprint(routes.blueprint)
+    client = app.test_client()
+    client.routes = routes
+    return client
+
+
+def test_cached_pages_and_streamed_lists_have_the_same_rows():
+    client = make_client(SnapshotCache("tasks"))
+    client.post("/api/tasks/batch", json=[{"text": f"t{i}"} for i in range(5)])
+    page = client.get("/api/tasks")
+    assert page.data == dumps(client.routes.tasks.page())
+    assert client.get("/api/tasks", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+    assert client.get("/api/tasks?stream=1").get_json() == page.get_json()
+    assert client.get("/api/tasks/search?q=t1").status_code == 404  # search=False
+
+
+def test_without_a_cache_the_list_is_always_streamed():
+    client = make_client(None)
+    empty = client.get("/api/tasks")
+    assert empty.is_streamed and empty.get_json() == []
+    client.post("/api/tasks", json={"text": "only"})
+    assert client.get("/api/tasks?fields=text").get_json() == [{"text": "only"}]
+    assert client.get("/api/tasks?completed=maybe").get_json() == {"error": "completed must be true or false"}
+
+
+def test_a_failing_first_batch_is_a_500_not_a_broken_stream():
+    client = make_client(None)
+    client.application.testing = False
+
+    def broken(*args):
+        raise RuntimeError("database is gone")
+        yield
+
+    client.routes.tasks.iter_batches = broken
+    assert client.get("/api/tasks").status_code == 500
+
+
+@pytest.mark.parametrize("parse, body, error", [
+    (batch_updates, [{"id": 1, "completed": "yes"}], "each update needs an integer id and a boolean completed"),
+    (batch_ids, [1, "2"], "expected task ids"),
+    (batch_ids, [], "expected a non-empty JSON array"),
+])
+def test_bad_batches_raise_api_errors(parse, body, error):
+    with pytest.raises(ApiError, match=error):
+        parse(body)
+
+
+def test_query_string_defaults():
+    assert parse_task_query({}.get) == (0, None, None, ["id", "text", "completed"])
+    assert parse_task_query({"after_id": "3", "completed": "FALSE", "fields": "text"}.get) == (3, None, 0, ["text"])
+    assert json.loads(dumps({"b": 1, "a": 2})) == {"a": 2, "b": 1}
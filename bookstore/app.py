@@ -1,19 +1,32 @@
 import os
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, session, flash, g
-from werkzeug.security import generate_password_hash, check_password_hash
+import sys
+from flask import Flask, abort, render_template, request, redirect, url_for, session, flash, g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import book_catalogue, data_version  # noqa: E402
+from app_common.metrics import Metrics, TimedConnection, phase  # noqa: E402
+from app_common.password_hasher import HasherBusy, PasswordHasher  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
 
 app = Flask(__name__)
 app.secret_key = "dev-secret-bookstore"
+metrics = Metrics(app, name="bookstore")
 
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, "bookstore.db")
+# /catalogue: each page of books and its rendering per user, kept until the books table changes
+catalogue_cache = SnapshotCache("catalogue", max_entries=int(os.environ.get("CATALOGUE_CACHE_ENTRIES", "256")))
+catalogue_cache.register_metrics(metrics)
+# register/login hash passwords in worker processes; cost and pool size from PASSWORD_HASH_*
+hasher = PasswordHasher.from_env()
+hasher.register_metrics(metrics)
 
 
 def get_db():
 	db = getattr(g, "_database", None)
 	if db is None:
-		db = g._database = sqlite3.connect(DB_PATH)
+		db = g._database = sqlite3.connect(DB_PATH, factory=TimedConnection)
 		db.row_factory = sqlite3.Row
 	return db
 
@@ -54,6 +67,9 @@ def init_db():
 			],
 		)
 	conn.commit()
+	# search index, sort indexes and change counter (see app_common/book_catalogue.py, data_version.py)
+	book_catalogue.install(conn)
+	data_version.install(conn, ["books"])
 	conn.close()
 
 
@@ -77,11 +93,13 @@ def register():
 		if not username or not password:
 			flash("Please provide username and password", "error")
 			return redirect(url_for("register"))
+		with phase("password_hash"):
+			password_hash = hasher.hash(password)
 		db = get_db()
 		try:
 			db.execute(
 				"INSERT INTO users(username, password_hash) VALUES (?, ?)",
-				(username, generate_password_hash(password)),
+				(username, password_hash),
 			)
 			db.commit()
 		except sqlite3.IntegrityError:
@@ -99,7 +117,9 @@ def login():
 		password = request.form.get("password")
 		db = get_db()
 		row = db.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
-		if row and check_password_hash(row["password_hash"], password):
+		with phase("password_hash"):
+			valid = row is not None and hasher.verify(row["password_hash"], password)
+		if valid:
 			session["user"] = username
 			flash("Logged in", "info")
 			return redirect(url_for("catalogue"))
@@ -108,13 +128,46 @@ def login():
 	return render_template("login.html")
 
 
+@app.errorhandler(HasherBusy)
+def hasher_busy(error):
+	# the hashing queue stayed full: shed the request rather than queue it without bound
+	return "Too many logins in progress, please try again shortly", 503, {"Retry-After": "1"}
+
+
+CATALOGUE_SORTS = [("title", "Title A-Z"), ("-title", "Title Z-A"), ("author", "Author A-Z"),
+					("-author", "Author Z-A"), ("price", "Price: low to high"), ("-price", "Price: high to low")]
+
+
+def render_catalogue(query, books, next_cursor, user):
+	next_url = None
+	if next_cursor:
+		next_url = url_for("catalogue", **book_catalogue.query_args(query, after=next_cursor))
+	return render_template("catalogue.html", books=books, query=query, query_args=book_catalogue.query_args(query),
+							sorts=CATALOGUE_SORTS, next_url=next_url, user=user)
+
+
+# GET /catalogue?q=<words>&min_price=&max_price=&sort=title|author|price|id (prefix - to reverse)&limit=&after=<cursor>
+# One page (default 50 books) at a time; the "Next" link carries the keyset cursor.
 @app.route("/catalogue")
 def catalogue():
+	try:
+		query = book_catalogue.parse_query(request.args)
+	except ValueError as e:
+		abort(400, str(e))
 	db = get_db()
-	books = db.execute("SELECT id, title, author, price FROM books").fetchall()
-	# convert to dict-like objects for templates
-	books = [dict(b) for b in books]
-	return render_template("catalogue.html", books=books, user=session.get("user"))
+	user = session.get("user")
+	# one indexed read per request; any write to books, from any process, moves it
+	stamp = data_version.read(db, "books")
+	if stamp is None:  # database created without the counters: nothing to check a cached page against
+		return render_catalogue(query, *book_catalogue.page(db, query), user)
+	catalogue_cache.sync(stamp)
+
+	def render():
+		page, _, _ = catalogue_cache.get(("books", stamp, query), lambda: (book_catalogue.page(db, query), None))
+		return render_catalogue(query, *page, user), None
+
+	html, _, _ = catalogue_cache.get(("html", stamp, user, query), render)
+	return html
 
 
 @app.route("/logout")
@@ -126,6 +179,7 @@ def logout():
 
 if __name__ == "__main__":
 	init_db()
+	hasher.start()
 	# By default don't use the Flask reloader (debug mode) when running tests.
 	# Set FLASK_DEBUG=1 in the environment to enable debug mode during development.
 	debug_mode = os.environ.get("FLASK_DEBUG", "0") == "1"
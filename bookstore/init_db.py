@@ -1,5 +1,9 @@
 import sqlite3
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import book_catalogue, data_version  # noqa: E402
 
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, "bookstore.db")
@@ -37,6 +41,8 @@ def init_db():
             ],
         )
     conn.commit()
+    book_catalogue.install(conn)
+    data_version.install(conn, ["books"])
     conn.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import sqlite3
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from app_common.password_hasher import HasherBusy, PasswordHasher  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
+
+
+def load_app():
+    # imported by path: the other apps are also called "app"
+    spec = importlib.util.spec_from_file_location("bookstore_app", os.path.join(HERE, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+bookstore = load_app()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(bookstore, "DB_PATH", str(tmp_path / "bookstore.db"))
+    hasher = PasswordHasher.from_env({"PASSWORD_HASH_WORKERS": "0", "PASSWORD_HASH_PROFILE": "loadtest"})
+    monkeypatch.setattr(bookstore, "hasher", hasher)
+    monkeypatch.setattr(bookstore, "catalogue_cache", SnapshotCache("catalogue"))
+    bookstore.init_db()
+    return bookstore.app.test_client()
+
+
+def login(client, username="alice", password="secret"):
+    client.post("/register", data={"username": username, "password": password})
+    response = client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 302 and response.headers["Location"].endswith("/catalogue")
+
+
+def test_register_and_login(client):
+    assert client.post("/register", data={"username": "alice"}).headers["Location"].endswith("/register")
+    login(client)
+    assert client.post("/register", data={"username": "alice", "password": "x"}).headers["Location"].endswith(
+        "/register")  # already taken
+    wrong = client.post("/login", data={"username": "alice", "password": "wrong"})
+    assert wrong.headers["Location"].endswith("/login")
+
+
+def test_catalogue_is_cached_per_user_and_query(client):
+    anonymous = client.get("/catalogue").get_data(as_text=True)
+    assert "Clean Code" in anonymous and "Welcome" not in anonymous
+    assert client.get("/catalogue").get_data(as_text=True) == anonymous
+    assert bookstore.catalogue_cache.stats()["hits"] == 1
+
+    found = client.get("/catalogue?q=clean").get_data(as_text=True)
+    assert "Clean Code" in found and "Introduction to Algorithms" not in found
+    cheap = client.get("/catalogue?max_price=29&sort=-price").get_data(as_text=True)
+    assert "Clean Code" in cheap and "Pragmatic" not in cheap
+    assert bookstore.catalogue_cache.stats()["hits"] == 1  # a different query is a different page
+
+    login(client)
+    assert "Welcome, alice!" in client.get("/catalogue").get_data(as_text=True)  # not the anonymous page
+
+    conn = sqlite3.connect(bookstore.DB_PATH)  # e.g. init_db.py or another app process
+    conn.execute("INSERT INTO books (id, title, author, price) VALUES (4, 'Refactoring', 'Martin Fowler', 40)")
+    conn.commit()
+    conn.close()
+    assert "Refactoring" in client.get("/catalogue").get_data(as_text=True)
+
+
+@pytest.mark.parametrize("query", ["limit=0", "min_price=cheap", "sort=isbn", "after=garbage"])
+def test_bad_catalogue_query_is_a_400(client, query):
+    assert client.get(f"/catalogue?{query}").status_code == 400
+
+
+def test_busy_hasher_is_a_503(client, monkeypatch):
+    def busy(*args):
+        raise HasherBusy("8 password hashes already pending")
+
+    monkeypatch.setattr(bookstore.hasher, "hash", busy)
+    response = client.post("/register", data={"username": "alice", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
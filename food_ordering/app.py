@@ -1,19 +1,55 @@
+import atexit
 import os
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, session, flash, g
-from werkzeug.security import generate_password_hash, check_password_hash
+import sys
+import uuid
+from flask import Flask, jsonify, render_template, request, redirect, url_for, session, flash, g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import data_version, order_pipeline, pricing  # noqa: E402
+from app_common.metrics import Metrics, TimedConnection, phase  # noqa: E402
+from app_common.order_pipeline import Order, OrderPipeline, OrderQueueFull  # noqa: E402
+from app_common.password_hasher import HasherBusy, PasswordHasher  # noqa: E402
+from app_common.pricing import PricingEngine  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
 
 app = Flask(__name__)
 app.secret_key = "dev-secret-food"
+metrics = Metrics(app, name="food_ordering")
 
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, "food.db")
+# /menu: the items and the rendered page per user, kept until the menu table changes
+menu_cache = SnapshotCache("menu", max_entries=int(os.environ.get("MENU_CACHE_ENTRIES", "256")))
+menu_cache.register_metrics(metrics)
+# register/login hash passwords in worker processes; cost and pool size from PASSWORD_HASH_*
+hasher = PasswordHasher.from_env()
+hasher.register_metrics(metrics)
+# /order, /pay and /quote price from an in-memory copy of menu and coupons, re-checked against the
+# data_version counters at most every PRICING_CHECK_INTERVAL seconds (0: on every request)
+price_book = PricingEngine(check_interval=float(os.environ.get("PRICING_CHECK_INTERVAL", "1")))
+price_book.register_metrics(metrics)
+
+
+def connect_order_writer():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=5)
+    # WAL: the writer's commits don't lock out the request threads reading menu and users
+    conn.execute("PRAGMA journal_mode = wal")
+    conn.execute("PRAGMA synchronous = normal")
+    return conn
+
+
+# /pay queues the order and one thread writes the queue in batches; close() at exit writes what is left
+orders = OrderPipeline(connect_order_writer, max_pending=int(os.environ.get("ORDER_QUEUE_SIZE", "10000")),
+                       max_batch=int(os.environ.get("ORDER_MAX_BATCH", "1000")))
+orders.register_metrics(metrics)
+atexit.register(orders.close)
 
 
 def get_db():
     db = getattr(g, "_database", None)
     if db is None:
-        db = g._database = sqlite3.connect(DB_PATH)
+        db = g._database = sqlite3.connect(DB_PATH, factory=TimedConnection)
         db.row_factory = sqlite3.Row
     return db
 
@@ -50,6 +86,8 @@ def init_db():
             ],
         )
     conn.commit()
+    pricing.install(conn)  # coupons, and the menu/coupons counters
+    order_pipeline.install(conn)
     conn.close()
 
 
@@ -73,11 +111,13 @@ def register():
         if not username or not password:
             flash("Missing fields", "error")
             return redirect(url_for("register"))
+        with phase("password_hash"):
+            password_hash = hasher.hash(password)
         db = get_db()
         try:
             db.execute(
                 "INSERT INTO users(username, password_hash) VALUES (?, ?)",
-                (username, generate_password_hash(password)),
+                (username, password_hash),
             )
             db.commit()
         except sqlite3.IntegrityError:
@@ -95,7 +135,9 @@ def login():
         password = request.form.get("password")
         db = get_db()
         row = db.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
-        if row and check_password_hash(row["password_hash"], password):
+        with phase("password_hash"):
+            valid = row is not None and hasher.verify(row["password_hash"], password)
+        if valid:
             session["user"] = username
             return redirect(url_for("menu"))
         flash("Invalid", "error")
@@ -103,12 +145,33 @@ def login():
     return render_template("login.html")
 
 
+@app.errorhandler(HasherBusy)
+def hasher_busy(error):
+    # the hashing queue stayed full: shed the request rather than queue it without bound
+    return "Too many logins in progress, please try again shortly", 503, {"Retry-After": "1"}
+
+
+def load_menu(db):
+    rows = db.execute("SELECT id, name, price FROM menu").fetchall()
+    return [dict(r) for r in rows]
+
+
 @app.route("/menu")
 def menu():
     db = get_db()
-    rows = db.execute("SELECT id, name, price FROM menu").fetchall()
-    menu = [dict(r) for r in rows]
-    return render_template("menu.html", menu=menu, user=session.get("user"))
+    user = session.get("user")
+    # one indexed read per request; any write to menu, from any process, moves it
+    stamp = data_version.read(db, "menu")
+    if stamp is None:  # database created without the counters: nothing to check a cached page against
+        return render_template("menu.html", menu=load_menu(db), user=user)
+    menu_cache.sync(stamp)
+
+    def render():
+        items, _, _ = menu_cache.get(("items", stamp), lambda: (load_menu(db), None))
+        return render_template("menu.html", menu=items, user=user), None
+
+    html, _, _ = menu_cache.get(("html", stamp, user), render)
+    return html
 
 
 @app.route("/order", methods=["POST"])
@@ -117,24 +180,88 @@ def order():
         return redirect(url_for("login"))
     item_id = int(request.form.get("item_id"))
     coupon = request.form.get("coupon")
-    db = get_db()
-    item = db.execute("SELECT id, name, price FROM menu WHERE id = ?", (item_id,)).fetchone()
+    item, quote = price_item(item_id, coupon)
     if not item:
         flash("Invalid item", "error")
         return redirect(url_for("menu"))
-    price = item["price"]
-    if coupon == "FOOD10":
-        price = round(price * 0.9, 2)
-    return render_template("payment.html", item=item, price=price)
+    # the key names this checkout: however often /pay is retried with it, one order is written
+    checkout = {"item_id": item.id, "coupon": coupon or "", "key": uuid.uuid4().hex}
+    session["checkout"] = checkout
+    return render_template("payment.html", item=item, price=quote.total, checkout=checkout)
+
+
+def price_item(item_id, coupon):
+    """(MenuItem, Quote for one of it) or (None, None) for an unknown item."""
+    book = price_book.book(get_db)
+    item = book.items.get(item_id)
+    if item is None:
+        return None, None
+    return item, book.quote([(item_id, 1)], coupon)
 
 
 @app.route("/pay", methods=["POST"])
 def pay():
-    return render_template("success.html")
+    user = session.get("user")
+    if not user:
+        return redirect(url_for("login"))
+    # the payment form posts the checkout back; clients that only send the card fields pay the session's
+    checkout = session.get("checkout") or {}
+    item_id = request.form.get("item_id") or checkout.get("item_id")
+    coupon = request.form.get("coupon", checkout.get("coupon", ""))
+    key = request.headers.get("Idempotency-Key") or request.form.get("idempotency_key") or checkout.get("key")
+    if item_id is None or not key or len(key) > 64:
+        flash("Nothing to pay for", "error")
+        return redirect(url_for("menu"))
+    try:
+        item, quote = price_item(int(item_id), coupon)
+    except ValueError:
+        item = None
+    if not item:
+        flash("Invalid item", "error")
+        return redirect(url_for("menu"))
+    items = [(line.item_id, line.name, line.unit_price, line.quantity) for line in quote.lines]
+    orders.submit(Order(user, key, quote.total, quote.coupon, items))
+    return render_template("success.html", key=key)
+
+
+@app.route("/orders/<key>")
+def order_status(key):
+    user = session.get("user")
+    if not user:
+        return jsonify({"error": "login required"}), 401
+    status = orders.status(get_db(), user, key)
+    if status is None:
+        return jsonify({"error": "unknown order"}), 404
+    return jsonify(status)
+
+
+@app.route("/quote", methods=["POST"])
+def quote_cart():
+    """Price a whole cart: {"items": [{"item_id": 1, "quantity": 2}, ...], "coupon": "FOOD10"}."""
+    body = request.get_json(silent=True) or {}
+    try:
+        lines = [(int(line["item_id"]), int(line.get("quantity", 1))) for line in body.get("items") or []]
+        coupon = body.get("coupon")
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({"error": "items must be a list of {item_id, quantity}"}), 400
+    try:
+        quote = price_book.book(get_db).quote(lines, coupon)
+    except KeyError as exc:
+        return jsonify({"error": f"unknown item {exc.args[0]}"}), 400
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"lines": [line._asdict() for line in quote.lines], "subtotal": quote.subtotal,
+                    "discount": quote.discount, "total": quote.total, "coupon": quote.coupon})
+
+
+@app.errorhandler(OrderQueueFull)
+def order_queue_full(error):
+    return "Too many orders in progress, please try again shortly", 503, {"Retry-After": "1"}
 
 
 if __name__ == "__main__":
     init_db()
+    hasher.start()
     # Default: don't run with the reloader during automated tests. Enable debug with FLASK_DEBUG=1
     debug_mode = os.environ.get("FLASK_DEBUG", "0") == "1"
     app.run(debug=debug_mode, host="0.0.0.0", port=5002)
@@ -1,5 +1,9 @@
 import sqlite3
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import order_pipeline, pricing  # noqa: E402
 
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, "food.db")
@@ -36,6 +40,8 @@ def init_db():
             ],
         )
     conn.commit()
+    pricing.install(conn)  # coupons, and the menu/coupons counters
+    order_pipeline.install(conn)
     conn.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,140 @@
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from app_common.order_pipeline import OrderPipeline  # noqa: E402
+from app_common.password_hasher import HasherBusy, PasswordHasher  # noqa: E402
+from app_common.pricing import PricingEngine  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
+
+
+def load_app():
+    # imported by path: the other apps are also called "app"
+    spec = importlib.util.spec_from_file_location("food_ordering_app", os.path.join(HERE, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+food_app = load_app()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(food_app, "DB_PATH", str(tmp_path / "food.db"))
+    hasher = PasswordHasher.from_env({"PASSWORD_HASH_WORKERS": "0", "PASSWORD_HASH_PROFILE": "loadtest"})
+    monkeypatch.setattr(food_app, "hasher", hasher)
+    monkeypatch.setattr(food_app, "menu_cache", SnapshotCache("menu"))
+    monkeypatch.setattr(food_app, "price_book", PricingEngine(check_interval=0))
+    orders = OrderPipeline(food_app.connect_order_writer)
+    monkeypatch.setattr(food_app, "orders", orders)
+    food_app.init_db()
+    yield food_app.app.test_client()
+    orders.close()
+
+
+def login(client, username="alice", password="secret"):
+    client.post("/register", data={"username": username, "password": password})
+    response = client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 302 and response.headers["Location"].endswith("/menu")
+
+
+def checkout(client, item_id=1, coupon="FOOD10"):
+    page = client.post("/order", data={"item_id": str(item_id), "coupon": coupon})
+    assert page.status_code == 200
+    html = page.get_data(as_text=True)
+    return re.search(r'name="idempotency_key" value="(\w+)"', html).group(1), html
+
+
+def test_a_repeated_pay_writes_one_order(client):
+    login(client)
+    key, html = checkout(client)
+    assert "Amount: $7.2" in html  # Margherita Pizza, 8 less FOOD10
+    form = {"item_id": "1", "coupon": "FOOD10", "idempotency_key": key}
+    assert client.post("/pay", data=form).status_code == 200
+    assert client.post("/pay", data=form).status_code == 200  # the client retried
+    food_app.orders.flush()
+    stats = food_app.orders.stats()
+    assert (stats["written"], stats["duplicates"]) == (1, 1)
+    conn = sqlite3.connect(food_app.DB_PATH)
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 1
+    conn.close()
+
+    status = client.get(f"/orders/{key}").get_json()
+    assert (status["status"], status["total"], status["coupon"]) == ("paid", 7.2, "FOOD10")
+    assert status["items"] == [{"item_id": 1, "name": "Margherita Pizza", "price": 7.2, "quantity": 1}]
+
+
+def test_order_status_needs_the_owner(client):
+    assert client.get("/orders/nope").status_code == 401
+    login(client)
+    key, _ = checkout(client, item_id=2, coupon="")
+    client.post("/pay", headers={"Idempotency-Key": key})  # the session's checkout, keyed by header
+    food_app.orders.flush()
+    assert client.get(f"/orders/{key}").get_json()["total"] == 6
+    assert client.get("/orders/nope").status_code == 404
+    login(client, "bob")
+    assert client.get(f"/orders/{key}").status_code == 404
+
+
+def test_order_prices_and_rejects_unknown_items(client):
+    login(client)
+    _, html = checkout(client, item_id=3, coupon="NOPE")
+    assert "Amount: $5" in html  # an unknown coupon is ignored
+    missing = client.post("/order", data={"item_id": "99"})
+    assert missing.status_code == 302 and missing.headers["Location"].endswith("/menu")
+
+
+def test_quote_prices_a_cart(client):
+    quote = client.post("/quote", json={"items": [{"item_id": 1, "quantity": 2}, {"item_id": 3}], "coupon": "FOOD10"})
+    assert quote.status_code == 200
+    assert quote.get_json() == {
+        "lines": [{"item_id": 1, "name": "Margherita Pizza", "unit_price": 7.2, "quantity": 2, "total": 14.4},
+                  {"item_id": 3, "name": "Caesar Salad", "unit_price": 4.5, "quantity": 1, "total": 4.5}],
+        "subtotal": 21, "discount": 2.1, "total": 18.9, "coupon": "FOOD10"}
+    assert client.post("/quote", json={"items": [{"item_id": 2}], "coupon": "BOGUS"}).get_json()["coupon"] is None
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"items": [{"item_id": 99}]}, "unknown item 99"),
+    ({"items": [{"item_id": 1, "quantity": 0}]}, "quantity must be at least 1"),
+    ({"items": [{"quantity": 2}]}, "items must be a list of {item_id, quantity}"),
+    ({"items": "pizza"}, "items must be a list of {item_id, quantity}"),
+])
+def test_quote_rejects_bad_carts(client, body, error):
+    response = client.post("/quote", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_menu_is_cached_per_user_until_the_menu_changes(client):
+    assert "Welcome" not in client.get("/menu").get_data(as_text=True)
+    client.get("/menu")
+    assert food_app.menu_cache.stats()["hits"] >= 1
+    login(client)
+    assert "Welcome, alice" in client.get("/menu").get_data(as_text=True)
+
+    conn = sqlite3.connect(food_app.DB_PATH)  # e.g. another app process
+    conn.execute("UPDATE menu SET name = 'Pizza Napoletana' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert "Pizza Napoletana" in client.get("/menu").get_data(as_text=True)
+
+
+def test_busy_hasher_is_a_503(client, monkeypatch):
+    login(client)
+
+    def busy(*args):
+        raise HasherBusy("8 password hashes already pending")
+
+    monkeypatch.setattr(food_app.hasher, "verify", busy)
+    response = client.post("/login", data={"username": "alice", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
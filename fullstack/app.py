@@ -1,67 +1,42 @@
 # app.py
 
+import os
 import sqlite3
-from flask import Flask, jsonify, request, g
+import sys
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.metrics import Metrics, TimedConnection  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+from app_common.task_repository import MemoryTaskRepository, SQLiteTaskRepository  # noqa: E402
+from app_common.task_routes import TaskRoutes  # noqa: E402
 
 app = Flask(__name__, static_folder='static', static_url_path='')
+metrics = Metrics(app, name='fullstack')
 DATABASE = 'todo.db'
+# WAL, pragmas and pool size can be tuned with SQLITE_* env vars (see app_common/sqlite_pool.py)
+pool = SQLitePool.from_env(DATABASE, factory=TimedConnection)
+task_cache = SnapshotCache('tasks')
+task_cache.register_metrics(metrics)
 
 # --- Database Helper Functions ---
-def get_db():
-    db = getattr(g, '_database', None)
-    if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row # Allows accessing columns by name
-    return db
-
-@app.teardown_appcontext
-def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
-
-def init_db():
-    with app.app_context():
-        db = get_db()
-        with app.open_resource('schema.sql', mode='r') as f:
-            db.cursor().executescript(f.read())
-        db.commit()
+# Routes go through a task repository; TASKS_BACKEND=memory keeps the tasks
+# in a dict instead of todo.db (see app_common/task_repository.py)
+if os.environ.get('TASKS_BACKEND', 'sqlite') == 'memory':
+    tasks = MemoryTaskRepository(on_change=task_cache.invalidate)
+else:
+    tasks = SQLiteTaskRepository(pool, on_change=task_cache.invalidate)
 
 # --- API Routes ---
-@app.route('/api/tasks', methods=['GET'])
-def get_tasks():
-    db = get_db()
-    cursor = db.execute('SELECT * FROM tasks ORDER BY id')
-    tasks = [dict(row) for row in cursor.fetchall()]
-    return jsonify(tasks)
+# GET/POST/PUT/DELETE /api/tasks and /api/tasks/batch, with cached pages
+# (see app_common/task_routes.py); tests and benchmarks swap routes.tasks
+routes = TaskRoutes(tasks, cache=task_cache)
+app.register_blueprint(routes.blueprint)
 
-@app.route('/api/tasks', methods=['POST'])
-def add_task():
-    new_task = request.json
-    db = get_db()
-    db.execute('INSERT INTO tasks (text, completed) VALUES (?, ?)', 
-               [new_task['text'], False])
-    db.commit()
-    # Return the last inserted task for confirmation
-    cursor = db.execute('SELECT * FROM tasks WHERE id = last_insert_rowid()')
-    created_task = dict(cursor.fetchone())
-    return jsonify(created_task), 201
-
-@app.route('/api/tasks/<int:task_id>', methods=['PUT'])
-def update_task(task_id):
-    update_data = request.json
-    db = get_db()
-    db.execute('UPDATE tasks SET completed = ? WHERE id = ?', 
-               [update_data['completed'], task_id])
-    db.commit()
-    return jsonify({'message': 'Task updated successfully'})
-
-@app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
-def delete_task(task_id):
-    db = get_db()
-    db.execute('DELETE FROM tasks WHERE id = ?', [task_id])
-    db.commit()
-    return jsonify({'message': 'Task deleted successfully'})
+def init_db():
+    with app.open_resource('schema.sql', mode='r') as f:
+        routes.tasks.create_schema(f.read())
 
 # --- Serve Frontend ---
 @app.route('/')
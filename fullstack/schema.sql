@@ -5,4 +5,7 @@ CREATE TABLE tasks (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   text TEXT NOT NULL,
   completed BOOLEAN NOT NULL CHECK (completed IN (0, 1))
-);
\ No newline at end of file
+);
+
+-- keyset pagination filtered by status: WHERE completed = ? AND id > ? ORDER BY id
+CREATE INDEX idx_tasks_completed_id ON tasks (completed, id);
@@ -1,8 +1,17 @@
 # utils/db_manager.py
+import os
 import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+from app_common.task_repository import SQLiteTaskRepository  # noqa: E402
 
 DATABASE_PATH = 'todo.db'
 
+# Same repository (and SQL) as the app under test; one connection is kept open between calls
+tasks = SQLiteTaskRepository(SQLitePool(DATABASE_PATH, size=1))
+
 def query_db(query, args=(), one=False):
     """A generic function to query the database."""
     conn = sqlite3.connect(DATABASE_PATH)
@@ -15,14 +24,8 @@ def query_db(query, args=(), one=False):
 
 def get_task_by_text(task_text):
     """Fetches a single task from the DB by its text content."""
-    task = query_db("SELECT * FROM tasks WHERE text = ?", [task_text], one=True)
-    return task
+    return tasks.find_by_text(task_text)
 
 def clear_all_tasks():
     """Deletes all tasks from the database."""
-    # We need a separate connection for writing/deleting
-    conn = sqlite3.connect(DATABASE_PATH)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM tasks")
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    tasks.clear()
@@ -1,7 +1,13 @@
 # app.py
 
-import mysql.connector
-from flask import Flask, jsonify, request, g
+import os
+import sys
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.mysql_pool import MySQLPool  # noqa: E402
+from app_common.task_repository import MemoryTaskRepository, MySQLTaskRepository  # noqa: E402
+from app_common.task_routes import TaskRoutes  # noqa: E402
 
 app = Flask(__name__, static_folder='static', static_url_path='')
 
@@ -10,77 +16,31 @@ app = Flask(__name__, static_folder='static', static_url_path='')
 DB_CONFIG = {
     'user': 'root',
     'password': 'your_mysql_root_password', # <-- CHANGE THIS
-    'host': '127.0.0.1',
+    'host': os.environ.get('MYSQL_HOST', '127.0.0.1'),
+    'port': int(os.environ.get('MYSQL_PORT', '3306')),
     'database': 'todo_db' # We will create this database
 }
 
-# --- Database Helper Functions (Updated for MySQL) ---
-def get_db():
-    db = getattr(g, '_database', None)
-    if db is None:
-        db = g._database = mysql.connector.connect(**DB_CONFIG)
-    return db
-
-@app.teardown_appcontext
-def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
-
-# --- API Routes (Updated with MySQL syntax) ---
-@app.route('/api/tasks', methods=['GET'])
-def get_tasks():
-    db = get_db()
-    # Using dictionary=True makes the results behave like Python dicts
-    cursor = db.cursor(dictionary=True)
-    cursor.execute('SELECT * FROM tasks ORDER BY id')
-    tasks = cursor.fetchall()
-    cursor.close()
-    return jsonify(tasks)
-
-@app.route('/api/tasks', methods=['POST'])
-def add_task():
-    new_task = request.json
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    # MySQL uses '%s' as a placeholder, not '?'
-    sql = "INSERT INTO tasks (text, completed) VALUES (%s, %s)"
-    val = (new_task['text'], False)
-    cursor.execute(sql, val)
-    db.commit()
-    
-    # Get the ID of the task we just created
-    created_task_id = cursor.lastrowid
-    
-    # Fetch the newly created task to return it
-    cursor.execute("SELECT * FROM tasks WHERE id = %s", (created_task_id,))
-    created_task = cursor.fetchone()
-    cursor.close()
-    
-    return jsonify(created_task), 201
-
-@app.route('/api/tasks/<int:task_id>', methods=['PUT'])
-def update_task(task_id):
-    update_data = request.json
-    db = get_db()
-    cursor = db.cursor()
-    sql = "UPDATE tasks SET completed = %s WHERE id = %s"
-    val = (update_data['completed'], task_id)
-    cursor.execute(sql, val)
-    db.commit()
-    cursor.close()
-    return jsonify({'message': 'Task updated successfully'})
-
-@app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
-def delete_task(task_id):
-    db = get_db()
-    cursor = db.cursor()
-    sql = "DELETE FROM tasks WHERE id = %s"
-    val = (task_id,)
-    cursor.execute(sql, val)
-    db.commit()
-    cursor.close()
-    return jsonify({'message': 'Task deleted successfully'})
+# --- Task storage ---
+# The routes go through a task repository (app_common/task_repository.py) on
+# a bounded pool of at most MYSQL_POOL_SIZE connections (default 8), opened as
+# needed and health-checked on reuse; see app_common/mysql_pool.py for the
+# MYSQL_POOL_* settings. TASKS_BACKEND=memory runs without a MySQL server.
+if os.environ.get('TASKS_BACKEND', 'mysql') == 'memory':
+    tasks = MemoryTaskRepository()
+else:
+    tasks = MySQLTaskRepository(MySQLPool.from_env(DB_CONFIG))
+
+# --- API Routes ---
+# The task list is streamed: rows come off an unbuffered cursor
+# routes.stream_batch_size (500) at a time and are sent as they are
+# encoded, so neither the driver nor the app holds the whole table.
+# ?stream=ndjson (or Accept: application/x-ndjson) sends one task per line
+# instead of an array. Batch endpoints run one transaction per request: the
+# inserts go out as one multi-row INSERT, updates and deletes as
+# WHERE id IN (...) statements. See app_common/task_routes.py.
+routes = TaskRoutes(tasks)
+app.register_blueprint(routes.blueprint)
 
 # --- Serve Frontend ---
 @app.route('/')
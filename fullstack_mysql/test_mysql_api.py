@@ -0,0 +1,79 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "tools"))
+from app_common.mysql_pool import MySQLPool  # noqa: E402
+from mysql_stub import MySQLStub  # noqa: E402
+from app_common.task_repository import MySQLTaskRepository  # noqa: E402
+
+
+def load_app():
+    # imported by path: fullstack_sqlite/app.py is also called "app"
+    spec = importlib.util.spec_from_file_location("fullstack_mysql_app", os.path.join(HERE, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+todo_app = load_app()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    with MySQLStub(str(tmp_path / "stub.db")) as stub:
+        pool = MySQLPool.from_config(dict(todo_app.DB_CONFIG, port=stub.port), size=2)
+        tasks = MySQLTaskRepository(pool)
+        with open(os.path.join(HERE, "schema.sql")) as f:
+            tasks.create_schema(f.read())
+        monkeypatch.setattr(todo_app.routes, "tasks", tasks)
+        monkeypatch.setattr(todo_app.routes, "stream_batch_size", 3)
+        client = todo_app.app.test_client()
+        client.pool = pool
+        yield client
+        pool.close()
+
+
+def test_crud_round_trip(client):
+    created = client.post("/api/tasks", json={"text": "it's \\ done"})
+    assert created.status_code == 201
+    assert created.get_json() == {"id": 1, "text": "it's \\ done", "completed": 0}
+    client.put("/api/tasks/1", json={"completed": True})
+    assert client.get("/api/tasks").get_json() == [{"id": 1, "text": "it's \\ done", "completed": 1}]
+    client.delete("/api/tasks/1")
+    assert client.get("/api/tasks").get_json() == []
+    assert client.pool.stats()["opened"] == 1
+
+
+def test_list_is_streamed_in_batches(client):
+    client.post("/api/tasks/batch", json=[{"text": f"t{i}"} for i in range(8)])
+    response = client.get("/api/tasks")
+    assert response.is_streamed
+    assert [t["id"] for t in response.get_json()] == list(range(1, 9))
+    ndjson = client.get("/api/tasks?stream=ndjson").get_data(as_text=True)
+    assert [json.loads(line)["text"] for line in ndjson.splitlines()] == [f"t{i}" for i in range(8)]
+
+    abandoned = client.get("/api/tasks")
+    next(abandoned.response)  # the client reads one chunk and goes away
+    abandoned.close()
+    assert client.pool.stats()["discarded"] == 1
+    assert len(client.get("/api/tasks").get_json()) == 8
+
+
+def test_batch_writes(client):
+    ids = [t["id"] for t in client.post("/api/tasks/batch", json=[{"text": f"b{i}"} for i in range(5)]).get_json()]
+    assert ids == [1, 2, 3, 4, 5]
+    updates = [{"id": i, "completed": True} for i in ids[:3] + [99]]
+    updated = client.put("/api/tasks/batch", json=updates)
+    assert updated.get_json()["updated"] == 3
+    assert client.delete("/api/tasks/batch", json=ids[2:]).get_json()["deleted"] == 3
+    assert [(t["id"], t["completed"]) for t in client.get("/api/tasks").get_json()] == [(1, 1), (2, 1)]
+    assert client.post("/api/tasks/batch", json=[{"text": 5}]).status_code == 400
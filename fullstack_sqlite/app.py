@@ -1,62 +1,44 @@
 #!/usr/bin/env python3
+import os
 import sqlite3
-from flask import Flask, jsonify, request, g
+import sys
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.group_commit import GroupCommitWriter  # noqa: E402
+from app_common.metrics import Metrics, TimedConnection  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+from app_common.task_repository import MemoryTaskRepository, SQLiteTaskRepository  # noqa: E402
+from app_common.task_routes import TaskRoutes  # noqa: E402
 
 app = Flask(__name__, static_folder='static', static_url_path='')
+metrics = Metrics(app, name='fullstack_sqlite')
 DATABASE = 'fullstack_sqlite.db'
-
-def get_db():
-    db = getattr(g, '_database', None)
-    if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
-    return db
-
-@app.teardown_appcontext
-def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+pool = SQLitePool.from_env(DATABASE, factory=TimedConnection)
+task_cache = SnapshotCache('tasks')
+task_cache.register_metrics(metrics)
+# POST /api/tasks goes through one writer thread that commits concurrent inserts together;
+# TASKS_GROUP_COMMIT=0 restores the per-request INSERT + commit.
+GROUP_COMMIT = os.environ.get('TASKS_GROUP_COMMIT', '1') != '0'
+writer = GroupCommitWriter(pool.connect,
+                           max_batch=int(os.environ.get('GROUP_COMMIT_MAX_BATCH', '64')),
+                           max_wait=float(os.environ.get('GROUP_COMMIT_MAX_WAIT_MS', '1')) / 1000)
+writer.register_metrics(metrics)
+# TASKS_BACKEND=memory keeps the tasks in a dict instead of the database file
+# (see app_common/task_repository.py)
+if os.environ.get('TASKS_BACKEND', 'sqlite') == 'memory':
+    tasks = MemoryTaskRepository(on_change=task_cache.invalidate)
+else:
+    tasks = SQLiteTaskRepository(pool, writer=writer if GROUP_COMMIT else None, on_change=task_cache.invalidate)
+# GET/POST/PUT/DELETE /api/tasks, /api/tasks/search and /api/tasks/batch (see app_common/task_routes.py);
+# tests and benchmarks swap the repository through routes.tasks
+routes = TaskRoutes(tasks, cache=task_cache, search=True)
+app.register_blueprint(routes.blueprint)
 
 def init_db():
-    with app.app_context():
-        db = get_db()
-        with app.open_resource('schema.sql', mode='r') as f:
-            db.cursor().executescript(f.read())
-        db.commit()
-
-@app.route('/api/tasks', methods=['GET'])
-def get_tasks():
-    db = get_db()
-    cursor = db.execute('SELECT * FROM tasks ORDER BY id')
-    tasks = [dict(row) for row in cursor.fetchall()]
-    return jsonify(tasks)
-
-@app.route('/api/tasks', methods=['POST'])
-def add_task():
-    new_task = request.json or {}
-    text = new_task.get('text', 'unnamed task')
-    db = get_db()
-    db.execute('INSERT INTO tasks (text, completed) VALUES (?, ?)', [text, False])
-    db.commit()
-    cursor = db.execute('SELECT * FROM tasks WHERE id = last_insert_rowid()')
-    created = cursor.fetchone()
-    return jsonify(dict(created)), 201
-
-@app.route('/api/tasks/<int:task_id>', methods=['PUT'])
-def update_task(task_id):
-    update_data = request.json or {}
-    db = get_db()
-    db.execute('UPDATE tasks SET completed = ? WHERE id = ?', [update_data.get('completed', False), task_id])
-    db.commit()
-    return jsonify({'message': 'Task updated successfully'})
-
-@app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
-def delete_task(task_id):
-    db = get_db()
-    db.execute('DELETE FROM tasks WHERE id = ?', [task_id])
-    db.commit()
-    return jsonify({'message': 'Task deleted successfully'})
+    with app.open_resource('schema.sql', mode='r') as f:
+        routes.tasks.create_schema(f.read())
 
 @app.route('/')
 def index():
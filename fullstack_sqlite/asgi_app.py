@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import mimetypes
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.group_commit import GroupCommitWriter  # noqa: E402
+from app_common.snapshot_cache import SnapshotCache  # noqa: E402
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+from app_common.task_api import (STREAM_BATCH_SIZE, ApiError, batch_ids, batch_texts,  # noqa: E402
+                                 batch_updates, dumps, parse_search_query, parse_task_query,
+                                 stream_chunks, stream_format, task_list, task_search)
+from app_common.task_repository import MemoryTaskRepository, SQLiteTaskRepository, WRITE_TIMEOUT  # noqa: E402
+
+"""
+asyncio-native (ASGI) variant of the todo API in app.py.
+
+Run it under any ASGI server, from this folder:
+
+  pip install uvicorn
+  uvicorn asgi_app:app --port 5005          # or: python asgi_app.py
+
+Same routes and JSON as app.py (both parse, cache and encode through
+app_common.task_api): GET/POST /api/tasks (after_id, limit,
+completed, fields, stream, ETag/If-None-Match), GET /api/tasks/search (q,
+limit, completed, fields), PUT/DELETE /api/tasks/<id>, POST/PUT/DELETE
+/api/tasks/batch, and the static
+frontend at /. No framework: the routes are a handful, and plain ASGI
+keeps the per-request overhead to the JSON encoding and the SQL.
+
+The event loop never touches SQLite. Reads and batch writes go through the
+same task repository as app.py (app_common.task_repository) on a
+ThreadPoolExecutor of TODO_DB_WORKERS threads (default 8) using the pooled
+WAL connections from app_common.sqlite_pool, so a thousand open
+connections cost a thousand small coroutines, not a thousand threads, and
+at most TODO_DB_WORKERS queries run at once. Single inserts go through the
+GroupCommitWriter and are awaited via asyncio.wrap_future, without holding
+a pool thread while the commit happens. TASKS_BACKEND=memory serves the
+tasks from memory instead, as with app.py.
+
+The database is TODO_DATABASE (default fullstack_sqlite.db in the working
+directory). Unlike `python app.py`, startup only creates the schema when
+the tasks table is missing; it does not wipe existing tasks.
+"""
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DATABASE = os.environ.get('TODO_DATABASE', 'fullstack_sqlite.db')
+DB_WORKERS = int(os.environ.get('TODO_DB_WORKERS', '8'))
+BACKEND = os.environ.get('TASKS_BACKEND', 'sqlite')
+
+
+
+def etag_matches(header, etag):
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/').strip('"') == etag:
+            return True
+    return False
+
+
+class TodoApp:
+    def __init__(self, database=DATABASE, db_workers=DB_WORKERS, backend=BACKEND):
+        self.pool = SQLitePool.from_env(database)
+        self.executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix='todo-db')
+        self.cache = SnapshotCache('tasks')
+        self.writer = GroupCommitWriter(self.pool.connect,
+                                        max_batch=int(os.environ.get('GROUP_COMMIT_MAX_BATCH', '64')),
+                                        max_wait=float(os.environ.get('GROUP_COMMIT_MAX_WAIT_MS', '1')) / 1000)
+        if backend == 'memory':
+            self.tasks = MemoryTaskRepository(on_change=self.cache.invalidate)
+        else:
+            self.tasks = SQLiteTaskRepository(self.pool, writer=self.writer, on_change=self.cache.invalidate)
+        self._static = {}
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    # --- Database ---
+
+    def init_db(self, reset=False):
+        if reset or not self.tasks.exists():
+            with open(os.path.join(BASE_DIR, 'schema.sql')) as f:
+                self.tasks.create_schema(f.read())
+        else:
+            self.tasks.track_changes()  # a file from before the counter existed
+
+    async def run_db(self, fn, *args):
+        """Run fn(*args) (a blocking repository call) on the DB thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _start_once(self):
+        with self._start_lock:
+            if not self._started:
+                self.init_db()
+                self._started = True
+
+    async def startup(self):
+        if not self._started:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._start_once)
+
+    def shutdown(self):
+        self.writer.close()
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+    # --- ASGI ---
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        await self.startup()
+        try:
+            await self.dispatch(scope, receive, send)
+        except ApiError as e:
+            await self.respond(send, e.status, dumps({'error': e.message}))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, send, status, body, content_type='application/json', headers=()):
+        head = [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+        head += [(k.encode(), v.encode()) for k, v in headers]
+        await send({'type': 'http.response.start', 'status': status, 'headers': head})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def read_json(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body = b''.join(chunks)
+        if not body:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise ApiError(400, 'request body is not valid JSON')
+
+    async def dispatch(self, scope, receive, send):
+        method, path = scope['method'], scope['path']
+        if path == '/api/tasks':
+            if method == 'GET':
+                return await self.get_tasks(scope, send)
+            if method == 'POST':
+                return await self.add_task(await self.read_json(receive), send)
+        elif path == '/api/tasks/search':
+            if method == 'GET':
+                return await self.search_tasks(scope, send)
+        elif path == '/api/tasks/batch':
+            handler = {'POST': self.add_tasks, 'PUT': self.update_tasks, 'DELETE': self.delete_tasks}.get(method)
+            if handler is not None:
+                return await handler(await self.read_json(receive), send)
+        elif path.startswith('/api/tasks/') and path[len('/api/tasks/'):].isdigit():
+            task_id = int(path[len('/api/tasks/'):])
+            if method == 'PUT':
+                return await self.update_task(task_id, await self.read_json(receive), send)
+            if method == 'DELETE':
+                return await self.delete_task(task_id, send)
+        elif method == 'GET':
+            return await self.static_file(path, send)
+        else:
+            raise ApiError(404, 'not found')
+        raise ApiError(405, 'method not allowed')
+
+    # --- API Routes ---
+
+    async def get_tasks(self, scope, send):
+        query, headers = self.query_and_headers(scope)
+        after_id, limit, completed, fields = parse_task_query(query.get)
+        accept = headers.get('accept', '')
+        fmt = stream_format(query.get('stream'), 'application/x-ndjson' in accept and 'application/json' not in accept)
+        if fmt:
+            batches = self.tasks.iter_batches(after_id, limit, completed, fields, STREAM_BATCH_SIZE)
+            return await self.stream(send, stream_chunks(batches, fields, fmt), fmt)
+        await self.send_cached(send, headers, task_list, self.tasks, self.cache, after_id, limit, completed, fields)
+
+    async def search_tasks(self, scope, send):
+        query, headers = self.query_and_headers(scope)
+        await self.send_cached(send, headers, task_search, self.tasks, self.cache, *parse_search_query(query.get))
+
+    def query_and_headers(self, scope):
+        """The query string (last value of each name) and the request headers, as dicts."""
+        query = {k: v[-1] for k, v in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+        headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        return query, headers
+
+    async def send_cached(self, send, headers, page, *args):
+        """Answer with page(*args) (task_list or task_search): 304 if If-None-Match has the ETag, else the body."""
+        body, etag, next_after_id = await self.run_db(page, *args)
+        extra = [('etag', f'"{etag}"')]
+        if next_after_id:
+            extra.append(('x-next-after-id', next_after_id))
+        if etag_matches(headers.get('if-none-match', ''), etag):
+            self.cache.record_not_modified()
+            head = [(k.encode(), v.encode()) for k, v in extra]
+            await send({'type': 'http.response.start', 'status': 304, 'headers': head})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await self.respond(send, 200, body, headers=extra)
+
+    async def stream(self, send, chunks, fmt):
+        """Send stream_chunks() as they are encoded on the DB pool; the first batch is read before the headers."""
+        try:
+            chunk = await self.run_db(next, chunks, '')
+            content_type = b'application/x-ndjson' if fmt == 'ndjson' else b'application/json'
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', content_type)]})
+            while chunk:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+                chunk = await self.run_db(next, chunks, '')
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await self.run_db(chunks.close)
+
+    async def add_task(self, body, send):
+        text = (body or {}).get('text', 'unnamed task')
+        future = self.tasks.submit_add(text)
+        if future is not None:
+            created = await asyncio.wait_for(asyncio.wrap_future(future), WRITE_TIMEOUT)
+        else:
+            created = await self.run_db(self.tasks.add, text)
+        await self.respond(send, 201, dumps(created))
+
+    async def update_task(self, task_id, body, send):
+        await self.run_db(self.tasks.set_completed, task_id, (body or {}).get('completed', False))
+        await self.respond(send, 200, dumps({'message': 'Task updated successfully'}))
+
+    async def delete_task(self, task_id, send):
+        await self.run_db(self.tasks.delete, task_id)
+        await self.respond(send, 200, dumps({'message': 'Task deleted successfully'}))
+
+    # Batch endpoints: one transaction and one commit for the whole array.
+    async def add_tasks(self, body, send):
+        await self.respond(send, 201, dumps(await self.run_db(self.tasks.add_many, batch_texts(body))))
+
+    async def update_tasks(self, body, send):
+        updated = await self.run_db(self.tasks.set_completed_many, batch_updates(body))
+        await self.respond(send, 200, dumps({'message': 'Tasks updated successfully', 'updated': updated}))
+
+    async def delete_tasks(self, body, send):
+        deleted = await self.run_db(self.tasks.delete_many, batch_ids(body))
+        await self.respond(send, 200, dumps({'message': 'Tasks deleted successfully', 'deleted': deleted}))
+
+    # --- Serve Frontend ---
+
+    async def static_file(self, path, send):
+        name = 'index.html' if path == '/' else path.lstrip('/')
+        full = os.path.realpath(os.path.join(STATIC_DIR, name))
+        if not full.startswith(STATIC_DIR + os.sep) or not os.path.isfile(full):
+            raise ApiError(404, 'not found')
+        body = self._static.get(full)
+        if body is None:
+            with open(full, 'rb') as f:
+                body = self._static[full] = f.read()
+        content_type = mimetypes.guess_type(full)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+        await self.respond(send, 200, body, content_type=content_type)
+
+
+app = TodoApp()
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('asgi_app.py needs an ASGI server: pip install uvicorn')
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', '5005')))
@@ -1,4 +1,5 @@
 -- schema.sql for fullstack_sqlite
+DROP TABLE IF EXISTS tasks_fts;
 DROP TABLE IF EXISTS tasks;
 
 CREATE TABLE tasks (
@@ -6,3 +7,26 @@ CREATE TABLE tasks (
   text TEXT NOT NULL,
   completed BOOLEAN NOT NULL CHECK (completed IN (0, 1))
 );
+
+-- keyset pagination filtered by status: WHERE completed = ? AND id > ? ORDER BY id
+CREATE INDEX idx_tasks_completed_id ON tasks (completed, id);
+
+-- full-text index for GET /api/tasks/search. External content: the text is
+-- stored once, in tasks, and the triggers below keep the index in step
+-- with every insert, delete and text change. prefix='2 3' adds prefix
+-- indexes, so short prefix queries (wr*, wri*) don't expand over the
+-- whole vocabulary.
+CREATE VIRTUAL TABLE tasks_fts USING fts5(text, content='tasks', content_rowid='id', prefix='2 3');
+
+CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+  INSERT INTO tasks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+  INSERT INTO tasks_fts (tasks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE TRIGGER tasks_fts_update AFTER UPDATE OF text ON tasks BEGIN
+  INSERT INTO tasks_fts (tasks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+  INSERT INTO tasks_fts (rowid, text) VALUES (new.id, new.text);
+END;
@@ -5,14 +5,23 @@ document.addEventListener('DOMContentLoaded', () => {
     const addTaskBtn = document.getElementById('addTaskBtn');
     const taskList = document.getElementById('taskList');
 
+    const PAGE_SIZE = 200;
+
     // --- Load existing tasks from the backend when the page loads ---
+    // Tasks are fetched one page at a time (keyset pagination on id) and
+    // rendered as each page arrives, so a large table doesn't stall the page.
     async function loadTasks() {
-        const response = await fetch('/api/tasks');
-        const tasks = await response.json();
         taskList.innerHTML = ''; // Clear the list before rendering
-        tasks.forEach(task => {
-            renderTask(task);
-        });
+        let afterId = 0;
+        while (afterId !== null) {
+            const response = await fetch(`/api/tasks?after_id=${afterId}&limit=${PAGE_SIZE}`);
+            if (!response.ok) break;
+            const tasks = await response.json();
+            tasks.forEach(task => {
+                renderTask(task);
+            });
+            afterId = response.headers.get('X-Next-After-Id');
+        }
     }
 
     // --- Render a single task to the page ---
@@ -0,0 +1,174 @@
+import json
+import sqlite3
+
+import pytest
+
+import app as todo_app
+from app_common.task_repository import MemoryTaskRepository
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def client(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        monkeypatch.setattr(todo_app.routes, "tasks", MemoryTaskRepository(on_change=todo_app.task_cache.invalidate))
+    todo_app.DATABASE = str(tmp_path / "tasks.db")
+    todo_app.pool.reset(todo_app.DATABASE)
+    todo_app.init_db()
+    cache = todo_app.task_cache
+    cache.hits = cache.misses = cache.not_modified = 0
+    yield todo_app.app.test_client()
+    todo_app.writer.close()
+    todo_app.pool.reset()
+
+
+def add_tasks(client, n):
+    for i in range(n):
+        client.post("/api/tasks", json={"text": f"task {i}"})
+
+
+def test_crud_round_trip(client):
+    created = client.post("/api/tasks", json={"text": "write tests"})
+    assert created.status_code == 201
+    task = created.get_json()
+    assert task == {"id": 1, "text": "write tests", "completed": 0}
+    client.put(f"/api/tasks/{task['id']}", json={"completed": True})
+    assert client.get("/api/tasks").get_json() == [{"id": 1, "text": "write tests", "completed": 1}]
+    client.delete(f"/api/tasks/{task['id']}")
+    assert client.get("/api/tasks").get_json() == []
+
+
+def test_keyset_pages_cover_every_task_once(client):
+    add_tasks(client, 25)
+    seen, after_id = [], 0
+    while after_id is not None:
+        response = client.get(f"/api/tasks?after_id={after_id}&limit=10")
+        page = response.get_json()
+        assert len(page) <= 10
+        seen += [t["id"] for t in page]
+        after_id = response.headers.get("X-Next-After-Id")
+    assert seen == list(range(1, 26))
+
+
+def test_filter_and_projection(client):
+    add_tasks(client, 6)
+    for task_id in (2, 4, 6):
+        client.put(f"/api/tasks/{task_id}", json={"completed": True})
+    done = client.get("/api/tasks?completed=true&fields=text&limit=2")
+    assert done.get_json() == [{"text": "task 1"}, {"text": "task 3"}]
+    assert done.headers["X-Next-After-Id"] == "4"
+    rest = client.get("/api/tasks?completed=true&fields=text&after_id=4&limit=2")
+    assert rest.get_json() == [{"text": "task 5"}]
+    assert "X-Next-After-Id" not in rest.headers
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=abc", "after_id=-1", "completed=maybe", "fields=id,secret"])
+def test_bad_query_is_a_json_400(client, query):
+    response = client.get(f"/api/tasks?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_batch_create_update_delete(client):
+    created = client.post("/api/tasks/batch", json=[{"text": f"bulk {i}"} for i in range(5)])
+    assert created.status_code == 201
+    tasks = created.get_json()
+    assert [t["text"] for t in tasks] == [f"bulk {i}" for i in range(5)]
+    ids = [t["id"] for t in tasks]
+
+    updated = client.put("/api/tasks/batch", json=[{"id": i, "completed": True} for i in ids[:3]])
+    assert updated.get_json()["updated"] == 3
+    assert [t["id"] for t in client.get("/api/tasks?completed=true").get_json()] == ids[:3]
+
+    deleted = client.delete("/api/tasks/batch", json=ids[1:])
+    assert deleted.get_json()["deleted"] == 4
+    assert [t["id"] for t in client.get("/api/tasks").get_json()] == ids[:1]
+
+
+def test_invalid_batch_changes_nothing(client):
+    assert client.post("/api/tasks/batch", json=[{"text": "ok"}, {"text": 5}]).status_code == 400
+    assert client.post("/api/tasks/batch", json=[]).status_code == 400
+    assert client.put("/api/tasks/batch", json=[{"id": "1", "completed": True}]).status_code == 400
+    assert client.get("/api/tasks").get_json() == []
+
+
+def test_streamed_list_matches_buffered(client, monkeypatch):
+    monkeypatch.setattr(todo_app.routes, "stream_batch_size", 3)
+    client.post("/api/tasks/batch", json=[{"text": f"t{i}"} for i in range(8)])
+    expected = client.get("/api/tasks?completed=false").get_json()
+
+    array = client.get("/api/tasks?completed=false&stream=1")
+    assert array.is_streamed and array.mimetype == "application/json"
+    assert array.get_json() == expected
+
+    ndjson = client.get("/api/tasks?completed=false&fields=id,text", headers={"Accept": "application/x-ndjson"})
+    assert ndjson.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    assert lines == [{"id": t["id"], "text": t["text"]} for t in expected]
+
+    page = client.get("/api/tasks?stream=ndjson&after_id=2&limit=4").get_data(as_text=True)
+    assert [json.loads(line)["id"] for line in page.splitlines()] == [3, 4, 5, 6]
+    assert client.get("/api/tasks?stream=1&after_id=100").get_json() == []
+
+
+def test_search_ranks_matches_and_follows_writes(client):
+    client.post("/api/tasks/batch", json=[{"text": t} for t in [
+        "Write the release notes", "write tests", "Review the tests for the writer", "buy milk"]])
+    found = client.get("/api/tasks/search?q=tests").get_json()
+    assert [t["text"] for t in found] == ["write tests", "Review the tests for the writer"]
+    assert [t["id"] for t in client.get("/api/tasks/search?q=writ*").get_json()] == [2, 1, 3]
+    assert client.get("/api/tasks/search?q=write%20milk").get_json() == []
+    assert client.get('/api/tasks/search?q=tests"%20OR%20milk').get_json() == []  # no FTS5 syntax injection
+
+    client.put("/api/tasks/2", json={"completed": True})
+    assert client.get("/api/tasks/search?q=tests&completed=false&fields=text").get_json() == [
+        {"text": "Review the tests for the writer"}]
+    client.delete("/api/tasks/3")
+    assert [t["id"] for t in client.get("/api/tasks/search?q=tests").get_json()] == [2]
+    assert client.get("/api/tasks/search?q=%20").status_code == 400
+
+
+def test_task_list_is_cached_until_a_write(client):
+    add_tasks(client, 3)
+    first = client.get("/api/tasks")
+    etag = first.headers["ETag"]
+    assert client.get("/api/tasks").data == first.data
+    revalidated = client.get("/api/tasks", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.headers["ETag"] == etag
+    assert todo_app.task_cache.stats()["hits"] == 2
+
+    client.put("/api/tasks/1", json={"completed": True})
+    changed = client.get("/api/tasks", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.get_json()[0]["completed"] == 1
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'app_cache_requests_total{app="fullstack_sqlite",cache="tasks",result="not_modified"} 1' in metrics
+
+
+def test_writes_from_another_process_reach_the_cached_list(client, request):
+    if request.node.callspec.params["client"] == "memory":
+        pytest.skip("the memory backend has no file another process could write")
+    add_tasks(client, 2)
+    etag = client.get("/api/tasks").headers["ETag"]
+    client.get("/api/tasks/search?q=task")
+    other = sqlite3.connect(todo_app.DATABASE)  # e.g. the JDBC plan or the E2E helpers
+    other.execute("INSERT INTO tasks (text, completed) VALUES ('from jdbc', 0)")
+    other.commit()
+    changed = client.get("/api/tasks", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.get_json()[-1]["text"] == "from jdbc"
+    assert [t["text"] for t in client.get("/api/tasks/search?q=jdbc").get_json()] == ["from jdbc"]
+    other.execute("DELETE FROM tasks")
+    other.commit()
+    other.close()
+    assert client.get("/api/tasks").get_json() == []
+
+
+def test_snapshot_built_across_a_write_is_not_stored(client):
+    cache = todo_app.task_cache
+
+    def build():
+        cache.invalidate()  # a write lands while the query is running
+        return b"[]", None
+
+    assert cache.get("key", build)[0] == b"[]"
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+import app as flask_app
+import asgi_app
+
+
+def call(app, method, path, body=None, headers=()):
+    """Drive one request through an ASGI app; returns (status, headers, body)."""
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+             "headers": [(k.lower().encode(), v.encode()) for k, v in headers]}
+    messages = [{"type": "http.request", "body": b"" if body is None else json.dumps(body).encode()}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return (start["status"], {k.decode(): v.decode() for k, v in start["headers"]},
+            b"".join(m.get("body", b"") for m in sent[1:]))
+
+
+@pytest.fixture
+def todo(tmp_path):
+    app = asgi_app.TodoApp(database=str(tmp_path / "asgi.db"), db_workers=2)
+    yield app
+    app.shutdown()
+
+
+@pytest.fixture
+def flask_client(tmp_path):
+    flask_app.DATABASE = str(tmp_path / "flask.db")
+    flask_app.pool.reset(flask_app.DATABASE)
+    flask_app.init_db()
+    yield flask_app.app.test_client()
+    flask_app.writer.close()
+    flask_app.pool.reset()
+
+
+def test_same_json_contract_as_flask(todo, flask_client):
+    script = [
+        ("POST", "/api/tasks", {"text": "first"}),
+        ("POST", "/api/tasks/batch", [{"text": f"bulk {i}"} for i in range(4)]),
+        ("PUT", "/api/tasks/2", {"completed": True}),
+        ("PUT", "/api/tasks/batch", [{"id": 3, "completed": True}]),
+        ("DELETE", "/api/tasks/4", None),
+        ("DELETE", "/api/tasks/batch", [5]),
+        ("GET", "/api/tasks", None),
+        ("GET", "/api/tasks?completed=true&fields=text&limit=1", None),
+        ("GET", "/api/tasks?limit=0", None),
+        ("GET", "/api/tasks/search?q=bul*", None),
+        ("GET", "/api/tasks/search?q=bulk%201&completed=true&fields=text", None),
+        ("GET", "/api/tasks/search?q=first&limit=1&fields=id", None),
+        ("GET", "/api/tasks/search?q=%20", None),
+        ("GET", "/api/tasks/search?q=bulk&limit=x", None),
+    ]
+    for method, path, body in script:
+        status, headers, data = call(todo, method, path, body, [("Content-Type", "application/json")])
+        expected = flask_client.open(path, method=method, json=body)
+        assert status == expected.status_code, path
+        assert json.loads(data) == expected.get_json(), path
+        assert headers.get("x-next-after-id") == expected.headers.get("X-Next-After-Id")
+        if method == "GET" and status == 200:
+            assert headers["etag"] == expected.headers["ETag"]
+
+
+def test_etag_stream_and_static(todo, tmp_path):
+    call(todo, "POST", "/api/tasks/batch", [{"text": f"t{i}"} for i in range(3)])
+    status, headers, _ = call(todo, "GET", "/api/tasks")
+    assert call(todo, "GET", "/api/tasks", headers=[("If-None-Match", headers["etag"])])[0] == 304
+    other = sqlite3.connect(str(tmp_path / "asgi.db"))  # a write the app's on_change never sees
+    other.execute("UPDATE tasks SET completed = 1")
+    other.commit()
+    other.close()
+    status, _, data = call(todo, "GET", "/api/tasks", headers=[("If-None-Match", headers["etag"])])
+    assert status == 200 and all(t["completed"] == 1 for t in json.loads(data))
+
+    status, headers, data = call(todo, "GET", "/api/tasks?stream=ndjson&fields=text")
+    assert headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in data.splitlines()] == [{"text": f"t{i}"} for i in range(3)]
+    assert len(json.loads(call(todo, "GET", "/api/tasks?stream=1")[2])) == 3
+
+    status, headers, data = call(todo, "GET", "/")
+    assert status == 200 and headers["content-type"].startswith("text/html") and b"<html" in data.lower()
+    assert call(todo, "GET", "/../app.py")[0] == 404
+    assert call(todo, "PATCH", "/api/tasks")[0] == 405
+    assert call(todo, "POST", "/api/tasks/search?q=t0")[0] == 405
+
+    # search results are cached and revalidated like the lists
+    status, headers, data = call(todo, "GET", "/api/tasks/search?q=t1")
+    assert status == 200 and json.loads(data) == [{"id": 2, "text": "t1", "completed": 1}]
+    assert call(todo, "GET", "/api/tasks/search?q=t1", headers=[("If-None-Match", headers["etag"])])[0] == 304
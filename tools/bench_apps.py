@@ -0,0 +1,232 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.task_repository import MemoryTaskRepository  # noqa: E402
+
+"""
+In-process microbenchmarks for the Flask demo apps.
+
+Usage:
+  python bench_apps.py [--size 1000] [--iterations 500] [--budget 3]
+                       [--apps bookstore,food_ordering,fullstack,fullstack_sqlite]
+                       [--backend sqlite|memory] [--json results.json] [--compare previous.json]
+
+Each app is imported from its app.py, pointed at a fresh SQLite database in
+a temporary directory, seeded with --size rows (books, menu items or tasks)
+and driven through Flask's test client, so the numbers are server-side cost
+per route without any TCP or client overhead.
+
+Every route runs --iterations times (after a short warm-up), or until it
+has used --budget seconds, whichever comes first. The report lists ops/sec
+and p50/p90/p99/max latency per route. Results are written as JSON
+(bench_results/apps-<timestamp>.json by default) together with the git
+commit and Python version; --compare prints the ops/sec change against an
+earlier results file.
+
+--backend memory swaps the todo apps' task repository for
+MemoryTaskRepository, which prices the Flask routes, JSON and caching
+without SQLite; the difference to the default run is the storage cost.
+
+POST /login verifies a password hashed with the app's own hasher, so it
+prices whatever PASSWORD_HASH_PROFILE / PASSWORD_HASH_METHOD select
+(werkzeug's scrypt by default, or the cheap loadtest profile).
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ["bookstore", "food_ordering", "fullstack", "fullstack_sqlite"]
+BENCH_USER, BENCH_PASSWORD = "bench", "bench-password"
+WARMUP = 10
+MIN_ITERATIONS = 5
+
+
+def load_app(name: str):
+    """Import <name>/app.py under a unique module name."""
+    path = os.path.join(ROOT, name, "app.py")
+    spec = importlib.util.spec_from_file_location(f"bench_{name}_app", path)
+    module = importlib.util.module_from_spec(spec)
+    # Flask resolves templates/ and static/ through sys.modules[import_name]
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.app.testing = True
+    return module
+
+
+def setup_bookstore(module, db_path: str, size: int, backend: str = "sqlite"):
+    module.DB_PATH = db_path
+    module.init_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM books")
+    conn.executemany("INSERT INTO books(id, title, author, price) VALUES (?, ?, ?, ?)",
+                     ((i, f"Book {i}", f"Author {i % 97}", 5 + i % 50) for i in range(1, size + 1)))
+    conn.execute("INSERT INTO users(username, password_hash) VALUES (?, ?)",
+                 (BENCH_USER, module.hasher.hash(BENCH_PASSWORD)))
+    conn.commit()
+    conn.close()
+    login = {"data": {"username": BENCH_USER, "password": BENCH_PASSWORD}}
+    return [
+        ("GET /", "GET", lambda i: "/", None),
+        ("GET /catalogue", "GET", lambda i: "/catalogue", None),
+        ("POST /login", "POST", lambda i: "/login", lambda i: login),
+    ]
+
+
+def setup_food_ordering(module, db_path: str, size: int, backend: str = "sqlite"):
+    module.DB_PATH = db_path
+    module.init_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM menu")
+    conn.executemany("INSERT INTO menu(id, name, price) VALUES (?, ?, ?)",
+                     ((i, f"Dish {i}", 3 + i % 20) for i in range(1, size + 1)))
+    conn.execute("INSERT INTO users(username, password_hash) VALUES (?, ?)",
+                 (BENCH_USER, module.hasher.hash(BENCH_PASSWORD)))
+    conn.commit()
+    conn.close()
+    login = {"data": {"username": BENCH_USER, "password": BENCH_PASSWORD}}
+    return [
+        ("GET /menu", "GET", lambda i: "/menu", None),
+        ("POST /order", "POST", lambda i: "/order",
+         lambda i: {"data": {"item_id": str(i % size + 1), "coupon": "FOOD10" if i % 2 else ""}}),
+        ("POST /pay", "POST", lambda i: "/pay", None),
+        ("POST /login", "POST", lambda i: "/login", lambda i: login),
+    ]
+
+
+def _setup_todo(module, db_path: str, size: int, backend: str = "sqlite"):
+    module.DATABASE = db_path
+    module.pool.reset(db_path)
+    if backend == "memory":
+        module.routes.tasks = MemoryTaskRepository(on_change=module.task_cache.invalidate)
+    module.init_db()
+    created = module.routes.tasks.add_many([f"Seed task {i}" for i in range(size)])
+    module.routes.tasks.set_completed_many([(task["id"], True) for task in created[::3]])
+    return [
+        ("GET /api/tasks", "GET", lambda i: "/api/tasks", None),
+        ("POST /api/tasks", "POST", lambda i: "/api/tasks", lambda i: {"json": {"text": f"Bench task {i}"}}),
+        ("PUT /api/tasks/<id>", "PUT", lambda i: f"/api/tasks/{i % size + 1}",
+         lambda i: {"json": {"completed": bool(i % 2)}}),
+        ("DELETE /api/tasks/<id>", "DELETE", lambda i: f"/api/tasks/{i + 1}", None),
+    ]
+
+
+SETUP = {
+    "bookstore": setup_bookstore,
+    "food_ordering": setup_food_ordering,
+    "fullstack": _setup_todo,
+    "fullstack_sqlite": _setup_todo,
+}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def bench_route(client, method: str, path_fn, kwargs_fn, iterations: int, budget: float) -> dict:
+    for i in range(WARMUP):
+        client.open(path_fn(i), method=method, **(kwargs_fn(i) if kwargs_fn else {}))
+    timings = []
+    errors = 0
+    deadline = time.perf_counter() + budget
+    for i in range(WARMUP, WARMUP + iterations):
+        path = path_fn(i)
+        kwargs = kwargs_fn(i) if kwargs_fn else {}
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        timings.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+        if len(timings) >= MIN_ITERATIONS and time.perf_counter() > deadline:
+            break
+    timings.sort()
+    total = sum(timings)
+    return {
+        "iterations": len(timings),
+        "errors": errors,
+        "ops_per_sec": round(len(timings) / total, 1),
+        "mean_ms": round(1000 * total / len(timings), 3),
+        **{f"p{p}_ms": round(1000 * percentile(timings, p), 3) for p in (50, 90, 99)},
+        "max_ms": round(1000 * timings[-1], 3),
+    }
+
+
+def bench_app(name: str, size: int, iterations: int, budget: float, backend: str = "sqlite") -> dict:
+    module = load_app(name)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        routes = SETUP[name](module, os.path.join(tmp, f"{name}.db"), size, backend)
+        client = module.app.test_client()
+        if name == "food_ordering":
+            with client.session_transaction() as session:
+                session["user"] = BENCH_USER
+        for label, method, path_fn, kwargs_fn in routes:
+            results[label] = bench_route(client, method, path_fn, kwargs_fn, iterations, budget)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, previous: dict = None) -> None:
+    print(f"{'app':<18} {'route':<24} {'ops/s':>9} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'err':>4}"
+          + ("  vs prev" if previous else ""))
+    for app_name, routes in results.items():
+        for label, r in routes.items():
+            line = (f"{app_name:<18} {label:<24} {r['ops_per_sec']:>9.1f} {r['mean_ms']:>8.3f} {r['p50_ms']:>8.3f} "
+                    f"{r['p90_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['max_ms']:>8.3f} {r['errors']:>4}")
+            old = (previous or {}).get(app_name, {}).get(label)
+            if old:
+                line += f"  {100 * (r['ops_per_sec'] - old['ops_per_sec']) / old['ops_per_sec']:+7.1f}%"
+            print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Flask demo apps in-process.")
+    parser.add_argument("--apps", default=",".join(APPS), help="comma separated subset of: " + ", ".join(APPS))
+    parser.add_argument("--size", type=int, default=1000, help="rows seeded into the main table (default: 1000)")
+    parser.add_argument("--iterations", type=int, default=500, help="requests per route (default: 500)")
+    parser.add_argument("--budget", type=float, default=3.0, help="max seconds per route (default: 3)")
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite",
+                        help="task storage for the todo apps (default: sqlite)")
+    parser.add_argument("--json", metavar="FILE", help="results file (default: bench_results/apps-<timestamp>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results file to compare ops/sec against")
+    args = parser.parse_args(argv)
+
+    apps = [a for a in args.apps.split(",") if a]
+    unknown = set(apps) - set(APPS)
+    if unknown:
+        parser.error("unknown app(s): " + ", ".join(sorted(unknown)))
+    results = {name: bench_app(name, args.size, args.iterations, args.budget, args.backend) for name in apps}
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+    print_results(results, previous)
+
+    out = args.json or os.path.join("bench_results", time.strftime("apps-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "commit": git_commit(),
+                   "python": platform.python_version(), "size": args.size, "iterations": args.iterations,
+                   "backend": args.backend, "results": results}, f, indent=1)
+        f.write("\n")
+    print(f"results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
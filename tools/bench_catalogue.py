@@ -0,0 +1,127 @@
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bench_apps import bench_route, load_app
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import book_catalogue  # noqa: E402
+
+"""
+Bookstore /catalogue page latency on a large inventory.
+
+Usage:
+  python bench_catalogue.py [--books 1000000] [--iterations 200] [--budget 3] [--skip-full]
+
+Seeds --books books (titles and authors from a Zipf-like vocabulary, 1% of
+them without author or price) into a fresh database, then runs the app's
+init_db(), which builds the sort indexes and the books_fts search index
+over the existing rows, and times GET /catalogue through the Flask test
+client for the scenarios below, with the page cache disabled so every
+request runs its queries and renders its page.
+
+"deep" pages start from a cursor 90% of the way through the sort order,
+which is what a client following Next links would send; with OFFSET the
+same page would read and skip the 900k rows before it.
+
+Unless --skip-full is given, the old behaviour (every book in one page,
+the query and template as they were before pagination) is timed once
+for comparison.
+"""
+
+WORDS = ("history art love guide world war life science python cooking garden city night house music data "
+         "design code sea star").split()
+
+
+def seed(path: str, books: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = list(WORDS) + ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(30000)]
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    authors = [f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}" for _ in range(20000)]
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT NOT NULL, author TEXT, price REAL)")
+    for start in range(1, books + 1, 50000):
+        conn.executemany("INSERT INTO books (id, title, author, price) VALUES (?, ?, ?, ?)", [
+            (i, " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 6))).title(),
+             None if rng.random() < 0.01 else rng.choice(authors),
+             None if rng.random() < 0.01 else round(rng.uniform(1, 100), 2))
+            for i in range(start, min(books + 1, start + 50000))])
+    conn.commit()
+    conn.close()
+
+
+def deep_cursor(conn, sort: str, fraction: float = 0.9) -> str:
+    column, _ = book_catalogue.SORTS[sort]
+    count = conn.execute(f"SELECT COUNT(*) FROM books WHERE {column} IS NOT NULL").fetchone()[0]
+    value, book_id = conn.execute(f"SELECT {sort}, id FROM books WHERE {column} IS NOT NULL ORDER BY {column}, id"
+                                  " LIMIT 1 OFFSET ?", [int(count * fraction)]).fetchone()
+    return book_catalogue.encode_cursor(value, book_id)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time bookstore catalogue pages on a large inventory.")
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=200, help="requests per scenario (default: 200)")
+    parser.add_argument("--budget", type=float, default=3.0, help="max seconds per scenario (default: 3)")
+    parser.add_argument("--skip-full", action="store_true", help="don't time the old single-page catalogue")
+    args = parser.parse_args(argv)
+
+    module = load_app("bookstore")
+    with tempfile.TemporaryDirectory() as tmp:
+        module.DB_PATH = os.path.join(tmp, "bookstore.db")
+        started = time.perf_counter()
+        seed(module.DB_PATH, args.books)
+        seeded = time.perf_counter()
+        module.init_db()
+        print(f"seeded {args.books} books in {seeded - started:.1f}s, "
+              f"init_db() (indexes + search index) {time.perf_counter() - seeded:.1f}s")
+
+        conn = sqlite3.connect(module.DB_PATH)
+        common, rare = WORDS[0], conn.execute("SELECT title FROM books WHERE id = 4242").fetchone()[0].split()[-1]
+        scenarios = [
+            ("first page, by title", "/catalogue"),
+            ("deep page, by title", f"/catalogue?after={deep_cursor(conn, 'title')}"),
+            ("first page, price desc", "/catalogue?sort=-price"),
+            ("deep page, price asc", f"/catalogue?sort=price&after={deep_cursor(conn, 'price')}"),
+            ("price 20-25, by title", "/catalogue?min_price=20&max_price=25"),
+            ("price 20-25, by price", "/catalogue?min_price=20&max_price=25&sort=price"),
+            ("price 1-99, by title", "/catalogue?min_price=1&max_price=99"),
+            (f"search '{common}'", f"/catalogue?q={common}"),
+            (f"search '{rare}'", f"/catalogue?q={rare}"),
+            ("search 'ga*', price desc", "/catalogue?q=ga*&sort=-price"),
+        ]
+        conn.close()
+
+        module.catalogue_cache.max_entries = 0  # every request runs the queries and renders
+        client = module.app.test_client()
+        print(f"\n{'scenario':<28} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for label, path in scenarios:
+            r = bench_route(client, "GET", lambda i, path=path: path, None, args.iterations, args.budget)
+            assert r["errors"] == 0, label
+            print(f"{label:<28} {r['p50_ms']:>8.2f} {r['p90_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['ops_per_sec']:>8.1f}")
+
+        module.catalogue_cache.max_entries = 256
+        r = bench_route(client, "GET", lambda i: "/catalogue", None, args.iterations, args.budget)
+        print(f"{'first page, cached':<28} {r['p50_ms']:>8.2f} {r['p90_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['ops_per_sec']:>8.1f}")
+
+        if not args.skip_full:
+            with module.app.test_request_context("/catalogue"):
+                start = time.perf_counter()
+                db = module.get_db()
+                books = [dict(b) for b in db.execute("SELECT id, title, author, price FROM books").fetchall()]
+                html = module.render_template("catalogue.html", books=books, query=book_catalogue.parse_query({}),
+                                              query_args={}, sorts=module.CATALOGUE_SORTS, next_url=None, user=None)
+                took = time.perf_counter() - start
+            print(f"\nold single page: {len(books)} books, {len(html) / 2**20:.0f} MB of HTML in {took:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+from app_common.task_repository import SQLiteTaskRepository  # noqa: E402
+
+"""
+FTS5 search (GET /api/tasks/search) vs a LIKE scan over the tasks table.
+
+Usage:
+  python bench_fts.py [--rows 1000000] [--repeat 5] [--db path/to/keep.db]
+
+Builds a fullstack_sqlite database (its schema.sql, so the tasks_fts
+triggers maintain the index while the rows go in) with --rows tasks of
+3-10 words drawn from a Zipf-like vocabulary, then for each query reports
+the median of --repeat runs of:
+
+  fts        SQLiteTaskRepository.search(q, limit=20): every match ranked
+             by bm25, top 20 returned (what the endpoint does)
+  like 20    WHERE text LIKE '%w%' AND ... ORDER BY id LIMIT 20: stops
+             after 20 matches in id order, so it is cheap for common words
+             and a full table scan for rare ones, and it cannot rank
+  like all   the same without LIMIT: every match, which is what ranking
+             on top of LIKE would need
+
+LIKE also matches inside words ("ate" in "update"), so its counts are an
+upper bound of the FTS counts. Build time and the on-disk size of the
+table and of the index are printed first.
+"""
+
+COMMON = ("fix update write review test deploy check release report meeting call email plan draft send "
+          "order buy pay clean book read team client invoice budget design build data server backup").split()
+
+
+def vocabulary(size: int, rng: random.Random) -> list:
+    words = list(COMMON)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    while len(words) < size:
+        words.append("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return words
+
+
+def build(path: str, rows: int, seed: int = 1):
+    rng = random.Random(seed)
+    words = vocabulary(20000, rng)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    schema = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fullstack_sqlite", "schema.sql")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with open(schema) as f:
+        conn.executescript(f.read())
+    started = time.perf_counter()
+    for start in range(0, rows, 50000):
+        batch = [(" ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(3, 10))).capitalize(), 0)
+                 for _ in range(min(50000, rows - start))]
+        conn.executemany("INSERT INTO tasks (text, completed) VALUES (?, ?)", batch)
+        conn.commit()
+    took = time.perf_counter() - started
+    sizes = dict(conn.execute("SELECT CASE WHEN name LIKE 'tasks_fts%' THEN 'fts' ELSE 'tasks' END, SUM(pgsize)"
+                              " FROM dbstat GROUP BY 1").fetchall())
+    conn.close()
+    return took, sizes, words
+
+
+def timed(fn, repeat: int):
+    result, times = None, []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, 1000 * statistics.median(times)
+
+
+def like_sql(q: str, limit: bool) -> tuple:
+    terms = [w.rstrip("*") for w in q.split()]
+    sql = "SELECT id, text, completed FROM tasks WHERE " + " AND ".join(["text LIKE ?"] * len(terms)) + " ORDER BY id"
+    if limit:
+        sql += " LIMIT 20"
+    return sql, [f"%{t}%" for t in terms]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare FTS5 task search with a LIKE scan.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="database file to build (and keep); default: a temporary file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "fts.db")
+        took, sizes, words = build(path, args.rows)
+        print(f"built {args.rows} tasks in {took:.1f}s (index maintained by triggers); "
+              f"tasks {sizes.get('tasks', 0) / 2**20:.0f} MB, tasks_fts {sizes.get('fts', 0) / 2**20:.0f} MB")
+
+        pool = SQLitePool(path, size=1)
+        repo = SQLiteTaskRepository(pool)
+        conn = pool.acquire()
+        queries = [words[0], words[len(COMMON) + 2000], f"{words[1]} {words[3]}", "re*", words[len(COMMON)][:3] + "*",
+                   "nonexistentword"]
+        print(f"\n{'query':<22} {'fts ms':>8} {'like 20 ms':>11} {'like all ms':>12} {'fts hits':>9} {'like hits':>10}")
+        for q in queries:
+            _, fts_ms = timed(lambda: repo.search(q, 20), args.repeat)
+            hits = conn.execute("SELECT COUNT(*) FROM tasks_fts WHERE tasks_fts MATCH ?",
+                                [" ".join(f'"{w.rstrip("*")}"' + ("*" if w.endswith("*") else "")
+                                          for w in q.split())]).fetchone()[0]
+            _, like20_ms = timed(lambda: conn.execute(*like_sql(q, True)).fetchall(), args.repeat)
+            matched, like_all_ms = timed(lambda: conn.execute(*like_sql(q, False)).fetchall(), args.repeat)
+            print(f"{q:<22} {fts_ms:>8.2f} {like20_ms:>11.2f} {like_all_ms:>12.2f} {hits:>9} {len(matched):>10}")
+        pool.release(conn)
+        pool.reset()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
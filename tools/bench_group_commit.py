@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_apps import load_app, percentile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.group_commit import GroupCommitWriter  # noqa: E402
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+
+"""
+Per-request commit vs group commit for concurrent POST /api/tasks.
+
+Usage:
+  python bench_group_commit.py [--threads 1,8,32] [--requests 200] [--synchronous normal|full]
+                               [--max-batch 64] [--max-wait-ms 1]
+
+For every thread count, runs fullstack_sqlite/app.py twice against a fresh
+database: once with TASKS_GROUP_COMMIT off (INSERT + commit + SELECT
+last_insert_rowid() per request) and once through the GroupCommitWriter.
+Each thread posts --requests tasks through its own Flask test client.
+--synchronous full makes every commit an fsync, which is where batching
+pays off most.
+"""
+
+
+def run(module, group: bool, threads: int, requests: int, synchronous: str, max_batch: int, max_wait: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        module.pool = SQLitePool(os.path.join(tmp, "bench.db"), factory=module.pool.factory, synchronous=synchronous)
+        module.writer.close()
+        module.writer = GroupCommitWriter(module.pool.connect, max_batch=max_batch, max_wait=max_wait,
+                                          on_commit=module.task_cache.invalidate)
+        module.GROUP_COMMIT = group
+        module.init_db()
+
+        timings, errors = [], []
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(n: int):
+            client = module.app.test_client()
+            mine, failed = [], 0
+            barrier.wait()
+            for i in range(requests):
+                start = time.perf_counter()
+                response = client.post("/api/tasks", json={"text": f"task {n}-{i}"})
+                mine.append(time.perf_counter() - start)
+                failed += response.status_code != 201
+            timings.extend(mine)
+            errors.append(failed)
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for t in workers:
+            t.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for t in workers:
+            t.join()
+        took = time.perf_counter() - started
+        stats = module.writer.stats()
+        module.writer.close()
+        module.pool.close()
+
+    timings.sort()
+    return {
+        "req_per_sec": len(timings) / took,
+        "p50_ms": 1000 * percentile(timings, 50),
+        "p99_ms": 1000 * percentile(timings, 99),
+        "avg_batch": stats["avg_batch"] if group else 1.0,
+        "errors": sum(errors),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare per-request commits with group commit for POST /api/tasks.")
+    parser.add_argument("--threads", default="1,8,32", help="comma separated thread counts (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=200, help="POSTs per thread (default: 200)")
+    parser.add_argument("--synchronous", default="normal", help="PRAGMA synchronous for both runs (default: normal)")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    module = load_app("fullstack_sqlite")
+    module.app.config["PROPAGATE_EXCEPTIONS"] = False  # a locked database becomes a 500, not a crash
+    print(f"{'threads':>7} {'mode':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6} {'errors':>7}")
+    for threads in (int(t) for t in args.threads.split(",")):
+        for group in (False, True):
+            r = run(module, group, threads, args.requests, args.synchronous, args.max_batch, args.max_wait_ms / 1000)
+            print(f"{threads:>7} {'group' if group else 'per-req':<10} {r['req_per_sec']:>9.1f} {r['p50_ms']:>8.2f} "
+                  f"{r['p99_ms']:>8.2f} {r['avg_batch']:>6.1f} {r['errors']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from flask import jsonify
+
+from bench_apps import percentile
+from mysql_stub import MySQLStub
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.mysql_pool import MySQLPool, _connect_mysql  # noqa: E402
+from app_common.task_repository import MySQLTaskRepository  # noqa: E402
+
+"""
+Connect-per-request vs the bounded pool for fullstack_mysql, plus buffered
+vs streamed task lists.
+
+Usage:
+  python bench_mysql_pool.py [--threads 8] [--requests 300] [--size 200] [--list-size 50000]
+                             [--connect-delay-ms 0] [--host H --port P --user U --password W --database D]
+
+Without --host a local MySQL stand-in (tools/mysql_stub.py, data in a
+temporary SQLite file) is started; --connect-delay-ms makes each of its
+handshakes that much slower, to stand in for authentication and TLS on a
+real server. With --host the numbers are against that server (its tasks
+table is recreated).
+
+CRUD: fullstack_mysql/app.py is loaded and --threads threads drive it
+through Flask test clients with the JMeter plan's mix (GET list, POST, PUT,
+DELETE), once per configuration:
+
+  connect  a new mysql.connector connection per request, closed at the
+           end of it (what the app did before the pool)
+  pool     MySQLPool with --threads connections
+
+Reported: throughput, p50/p99 request latency and connections opened.
+
+List: GET /api/tasks over --list-size rows, once with the old
+fetchall() + jsonify and once with the app's streamed response; reported
+are the time to the full body and the peak Python memory (tracemalloc).
+"""
+
+
+class ConnectPerRequest:
+    """The pool interface over a fresh connection per acquire()."""
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.opened = 0
+
+    def acquire(self):
+        self.opened += 1
+        return self.connect()
+
+    def release(self, conn, failed=False):
+        conn.close()
+
+    def close(self):
+        pass
+
+
+def load_mysql_app():
+    import importlib.util
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fullstack_mysql", "app.py")
+    spec = importlib.util.spec_from_file_location("bench_fullstack_mysql_app", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def reset_tasks(module, pool, size: int):
+    tasks = MySQLTaskRepository(pool)
+    with open(os.path.join(os.path.dirname(module.__file__), "schema.sql")) as f:
+        tasks.create_schema(f.read())
+    for start in range(0, size, 1000):
+        tasks.add_many([f"Seed task {i}" for i in range(start, min(size, start + 1000))])
+    module.routes.tasks = tasks
+
+
+def run_crud(module, name: str, pool, threads: int, requests: int, size: int) -> dict:
+    reset_tasks(module, pool, size)
+    opened_before = pool.opened
+    timings = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n: int):
+        client = module.app.test_client()
+        mine = []
+        barrier.wait()
+        for i in range(requests):
+            step = i % 4
+            start = time.perf_counter()
+            if step == 0:
+                client.get("/api/tasks").get_data()
+            elif step == 1:
+                client.post("/api/tasks", json={"text": f"task {n}-{i}"})
+            elif step == 2:
+                client.put(f"/api/tasks/{(n * requests + i) % size + 1}", json={"completed": True})
+            else:
+                client.delete(f"/api/tasks/{size + 1 + (n * requests + i) % size}")
+            mine.append(time.perf_counter() - start)
+        timings.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    took = time.perf_counter() - started
+    timings.sort()
+    return {
+        "config": name,
+        "requests": len(timings),
+        "req_per_sec": len(timings) / took,
+        "p50_ms": 1000 * percentile(timings, 50),
+        "p99_ms": 1000 * percentile(timings, 99),
+        "opened": pool.opened - opened_before,
+    }
+
+
+def run_list(module, pool, size: int) -> list:
+    reset_tasks(module, pool, size)
+    client = module.app.test_client()
+
+    def buffered():
+        with module.app.test_request_context():
+            return jsonify(module.routes.tasks.page()).get_data()
+
+    def streamed():
+        return client.get("/api/tasks").get_data()
+
+    results = []
+    for name, fn in (("buffered", buffered), ("streamed", streamed)):
+        fn()  # warm up
+        tracemalloc.start()
+        start = time.perf_counter()
+        body = fn()
+        took = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append({"mode": name, "ms": 1000 * took, "peak_mb": peak / 2**20, "bytes": len(body)})
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare connect-per-request with the MySQL pool.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=300, help="requests per thread (default: 300)")
+    parser.add_argument("--size", type=int, default=200, help="tasks seeded before each CRUD run (default: 200)")
+    parser.add_argument("--list-size", type=int, default=50000, help="tasks for the list comparison (default: 50000)")
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0, help="stub only: extra cost per handshake")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="todo_db")
+    args = parser.parse_args(argv)
+
+    module = load_mysql_app()
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = None
+        if args.host is None:
+            stub = MySQLStub(os.path.join(tmp, "stub.db"), connect_delay=args.connect_delay_ms / 1000).start()
+            config = {"host": stub.host, "port": stub.port, "user": "root", "password": "x", "database": "todo_db"}
+        else:
+            config = {"host": args.host, "port": args.port, "user": args.user, "password": args.password,
+                      "database": args.database}
+        try:
+            print(f"{'config':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'opened':>7}")
+            for name in ("connect", "pool"):
+                if name == "connect":
+                    pool = ConnectPerRequest(functools.partial(_connect_mysql, config))
+                else:
+                    pool = MySQLPool.from_config(config, size=args.threads)
+                r = run_crud(module, name, pool, args.threads, args.requests, args.size)
+                pool.close()
+                print(f"{r['config']:<8} {r['req_per_sec']:>9.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                      f"{r['opened']:>7}")
+
+            pool = MySQLPool.from_config(config, size=2)
+            print(f"\nGET /api/tasks with {args.list_size} tasks")
+            print(f"{'mode':<9} {'ms':>9} {'peak MB':>8} {'bytes':>10}")
+            for r in run_list(module, pool, args.list_size):
+                print(f"{r['mode']:<9} {r['ms']:>9.1f} {r['peak_mb']:>8.1f} {r['bytes']:>10}")
+            pool.close()
+        finally:
+            if stub is not None:
+                stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from bench_apps import load_app, percentile, setup_food_ordering
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import order_pipeline  # noqa: E402
+from app_common.order_pipeline import Order, OrderPipeline  # noqa: E402
+
+"""
+food_ordering order writes: one transaction per order vs the OrderPipeline.
+
+Usage:
+  python bench_orders.py [--orders 50000] [--threads 1,8,32] [--requests 3000] [--synchronous normal|full]
+
+Storage: --orders orders (two order_items each) are written by each
+--threads count of threads into a fresh WAL database, first one
+INSERT + COMMIT per order on a connection per thread (what a synchronous
+/pay would do), then through OrderPipeline.submit() with the writer
+thread batching them. The pipeline time runs until the last order is on
+disk (flush()), not just until submit() returned.
+
+End to end: --requests POST /pay requests, each with its own idempotency
+key, through the food_ordering app's Flask test client from the largest
+--threads count; reports requests/s, latency percentiles and how long
+the writer needed after the last response.
+"""
+
+
+def make_orders(n: int, tag: str):
+    return [Order(f"user{i % 100}", f"{tag}-{i}", 14.5, None, [(1, "Pizza", 8.0, 1), (2, "Salad", 6.5, 1)])
+            for i in range(n)]
+
+
+def fresh_db(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = wal")
+    order_pipeline.install(conn)
+    conn.close()
+
+
+def connect(path: str, synchronous: str):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    return conn
+
+
+def per_order(path: str, orders, threads: int, synchronous: str) -> float:
+    def work(part):
+        conn = connect(path, synchronous)
+        for o in part:
+            with conn:
+                order_id = conn.execute(
+                    "INSERT INTO orders (username, idempotency_key, total, coupon, created_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (username, idempotency_key) DO NOTHING RETURNING id",
+                    (o.username, o.key, o.total, o.coupon, time.time())).fetchone()[0]
+                conn.executemany("INSERT INTO order_items (order_id, item_id, name, price, quantity)"
+                                 " VALUES (?, ?, ?, ?, ?)", [(order_id, *item) for item in o.items])
+        conn.close()
+
+    return run_threads(work, orders, threads)
+
+
+def pipelined(path: str, orders, threads: int, synchronous: str) -> tuple:
+    pipeline = OrderPipeline(lambda: connect(path, synchronous), max_pending=len(orders))
+    elapsed = run_threads(lambda part: [pipeline.submit(o) for o in part], orders, threads, pipeline.flush)
+    pipeline.close()
+    return elapsed, pipeline.stats()
+
+
+def run_threads(work, orders, threads: int, then=None) -> float:
+    parts = [orders[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=work, args=(part,)) for part in parts]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if then is not None:
+        then()
+    return time.perf_counter() - start
+
+
+def end_to_end(requests: int, threads: int) -> None:
+    os.environ.setdefault("PASSWORD_HASH_PROFILE", "loadtest")
+    module = load_app("food_ordering")
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_food_ordering(module, os.path.join(tmp, "food.db"), 100)
+        timings, lock = [], threading.Lock()
+
+        def work(part):
+            client = module.app.test_client()
+            with client.session_transaction() as session:
+                session["user"] = f"user{part[0]}"
+            local = []
+            for i in part:
+                start = time.perf_counter()
+                r = client.post("/pay", data={"item_id": str(i % 100 + 1), "idempotency_key": f"k{i}"})
+                local.append(time.perf_counter() - start)
+                assert r.status_code == 200, r.status_code
+            with lock:
+                timings.extend(local)
+
+        started = time.perf_counter()
+        run_threads(work, list(range(requests)), threads)
+        answered = time.perf_counter()
+        module.orders.flush()
+        drained = time.perf_counter()
+        stats = module.orders.stats()
+        module.orders.close()
+    timings.sort()
+    print(f"\nPOST /pay end to end, {threads} threads: {requests / (answered - started):.0f} req/s, "
+          f"p50 {percentile(timings, 50) * 1000:.2f} ms, p99 {percentile(timings, 99) * 1000:.2f} ms; "
+          f"writer done {1000 * (drained - answered):.0f} ms after the last response, "
+          f"{stats['written']} orders in {stats['batches']} transactions")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time food_ordering order writes with and without the pipeline.")
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--threads", default="1,8,32", help="comma-separated thread counts (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=3000, help="POST /pay requests end to end (default: 3000)")
+    parser.add_argument("--synchronous", default="normal", choices=["normal", "full"])
+    args = parser.parse_args(argv)
+    thread_counts = [int(t) for t in args.threads.split(",")]
+
+    print(f"{args.orders} orders, 2 items each, synchronous={args.synchronous}\n")
+    print(f"{'threads':>7} {'per-order tx/s':>15} {'pipeline orders/s':>18} {'transactions':>13} {'avg batch':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "orders.db")
+        for threads in thread_counts:
+            fresh_db(path)
+            single = per_order(path, make_orders(args.orders, "s"), threads, args.synchronous)
+            fresh_db(path)
+            batched, stats = pipelined(path, make_orders(args.orders, "p"), threads, args.synchronous)
+            assert stats["written"] == args.orders
+            print(f"{threads:>7} {args.orders / single:>15.0f} {args.orders / batched:>18.0f} "
+                  f"{stats['batches']:>13} {stats['avg_batch']:>10}")
+    end_to_end(args.requests, max(thread_counts))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_apps import BENCH_PASSWORD, BENCH_USER, load_app, percentile, setup_bookstore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.password_hasher import PROFILES, PasswordHasher  # noqa: E402
+
+"""
+Bookstore logins under concurrency: hashing on the request threads vs the
+PasswordHasher process pool.
+
+Usage:
+  python bench_password_hash.py [--logins 16] [--readers 4] [--seconds 5] [--workers N]
+
+For each setup, --logins threads POST /login in a loop while --readers
+threads GET /catalogue, each thread with its own Flask test client, for
+--seconds seconds. The report lists requests/s, p50/p99 latency and 503s
+(logins shed by the bounded queue) per route, and the hasher's own
+average hash and queueing time.
+
+  inline     every request thread hashes itself, with no bound: the
+             behaviour before the pool (PASSWORD_HASH_WORKERS=0 and an
+             unlimited queue)
+  pool       --workers processes (default: CPU count), queue of 4 per
+             worker, 2 s queue timeout: the apps' defaults
+  loadtest   the pool with PASSWORD_HASH_PROFILE=loadtest
+"""
+
+
+def run(module, logins: int, readers: int, seconds: float) -> dict:
+    results = {"POST /login": [], "GET /catalogue": []}
+    statuses = {"POST /login": {}, "GET /catalogue": {}}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    form = {"username": BENCH_USER, "password": BENCH_PASSWORD}
+
+    def loop(route):
+        client = module.app.test_client()
+        method, path = route.split()
+        timings, codes = [], {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = client.open(path, method=method, data=form if method == "POST" else None).status_code
+            timings.append(time.perf_counter() - start)
+            codes[status] = codes.get(status, 0) + 1
+        with lock:
+            results[route] += timings
+            for status, n in codes.items():
+                statuses[route][status] = statuses[route].get(status, 0) + n
+
+    threads = [threading.Thread(target=loop, args=("POST /login",)) for _ in range(logins)]
+    threads += [threading.Thread(target=loop, args=("GET /catalogue",)) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {route: (timings, statuses[route]) for route, timings in results.items()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time concurrent bookstore logins with and without the hashing pool.")
+    parser.add_argument("--logins", type=int, default=16, help="threads posting /login (default: 16)")
+    parser.add_argument("--readers", type=int, default=4, help="threads reading /catalogue (default: 4)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration per setup (default: 5)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool size (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    setups = [
+        ("inline", dict(workers=0, max_pending=10**6)),
+        ("pool", dict(workers=args.workers)),
+        ("loadtest", dict(workers=args.workers, method=PROFILES["loadtest"])),
+    ]
+    print(f"{args.logins} login threads, {args.readers} catalogue threads, {args.seconds:.0f}s each, "
+          f"{os.cpu_count()} CPUs\n")
+    print(f"{'setup':<10} {'route':<16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6}   hashing queue")
+    module = load_app("bookstore")
+    for label, options in setups:
+        module.hasher = hasher = PasswordHasher(**options)
+        with tempfile.TemporaryDirectory() as tmp:
+            setup_bookstore(module, os.path.join(tmp, "bookstore.db"), 1000)
+            hasher.start()
+            results = run(module, args.logins, args.readers, args.seconds)
+            stats = hasher.stats()
+            hasher.close()
+        for route, (timings, statuses) in results.items():
+            timings.sort()
+            queue = ""
+            if route == "POST /login":
+                hashed = stats["counts"]["verify"] or 1
+                queue = (f"{stats['seconds']['verify'] / hashed * 1000:.1f} ms/hash, "
+                         f"{stats['wait_seconds'] / hashed * 1000:.1f} ms queued/hash")
+            print(f"{label:<10} {route:<16} {len(timings) / args.seconds:>8.1f} "
+                  f"{percentile(timings, 50) * 1000:>8.1f} {percentile(timings, 99) * 1000:>8.1f} "
+                  f"{statuses.get(503, 0):>6}   {queue}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
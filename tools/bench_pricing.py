@@ -0,0 +1,99 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common import pricing  # noqa: E402
+from app_common.pricing import PriceBook  # noqa: E402
+
+"""
+Cart pricing: SQL per line vs the in-memory PriceBook.
+
+Usage:
+  python bench_pricing.py [--items 10000] [--coupons 500] [--carts 2000]
+
+Builds a menu of --items items and --coupons coupons (a mix of every
+rule kind) in a fresh database, then prices --carts random carts of 1, 10
+and 50 lines with a random coupon each:
+
+  sql       what /order did, per cart: one SELECT for the coupon and one
+            SELECT per line on a warm connection, rules applied in Python
+  book      PriceBook.quote() on the compiled book
+
+It also times PriceBook.load(), the cost paid once per menu or coupon
+change.
+"""
+
+
+def seed(path: str, items: int, coupons: int, rng) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE menu (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL)")
+    conn.executemany("INSERT INTO menu VALUES (?, ?, ?)",
+                     [(i, f"Dish {i}", round(rng.uniform(3, 30), 2)) for i in range(1, items + 1)])
+    pricing.install(conn)
+    rules = [("percent", None), ("percent", True), ("fixed", True), ("fixed", None)]
+    conn.executemany("INSERT INTO coupons VALUES (?, ?, ?, ?, ?)", [
+        (f"C{i}", kind, rng.choice([5, 10, 20]), rng.randint(1, items) if item else None,
+         "2099-01-01T00:00:00" if i % 2 else None)
+        for i, (kind, item) in enumerate(rng.choice(rules) for _ in range(coupons))])
+    conn.commit()
+    conn.close()
+
+
+def sql_quote(conn, lines, code):
+    """Per-line lookups, the way /order priced its single item."""
+    coupon = conn.execute("SELECT kind, amount, item_id, expires_at FROM coupons WHERE code = ?", [code]).fetchone()
+    if coupon is not None and coupon[3] is not None and pricing.parse_expiry(coupon[3]) <= time.time():
+        coupon = None
+    total = 0
+    for item_id, quantity in lines:
+        _, _, price = conn.execute("SELECT id, name, price FROM menu WHERE id = ?", [item_id]).fetchone()
+        if coupon is not None and coupon[2] in (None, item_id):
+            if coupon[0] == "percent":
+                price = round(price * (1 - coupon[1] / 100), 2)
+            elif coupon[2] is not None:
+                price = max(0.0, round(price - coupon[1], 2))
+        total += round(price * quantity, 2)
+    if coupon is not None and coupon[0] == "fixed" and coupon[2] is None:
+        total = max(0.0, total - coupon[1])
+    return round(total, 2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time cart pricing with SQL lookups and with the PriceBook.")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--coupons", type=int, default=500)
+    parser.add_argument("--carts", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "food.db")
+        seed(path, args.items, args.coupons, rng)
+        conn = sqlite3.connect(path)
+        start = time.perf_counter()
+        book = PriceBook.load(conn)
+        loaded = time.perf_counter() - start
+        print(f"{args.items} items, {args.coupons} coupons: PriceBook.load() {1000 * loaded:.1f} ms\n")
+        print(f"{'lines/cart':>10} {'sql us/cart':>12} {'book us/cart':>13} {'speedup':>8}")
+        for size in (1, 10, 50):
+            carts = [([(rng.randint(1, args.items), rng.randint(1, 3)) for _ in range(size)],
+                      f"C{rng.randrange(args.coupons)}") for _ in range(args.carts)]
+            start = time.perf_counter()
+            expected = [sql_quote(conn, lines, code) for lines, code in carts]
+            sql = (time.perf_counter() - start) / args.carts
+            start = time.perf_counter()
+            got = [book.quote(lines, code).total for lines, code in carts]
+            mem = (time.perf_counter() - start) / args.carts
+            assert got == expected
+            print(f"{size:>10} {sql * 1e6:>12.1f} {mem * 1e6:>13.1f} {sql / mem:>7.1f}x")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from bench_apps import load_app, percentile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_common.sqlite_pool import SQLitePool  # noqa: E402
+
+"""
+Connect-per-request vs pooled WAL connections for the todo API.
+
+Usage:
+  python bench_sqlite_pool.py [--app fullstack_sqlite] [--threads 8] [--requests 300] [--size 200]
+
+Loads fullstack_sqlite/app.py (or fullstack/app.py) and, for each
+configuration below, seeds a fresh database and lets --threads threads
+hammer the API through their own Flask test client with the JMeter plan's
+mix (GET list, POST, PUT, DELETE). The app's `pool` is swapped per
+configuration, everything else is the app's real code:
+
+  connect    size=0 and no pragmas: a new rollback-journal connection per
+             request, like the original get_db()
+  pool       pooled connections, rollback journal
+  pool+wal   pooled connections, journal_mode=WAL, synchronous=NORMAL
+             (the app default)
+
+Reported per configuration: throughput, p50/p99 request latency, connections
+opened, and requests that failed (e.g. "database is locked").
+"""
+
+CONFIGS = {
+    "connect": dict(size=0, journal_mode=None, synchronous=None, cache_size=None, mmap_size=None, busy_timeout=None),
+    "pool": dict(journal_mode=None, synchronous=None),
+    "pool+wal": dict(),
+}
+
+
+def run_config(module, name: str, settings: dict, threads: int, requests: int, size: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        module.pool = SQLitePool(db_path, factory=module.pool.factory, **settings)
+        module.init_db()
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO tasks (text, completed) VALUES (?, ?)",
+                         ((f"Seed task {i}", 0) for i in range(size)))
+        conn.commit()
+        conn.close()
+
+        timings, errors = [], []
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(n: int):
+            client = module.app.test_client()
+            mine, failed = [], 0
+            barrier.wait()
+            for i in range(requests):
+                step = i % 4
+                start = time.perf_counter()
+                if step == 0:
+                    response = client.get("/api/tasks")
+                elif step == 1:
+                    response = client.post("/api/tasks", json={"text": f"task {n}-{i}"})
+                elif step == 2:
+                    response = client.put(f"/api/tasks/{(n * requests + i) % size + 1}", json={"completed": True})
+                else:
+                    response = client.delete(f"/api/tasks/{size + 1 + (n * requests + i) % size}")
+                mine.append(time.perf_counter() - start)
+                failed += response.status_code >= 500
+            timings.extend(mine)
+            errors.append(failed)
+
+        pool_threads = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for t in pool_threads:
+            t.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for t in pool_threads:
+            t.join()
+        took = time.perf_counter() - started
+        stats = module.pool.stats()
+        module.pool.close()
+
+    timings.sort()
+    return {
+        "config": name,
+        "requests": len(timings),
+        "req_per_sec": len(timings) / took,
+        "p50_ms": 1000 * percentile(timings, 50),
+        "p99_ms": 1000 * percentile(timings, 99),
+        "opened": stats["opened"],
+        "errors": sum(errors),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare connect-per-request with pooled WAL SQLite connections.")
+    parser.add_argument("--app", choices=["fullstack", "fullstack_sqlite"], default="fullstack_sqlite")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=300, help="requests per thread (default: 300)")
+    parser.add_argument("--size", type=int, default=200, help="tasks seeded before each run (default: 200)")
+    args = parser.parse_args(argv)
+
+    module = load_app(args.app)
+    module.app.config["PROPAGATE_EXCEPTIONS"] = False  # a locked database becomes a 500, not a crash
+    print(f"{'config':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'opened':>7} {'errors':>7}")
+    for name, settings in CONFIGS.items():
+        r = run_config(module, name, settings, args.threads, args.requests, args.size)
+        print(f"{r['config']:<10} {r['req_per_sec']:>9.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['opened']:>7} {r['errors']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
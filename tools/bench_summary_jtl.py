@@ -0,0 +1,114 @@
+import argparse
+import csv
+import math
+import os
+import random
+import tempfile
+import time
+
+import summary_jtl
+
+"""
+Benchmark for the summary_jtl parsing engine.
+
+Usage:
+  python bench_summary_jtl.py [--rows N] [--jtl existing.jtl]
+
+Generates a synthetic JTL (unless --jtl is given) and compares the chunked,
+column-wise engine used by summary_jtl.summarize() against the original
+csv.DictReader loop that built a dict per row (summarize_baseline). The
+baseline computes less (no percentiles), so the speedup understates the
+per-row saving.
+"""
+
+HEADER = ["timeStamp", "elapsed", "label", "responseCode", "responseMessage", "threadName",
+          "dataType", "success", "failureMessage", "bytes", "sentBytes", "grpThreads",
+          "allThreads", "URL", "Latency", "IdleTime", "Connect"]
+LABELS = ["GET Home", "GET Catalogue", "POST Login", "POST Register", "GET Menu", "POST Order"]
+
+
+def write_synthetic_jtl(path: str, rows: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    ts = 1700000000000
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for i in range(rows):
+            ts += rng.randint(0, 3)
+            elapsed = int(rng.lognormvariate(3.5, 0.8))
+            ok = rng.random() > 0.02
+            w.writerow([ts, elapsed, rng.choice(LABELS), 200 if ok else 500, "OK" if ok else "Internal Server Error",
+                        f"Users 1-{i % 50}", "text", "true" if ok else "false", "", 1024, 200, 50, 50,
+                        "http://localhost:5001/", max(0, elapsed - 2), 0, rng.randint(0, 3)])
+
+
+def summarize_baseline(jtl_path: str):
+    """The original summarize() loop, unchanged except that it returns instead of printing.
+
+    It only counts samples and failures and sums elapsed; the engine also
+    builds the latency, connect and elapsed histograms in the same pass.
+    """
+    total = 0
+    failures = 0
+    total_time = 0.0
+    with open(jtl_path, newline='') as f:
+        reader = csv.DictReader(f)
+        for r in reader:
+            total += 1
+            # success flag may be 'success' or 's'
+            success = None
+            for k in ("success", "s"):
+                if k in r:
+                    success = r[k]
+                    break
+            if success is not None and str(success).lower() not in ("true", "1"):
+                failures += 1
+            # elapsed time may be 'elapsed' or 't'
+            elapsed_val = 0
+            for k in ("elapsed", "t"):
+                if k in r and r[k] != "":
+                    try:
+                        elapsed_val = float(r[k])
+                        break
+                    except Exception:
+                        elapsed_val = 0
+            total_time += elapsed_val
+    return total, failures, total_time / total if total else None
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in the synthetic JTL")
+    parser.add_argument("--jtl", help="benchmark an existing JTL instead of a synthetic one")
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.jtl
+    if path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "synthetic.jtl")
+        print(f"writing {args.rows} synthetic samples to {path}")
+        write_synthetic_jtl(path, args.rows)
+    try:
+        baseline, t_base = timed(summarize_baseline, path)
+        engine, t_engine = timed(summary_jtl.summarize_file, path)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    assert baseline[:2] == (engine.total, engine.failures)
+    assert baseline[2] is None or math.isclose(baseline[2], engine.as_dict()["avg_elapsed"])
+    print(f"samples: {engine.total}")
+    print(f"original loop:   {t_base:.2f}s ({engine.total / t_base:,.0f} rows/s)")
+    print(f"chunked engine:  {t_engine:.2f}s ({engine.total / t_engine:,.0f} rows/s)")
+    print(f"speedup: {t_base / t_engine:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import loadgen
+import summary_jtl
+
+"""
+Flask (app.py) vs ASGI (asgi_app.py) for the fullstack_sqlite todo API.
+
+Usage:
+  python compare_asgi.py [--concurrency 10,100,1000] [--duration 20] [--json results.json]
+
+Starts each server in its own temporary directory (fresh database), runs
+loadgen.py's fullstack_sqlite scenario (GET /, GET /api/tasks, POST
+/api/tasks) in the closed model with every concurrency level as the number
+of virtual users, all started at once, and prints throughput, p50/p99 and
+error rate per server and level.
+
+  flask  python app.py (Werkzeug dev server, one thread per connection)
+  asgi   uvicorn asgi_app:app (needs `pip install uvicorn`; skipped if missing)
+
+The client raises its open-file limit to the hard limit where the platform
+has one (the resource module; not on Windows); 1000 connections need ~1000
+descriptors on each side. The load generator is a single asyncio
+process, so at high concurrency compare the two rows relative to each other
+rather than as absolute capacity.
+"""
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fullstack_sqlite")
+SERVERS = {
+    "flask": (5004, lambda port: [sys.executable, os.path.join(APP_DIR, "app.py")]),
+    "asgi": (5005, lambda port: [sys.executable, "-m", "uvicorn", "asgi_app:app", "--app-dir", APP_DIR,
+                                 "--port", str(port), "--log-level", "warning", "--backlog", "4096"]),
+}
+
+
+def raise_nofile_limit() -> None:
+    try:
+        import resource
+    except ImportError:  # Windows: no per-process descriptor limit to raise
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def measure(port: int, concurrency: int, duration: float, workdir: str) -> dict:
+    out = os.path.join(workdir, f"c{concurrency}.jtl")
+    started = time.monotonic()
+    loadgen.main(["fullstack_sqlite", "--host", "127.0.0.1", "--port", str(port), "--threads", str(concurrency),
+                  "--ramp", "0", "--duration", str(duration), "-o", out])
+    took = time.monotonic() - started
+    summary = summary_jtl.summarize_file(out)
+    elapsed = summary.metrics["elapsed"]
+    return {
+        "concurrency": concurrency,
+        "samples": summary.total,
+        "req_per_sec": round(summary.total / took, 1),
+        "p50_ms": elapsed.percentile(50),
+        "p99_ms": elapsed.percentile(99),
+        "error_pct": round(100 * summary.failures / summary.total, 2) if summary.total else 0.0,
+    }
+
+
+def run_server(name: str, levels, duration: float) -> list:
+    port, command = SERVERS[name]
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, TODO_DATABASE=os.path.join(workdir, "fullstack_sqlite.db"))
+        proc = subprocess.Popen(command(port), cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            return [measure(port, level, duration, workdir) for level in levels]
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the Flask and ASGI todo servers under load.")
+    parser.add_argument("--concurrency", default="10,100,1000", help="comma separated levels (default: 10,100,1000)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level (default: 20)")
+    parser.add_argument("--servers", default="flask,asgi", help="comma separated subset of: flask, asgi")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    raise_nofile_limit()
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = {}
+    for name in args.servers.split(","):
+        if name == "asgi" and importlib.util.find_spec("uvicorn") is None:
+            print("skipping asgi: uvicorn is not installed (pip install uvicorn)")
+            continue
+        results[name] = run_server(name, levels, args.duration)
+
+    print(f"\n{'server':<7} {'conc':>6} {'samples':>8} {'req/s':>9} {'p50 ms':>7} {'p99 ms':>7} {'err%':>6}")
+    for name, rows in results.items():
+        for r in rows:
+            print(f"{name:<7} {r['concurrency']:>6} {r['samples']:>8} {r['req_per_sec']:>9.1f} {r['p50_ms']:>7} "
+                  f"{r['p99_ms']:>7} {r['error_pct']:>6.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import argparse
+import json
+import math
+import random
+import sys
+from bisect import bisect_left
+from itertools import accumulate
+
+import summary_jtl
+from summary_jtl import PERCENTILES, BucketStats, LatencyHistogram
+
+"""
+Run-vs-run regression gate for JMeter .jtl results.
+
+Usage:
+  python compare_jtl.py baseline.jtl candidate.jtl [--max-latency-increase 10]
+      [--max-error-rate-increase 1] [--max-throughput-drop 10] [--json report.json]
+
+Both sides may be several files or glob patterns (comma separated). For
+every sampler label the script reports throughput, error rate and
+p50/p95/p99 elapsed time for baseline and candidate, the delta, and a
+bootstrap confidence interval for each delta.
+
+The exit status is 1 when any label regresses beyond a threshold and the
+regression is significant (its confidence interval excludes zero), 0
+otherwise. Throughput has no interval: it is a single number per run.
+
+Both runs are summarized with summary_jtl (chunked parsing, process pool,
+mergeable histograms). The bootstrap never materialises resamples: the k-th
+smallest of n draws from the empirical distribution is F^-1(U) with
+U ~ Beta(k, n + 1 - k), so each bootstrap replicate of a percentile is one
+betavariate() plus a bisect over the histogram's cumulative counts. The cost
+is independent of the number of samples. Error-rate replicates are drawn
+the same way, from Beta(failures + 1/2, passes + 1/2) (the Jeffreys
+posterior of the rate), so the interval keeps a width when a side has no
+failures, or nothing but failures, where resampling would not.
+"""
+
+GATED_PERCENTILES = (50, 95, 99)
+
+
+def _rank(n: int, pct: float) -> int:
+    return max(1, -(-n * pct // 100))
+
+
+def bootstrap_percentiles(hist: LatencyHistogram, iterations: int, rng: random.Random) -> dict:
+    """Bootstrap replicates of each gated percentile of hist.
+
+    Returns {pct: [replicate value per iteration]} in milliseconds; the
+    lists are empty when hist has no samples.
+    """
+    if not hist.count:
+        return {p: [] for p in GATED_PERCENTILES}
+    buckets = hist.buckets()
+    values = [v for v, _ in buckets]
+    cum = list(accumulate(n for _, n in buckets))
+    n = hist.count
+    replicates = {}
+    for p in GATED_PERCENTILES:
+        k = _rank(n, p)
+        out = replicates[p] = []
+        for _ in range(iterations):
+            u = rng.betavariate(k, n + 1 - k)
+            out.append(values[min(len(values) - 1, bisect_left(cum, u * n))])
+    return replicates
+
+
+def bootstrap_error_rate(stats: BucketStats, iterations: int, rng: random.Random) -> list:
+    """Bootstrap replicates of the failure rate of stats, one per iteration."""
+    failures = stats.failures
+    passes = stats.count - failures
+    return [rng.betavariate(failures + 0.5, passes + 0.5) for _ in range(iterations)]
+
+
+def _interval(values, confidence: float):
+    values = sorted(values)
+    tail = (1 - confidence) / 2
+    lo = values[int(tail * (len(values) - 1))]
+    hi = values[int(math.ceil((1 - tail) * (len(values) - 1)))]
+    return lo, hi
+
+
+def _pct_change(base, cand):
+    if base in (None, 0) or cand is None:
+        return None
+    return 100.0 * (cand - base) / base
+
+
+def load_run(patterns, jobs: int = None):
+    """Summarize one side; returns ({label: BucketStats}, duration in seconds)."""
+    summary = summary_jtl.summarize_paths(patterns, jobs, bucket_ms=1000)
+    timeline = summary.timeline
+    starts = [start for _, start in timeline.buckets]
+    duration = (max(starts) - min(starts) + timeline.bucket_ms) / 1000 if starts else 0.0
+    return timeline.per_label(), duration
+
+
+def compare_label(base: BucketStats, cand: BucketStats, base_secs: float, cand_secs: float,
+                  args, rng: random.Random) -> dict:
+    """Deltas, confidence intervals and gate verdicts for one label."""
+    result = {"baseline_samples": base.count, "candidate_samples": cand.count, "regressions": []}
+
+    base_tp = base.count / base_secs if base_secs else 0.0
+    cand_tp = cand.count / cand_secs if cand_secs else 0.0
+    tp_change = _pct_change(base_tp, cand_tp)
+    result["throughput"] = {"baseline": round(base_tp, 3), "candidate": round(cand_tp, 3),
+                            "change_pct": None if tp_change is None else round(tp_change, 2)}
+
+    base_err = base.failures / base.count
+    cand_err = cand.failures / cand.count
+    diff = cand_err - base_err
+    err_lo, err_hi = _interval([rc - rb for rb, rc in zip(bootstrap_error_rate(base, args.iterations, rng),
+                                                           bootstrap_error_rate(cand, args.iterations, rng))],
+                               args.confidence)
+    result["error_rate"] = {"baseline": round(base_err, 5), "candidate": round(cand_err, 5),
+                            "delta_pp": round(100 * diff, 3),
+                            "ci_pp": [round(100 * err_lo, 3), round(100 * err_hi, 3)]}
+
+    gated = min(base.count, cand.count) >= args.min_samples
+    result["gated"] = gated
+    if gated and tp_change is not None and args.max_throughput_drop is not None and -tp_change > args.max_throughput_drop:
+        result["regressions"].append(f"throughput -{-tp_change:.1f}%")
+    if gated and args.max_error_rate_increase is not None and 100 * diff > args.max_error_rate_increase \
+            and err_lo > 0:
+        result["regressions"].append(f"error rate +{100 * diff:.2f}pp")
+
+    if not base.elapsed.count or not cand.elapsed.count:
+        # rows without an elapsed value on one side: no percentiles to compare, and nothing to gate
+        for p in GATED_PERCENTILES:
+            result[f"p{p}"] = {"baseline": base.elapsed.percentile(p), "candidate": cand.elapsed.percentile(p),
+                               "delta_ms": None, "change_pct": None, "ci_ms": None}
+        return result
+    base_reps = bootstrap_percentiles(base.elapsed, args.iterations, rng)
+    cand_reps = bootstrap_percentiles(cand.elapsed, args.iterations, rng)
+    for p in GATED_PERCENTILES:
+        b, c = base.elapsed.percentile(p), cand.elapsed.percentile(p)
+        delta = c - b
+        lo, hi = _interval([rc - rb for rb, rc in zip(base_reps[p], cand_reps[p])], args.confidence)
+        change = _pct_change(b, c)
+        result[f"p{p}"] = {"baseline": b, "candidate": c, "delta_ms": delta,
+                           "change_pct": None if change is None else round(change, 2),
+                           "ci_ms": [round(lo, 1), round(hi, 1)]}
+        if gated and change is not None and args.max_latency_increase is not None \
+                and change > args.max_latency_increase and lo > 0:
+            result["regressions"].append(f"p{p} +{change:.1f}%")
+    return result
+
+
+def compare(baseline, candidate, args) -> dict:
+    """Compare two runs; returns the full report dict."""
+    rng = random.Random(args.seed)
+    base_labels, base_secs = load_run(baseline, args.jobs)
+    cand_labels, cand_secs = load_run(candidate, args.jobs)
+    for side in (base_labels, cand_labels):
+        total = BucketStats()
+        for stats in side.values():
+            total.merge(stats)
+        if total.count:
+            side[summary_jtl.Timeline.TOTAL] = total
+    labels = [label for label in base_labels if label in cand_labels]
+    if args.labels:
+        labels = [label for label in labels if label in args.labels]
+    report = {"baseline_seconds": base_secs, "candidate_seconds": cand_secs,
+              "only_in_baseline": sorted(set(base_labels) - set(cand_labels)),
+              "only_in_candidate": sorted(set(cand_labels) - set(base_labels)),
+              "labels": {}}
+    for label in labels:
+        report["labels"][label] = compare_label(base_labels[label], cand_labels[label],
+                                                base_secs, cand_secs, args, rng)
+    report["regressed"] = sorted(label for label, r in report["labels"].items() if r["regressions"])
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"{'label':<24} {'metric':<11} {'baseline':>10} {'candidate':>10} {'delta':>10} {'change':>8}  ci")
+    for label, r in report["labels"].items():
+        rows = [("req/s", r["throughput"]["baseline"], r["throughput"]["candidate"], None,
+                 r["throughput"]["change_pct"], None),
+                ("error %", 100 * r["error_rate"]["baseline"], 100 * r["error_rate"]["candidate"],
+                 r["error_rate"]["delta_pp"], None, r["error_rate"]["ci_pp"])]
+        for p in GATED_PERCENTILES:
+            d = r[f"p{p}"]
+            rows.append((f"p{p} ms", d["baseline"], d["candidate"], d["delta_ms"], d["change_pct"], d["ci_ms"]))
+        for i, (metric, b, c, delta, change, ci) in enumerate(rows):
+            name = label[:24] if i == 0 else ""
+            delta_s = "" if delta is None else f"{delta:+.2f}"
+            change_s = "" if change is None else f"{change:+.1f}%"
+            ci_s = "" if ci is None else f"[{ci[0]:+}, {ci[1]:+}]"
+            b_s, c_s = ("no samples" if v is None else f"{v:.2f}" for v in (b, c))
+            print(f"{name:<24} {metric:<11} {b_s:>10} {c_s:>10} {delta_s:>10} {change_s:>8}  {ci_s}")
+        if r["regressions"]:
+            print(f"{'':<24} REGRESSION: {', '.join(r['regressions'])}")
+        elif not r["gated"]:
+            print(f"{'':<24} (too few samples to gate)")
+    for key in ("only_in_baseline", "only_in_candidate"):
+        if report[key]:
+            print(f"{key.replace('_', ' ')}: {', '.join(report[key])}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two JMeter runs and fail on latency/error regressions.")
+    parser.add_argument("baseline", help="baseline JTL file(s) or glob(s), comma separated")
+    parser.add_argument("candidate", help="candidate JTL file(s) or glob(s), comma separated")
+    parser.add_argument("--max-latency-increase", type=float, default=10.0, metavar="PCT",
+                        help="fail when p50/p95/p99 grows by more than PCT%% (default: 10)")
+    parser.add_argument("--max-error-rate-increase", type=float, default=1.0, metavar="PP",
+                        help="fail when the error rate grows by more than PP percentage points (default: 1)")
+    parser.add_argument("--max-throughput-drop", type=float, default=None, metavar="PCT",
+                        help="fail when throughput drops by more than PCT%% (default: not gated)")
+    parser.add_argument("--min-samples", type=int, default=30,
+                        help="labels with fewer samples on either side are reported but not gated")
+    parser.add_argument("--label", dest="labels", action="append", metavar="NAME",
+                        help="only compare this label (repeatable; TOTAL is the all-label aggregate)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level (default: 0.95)")
+    parser.add_argument("--iterations", type=int, default=2000, help="bootstrap iterations (default: 2000)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the bootstrap")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for parsing")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+
+    baseline = summary_jtl.expand_paths(args.baseline.split(","))
+    candidate = summary_jtl.expand_paths(args.candidate.split(","))
+    if not baseline or not candidate:
+        print("no JTL files matched", file=sys.stderr)
+        return 2
+    report = compare(baseline, candidate, args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+            f.write("\n")
+    if report["regressed"]:
+        print(f"FAIL: regression in {', '.join(report['regressed'])}")
+        return 1
+    print("PASS: no significant regression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
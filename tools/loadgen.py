@@ -0,0 +1,479 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import random
+import socket
+import sys
+import time
+import urllib.request
+from urllib.error import URLError
+from urllib.parse import urlencode
+
+"""
+Pure-Python asyncio load generator for the demo apps.
+
+Usage:
+  python loadgen.py bookstore --threads 10 --ramp 5 --loops 1
+  python loadgen.py food --rate 50 --duration 60
+  python loadgen.py fullstack_sqlite --threads 100 --duration 30 -o fullstack_sqlite_loadgen.jtl
+  python loadgen.py fullstack_sqlite_batch --threads 10 --loops 20
+
+Each scenario replays the samplers of the matching JMeter plan
+(bookstore_test_plan.jmx, food_test_plan.jmx, fullstack_sqlite_test_plan.jmx)
+with the same labels, request bodies and CSV data files. Redirects are not
+followed, as in the plans. Cookies set by the server are sent back for the
+rest of the iteration and dropped after it, like a JMeter HTTP Cookie
+Manager with "clear cookies each iteration" (the food plan logs in this
+way before ordering). fullstack_sqlite_batch
+has no JMeter counterpart: it creates, completes and deletes tasks through
+the /api/tasks/batch endpoints, BATCH_SIZE at a time.
+
+Two load models are supported:
+  closed  --threads/--ramp/--loops (or --duration): every virtual user runs
+          the scenario in a loop, like a JMeter thread group.
+  open    --rate N (scenario iterations started per second) for --duration
+          seconds, independent of how fast the server answers.
+
+Connections are HTTP/1.1 keep-alive and are reused through a small pool.
+Results are written as a standard JMeter CSV .jtl (same columns and header
+as JMeter's default save service), so summary_jtl.py and
+`jmeter -g results.jtl -o report/` work unchanged. With --metrics FILE the
+app's /metrics endpoint (server-side latency, DB and render time per route)
+is saved next to the client-side results once the run is over.
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JTL_FIELDS = ["timeStamp", "elapsed", "label", "responseCode", "responseMessage", "threadName",
+              "dataType", "success", "failureMessage", "bytes", "sentBytes", "grpThreads",
+              "allThreads", "URL", "Latency", "IdleTime", "Connect"]
+
+
+class Step:
+    """One HTTP sampler: method, path and an optional form or raw body.
+
+    ${name} placeholders in the path, form values and body are replaced
+    from the current CSV row, as JMeter does. `extract` maps variable names
+    to functions of the parsed JSON response; their results can be used as
+    ${name} by the later steps of the same iteration (JMeter's JSON Extractor).
+    `expect` is the status code the sample must return to count as a
+    success (JMeter's Response Assertion); by default any 2xx or 3xx does.
+    """
+
+    def __init__(self, label, method, path, form=None, body=None, extract=None, expect=None):
+        self.label = label
+        self.method = method
+        self.path = path
+        self.form = form
+        self.body = body
+        self.extract = extract
+        self.expect = expect
+
+
+class Scenario:
+    def __init__(self, name, port, data_file, fields, steps, headers=None):
+        self.name = name
+        self.port = port
+        self.data_file = data_file
+        self.fields = fields
+        self.steps = steps
+        self.headers = headers or {}
+
+
+BATCH_SIZE = 50
+
+SCENARIOS = {
+    "bookstore": Scenario(
+        "bookstore", 5001, os.path.join(ROOT, "bookstore", "bookstore_users.csv"), ["username", "password"],
+        [
+            Step("POST Register", "POST", "/register", form={"username": "${username}", "password": "${password}"}),
+            Step("GET Home", "GET", "/"),
+            Step("GET Catalogue", "GET", "/catalogue"),
+            Step("POST Login", "POST", "/login", form={"username": "${username}", "password": "${password}"}),
+        ],
+    ),
+    "food": Scenario(
+        "food", 5002, os.path.join(ROOT, "food_ordering", "food_users.csv"), ["username", "password", "coupon"],
+        [
+            Step("POST Register", "POST", "/register", form={"username": "${username}", "password": "${password}"}),
+            Step("POST Login", "POST", "/login", form={"username": "${username}", "password": "${password}"}),
+            Step("GET Home", "GET", "/"),
+            Step("GET Menu", "GET", "/menu"),
+            Step("POST Order", "POST", "/order", form={"item_id": "1", "coupon": "${coupon}"}),
+            Step("POST Pay", "POST", "/pay", form={"card": "4111111111111111", "name": "Test User"}, expect=200),
+        ],
+    ),
+    "fullstack_sqlite": Scenario(
+        "fullstack_sqlite", 5004, os.path.join(ROOT, "fullstack_sqlite", "tasks.csv"), ["text"],
+        [
+            Step("GET Home", "GET", "/"),
+            Step("GET Tasks", "GET", "/api/tasks"),
+            Step("POST AddTask", "POST", "/api/tasks", body='{"text":"${text}"}'),
+        ],
+        headers={"Content-Type": "application/json"},
+    ),
+    "fullstack_sqlite_batch": Scenario(
+        "fullstack_sqlite_batch", 5004, os.path.join(ROOT, "fullstack_sqlite", "tasks.csv"), ["text"],
+        [
+            Step("POST AddTasksBatch", "POST", "/api/tasks/batch",
+                 body=json.dumps([{"text": f"${{text}} #{i}"} for i in range(BATCH_SIZE)]),
+                 extract={"ids": lambda tasks: ",".join(str(t["id"]) for t in tasks),
+                          "updates": lambda tasks: json.dumps([{"id": t["id"], "completed": True} for t in tasks])}),
+            Step("GET TasksPage", "GET", "/api/tasks?completed=false&limit=100"),
+            Step("PUT CompleteTasksBatch", "PUT", "/api/tasks/batch", body="${updates}"),
+            Step("DELETE TasksBatch", "DELETE", "/api/tasks/batch", body="[${ids}]"),
+        ],
+        headers={"Content-Type": "application/json"},
+    ),
+}
+
+
+def substitute(template: str, row: dict) -> str:
+    for name, value in row.items():
+        template = template.replace("${" + name + "}", value)
+    return template
+
+
+class CsvData:
+    """Shared, recycling CSV data set (JMeter shareMode=all, recycle=true)."""
+
+    def __init__(self, path: str, fields):
+        with open(path, newline="") as f:
+            rows = [r for r in csv.reader(f) if r]
+        if not rows:
+            rows = [[]]
+        self.fields = fields
+        self._rows = itertools.cycle(rows)
+
+    def next(self) -> dict:
+        row = next(self._rows)
+        return {name: row[i] if i < len(row) else "" for i, name in enumerate(self.fields)}
+
+
+class HttpError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, reader, writer, connect_ms):
+        self.reader = reader
+        self.writer = writer
+        self.connect_ms = connect_ms
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """Idle keep-alive connections to one host:port, reused LIFO."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.idle = []
+
+    async def acquire(self) -> Connection:
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.reader.at_eof():
+                conn.connect_ms = 0
+                return conn
+            conn.close()
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return Connection(reader, writer, int((time.perf_counter() - start) * 1000))
+
+    def release(self, conn: Connection, keep_alive: bool) -> None:
+        if keep_alive:
+            self.idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        for conn in self.idle:
+            conn.close()
+        self.idle = []
+
+
+async def _read_body(reader, headers: dict, method: str, status: int, sink: list = None) -> int:
+    """Consume the response body and return its size on the wire; chunks go to sink if given."""
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return 0
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        size = 0
+        while True:
+            line = await reader.readline()
+            n = int(line.split(b";", 1)[0], 16)
+            size += len(line)
+            if n == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return size + 2
+            data = await reader.readexactly(n + 2)
+            if sink is not None:
+                sink.append(data[:-2])
+            size += n + 2
+    if "content-length" in headers:
+        data = await reader.readexactly(int(headers["content-length"]))
+    else:
+        data = await reader.read()
+    if sink is not None:
+        sink.append(data)
+    return len(data)
+
+
+def parse_set_cookie(value: str):
+    """(name, value) of a Set-Cookie header; value is None if the cookie is being deleted."""
+    pair, *attrs = value.split(";")
+    name, _, cookie = pair.strip().partition("=")
+    for attr in attrs:
+        key, _, arg = attr.strip().partition("=")
+        if key.lower() == "max-age" and arg.strip().lstrip("-").isdigit() and int(arg) <= 0:
+            return name, None
+    return name, cookie
+
+
+async def http_request(pool: ConnectionPool, method: str, path: str, headers: dict, body: bytes,
+                       keep_body: bool = False):
+    """Send one request; returns a dict of the JTL timing/size fields, the Set-Cookie values
+    (and "body" if keep_body)."""
+    conn = await pool.acquire()
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {pool.host}:{pool.port}", "Connection: keep-alive"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    if body is not None:
+        lines.append(f"Content-Length: {len(body)}")
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+    keep_alive = False
+    try:
+        start = time.perf_counter()
+        conn.writer.write(request)
+        await conn.writer.drain()
+        status_line = await conn.reader.readline()
+        latency = time.perf_counter() - start
+        if not status_line:
+            raise HttpError("connection closed by server")
+        version, status, reason = (status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        status = int(status)
+        received = len(status_line)
+        resp_headers = {}
+        set_cookies = []
+        while True:
+            line = await conn.reader.readline()
+            received += len(line)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            resp_headers[name] = value.strip()
+            if name == "set-cookie":
+                set_cookies.append(value.strip())
+        sink = [] if keep_body else None
+        received += await _read_body(conn.reader, resp_headers, method, status, sink)
+        elapsed = time.perf_counter() - start
+        connection = resp_headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+    finally:
+        pool.release(conn, keep_alive)
+    return {"code": status, "message": reason, "elapsed": elapsed, "latency": latency,
+            "connect": conn.connect_ms, "bytes": received, "sent": len(request), "cookies": set_cookies,
+            "body": b"".join(sink) if keep_body else None}
+
+
+class JtlWriter:
+    """Buffered writer for JMeter CSV results, flushed at least every second."""
+
+    def __init__(self, path: str):
+        self.f = open(path, "w", newline="")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(JTL_FIELDS)
+        self.count = 0
+        self.failures = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, row) -> None:
+        self.writer.writerow(row)
+        self.count += 1
+        now = time.monotonic()
+        if now - self._last_flush >= 1.0:
+            self.f.flush()
+            self._last_flush = now
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class LoadRunner:
+    def __init__(self, scenario: Scenario, host: str, port: int, jtl: JtlWriter, timeout: float):
+        self.scenario = scenario
+        self.host = host
+        self.port = port
+        self.pool = ConnectionPool(host, port)
+        self.data = CsvData(scenario.data_file, scenario.fields)
+        self.jtl = jtl
+        self.timeout = timeout
+        self.active = 0
+
+    async def sample(self, step: Step, row: dict, thread_name: str, cookies: dict = None) -> None:
+        path = substitute(step.path, row)
+        headers = dict(self.scenario.headers)
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+        body = None
+        if step.form is not None:
+            body = urlencode({k: substitute(v, row) for k, v in step.form.items()}).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif step.body is not None:
+            body = substitute(step.body, row).encode()
+        url = f"http://{self.host}:{self.port}{path}"
+        ts = int(time.time() * 1000)
+        start = time.perf_counter()
+        try:
+            r = await asyncio.wait_for(http_request(self.pool, step.method, path, headers, body,
+                                                    keep_body=step.extract is not None), self.timeout)
+            success = r["code"] == step.expect if step.expect else 200 <= r["code"] < 400
+            if cookies is not None:
+                for name, value in map(parse_set_cookie, r["cookies"]):
+                    if value is None:
+                        cookies.pop(name, None)
+                    else:
+                        cookies[name] = value
+            if success and step.extract:
+                data = json.loads(r["body"])
+                for name, extract in step.extract.items():
+                    row[name] = str(extract(data))
+            failure = "" if success or not step.expect else f"Response code was {r['code']}, expected {step.expect}"
+            row_out = [ts, int(r["elapsed"] * 1000), step.label, r["code"], r["message"], thread_name, "text",
+                       "true" if success else "false", failure, r["bytes"], r["sent"], self.active, self.active, url,
+                       int(r["latency"] * 1000), 0, r["connect"]]
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HttpError, ValueError,
+                KeyError, TypeError) as e:
+            success = False
+            elapsed = int((time.perf_counter() - start) * 1000)
+            message = f"Non HTTP response message: {e or type(e).__name__}"
+            row_out = [ts, elapsed, step.label, f"Non HTTP response code: {type(e).__name__}", message,
+                       thread_name, "text", "false", "", 0, 0, self.active, self.active, url, 0, 0, 0]
+        if not success:
+            self.jtl.failures += 1
+        self.jtl.write(row_out)
+
+    async def iteration(self, thread_name: str) -> None:
+        row = self.data.next()
+        cookies = {}
+        for step in self.scenario.steps:
+            await self.sample(step, row, thread_name, cookies)
+
+    async def run_closed(self, threads: int, ramp: float, loops: int, duration: float) -> None:
+        deadline = time.monotonic() + duration if duration else None
+
+        async def user(n: int):
+            await asyncio.sleep(ramp * n / threads if threads else 0)
+            self.active += 1
+            try:
+                done = 0
+                while (loops < 0 or done < loops) and (deadline is None or time.monotonic() < deadline):
+                    await self.iteration(f"Users 1-{n + 1}")
+                    done += 1
+            finally:
+                self.active -= 1
+
+        await asyncio.gather(*(user(n) for n in range(threads)))
+
+    async def run_open(self, rate: float, duration: float, max_inflight: int, poisson: bool) -> int:
+        """Start rate iterations/sec for duration seconds; returns skipped arrivals."""
+        inflight = set()
+        skipped = 0
+        start = time.monotonic()
+        next_at = start
+        n = 0
+        rng = random.Random()
+        while next_at < start + duration:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            n += 1
+            if len(inflight) >= max_inflight:
+                skipped += 1
+            else:
+                task = asyncio.ensure_future(self._open_iteration(n))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+            next_at += rng.expovariate(rate) if poisson else 1.0 / rate
+        if inflight:
+            await asyncio.gather(*inflight)
+        return skipped
+
+    async def _open_iteration(self, n: int) -> None:
+        self.active += 1
+        try:
+            await self.iteration(f"Arrivals 1-{n}")
+        finally:
+            self.active -= 1
+
+
+async def run(args) -> int:
+    scenario = SCENARIOS[args.scenario]
+    port = args.port or scenario.port
+    output = args.output or f"{scenario.name}_loadgen_result.jtl"
+    jtl = JtlWriter(output)
+    runner = LoadRunner(scenario, args.host, port, jtl, args.timeout)
+    started = time.monotonic()
+    skipped = 0
+    try:
+        if args.rate:
+            skipped = await runner.run_open(args.rate, args.duration or 60, args.max_inflight, args.poisson)
+        else:
+            loops = -1 if args.duration and args.loops is None else (args.loops or 1)
+            await runner.run_closed(args.threads, args.ramp, loops, args.duration)
+    finally:
+        runner.pool.close()
+        jtl.close()
+    took = time.monotonic() - started
+    print(f"{jtl.count} samples ({jtl.failures} failed) in {took:.1f}s, {jtl.count / took:.1f} req/s -> {output}")
+    if skipped:
+        print(f"warning: {skipped} arrivals skipped because --max-inflight {args.max_inflight} was reached")
+    if args.metrics:
+        scrape_metrics(args.host, port, args.metrics, args.timeout)
+    return 0
+
+
+def scrape_metrics(host: str, port: int, path: str, timeout: float) -> None:
+    """Save the app's Prometheus-text /metrics page to path."""
+    url = f"http://{host}:{port}/metrics"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read()
+    except (URLError, OSError) as exc:
+        print(f"warning: could not scrape {url}: {exc}")
+        return
+    with open(path, "wb") as f:
+        f.write(body)
+    print(f"server metrics -> {path}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Asyncio load generator for the demo apps (writes JMeter CSV .jtl).")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS), help="which app/test plan to replay")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, help="override the scenario's default port")
+    parser.add_argument("-o", "--output", help="JTL output path (default: <scenario>_loadgen_result.jtl)")
+    parser.add_argument("--threads", type=int, default=10, help="closed model: virtual users (default: 10)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="closed model: ramp-up seconds (default: 5)")
+    parser.add_argument("--loops", type=int, help="closed model: iterations per user (default: 1, or unlimited with --duration)")
+    parser.add_argument("--rate", type=float, help="open model: scenario iterations started per second")
+    parser.add_argument("--duration", type=float, help="run time limit in seconds (open model default: 60)")
+    parser.add_argument("--poisson", action="store_true", help="open model: exponential inter-arrival times")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="open model: cap on concurrent iterations")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--metrics", metavar="FILE", help="save the app's /metrics page to FILE after the run")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
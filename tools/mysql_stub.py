@@ -0,0 +1,390 @@
+import argparse
+import os
+import re
+import socket
+import socketserver
+import sqlite3
+import struct
+import sys
+import threading
+import time
+
+"""
+A MySQL server stand-in for tests and benchmarks: speaks enough of the
+client/server protocol for mysql.connector (pure Python or C extension)
+and stores the data in one SQLite file.
+
+    with MySQLStub(str(tmp_path / "stub.db")) as stub:
+        conn = mysql.connector.connect(host="127.0.0.1", port=stub.port, user="root",
+                                       password="x", database="todo_db")
+
+  python tools/mysql_stub.py --port 3307 [--db stub.db] [--connect-delay-ms 3]
+
+What it does: the v10 handshake (any user and password are accepted, no
+TLS), COM_QUERY with text result sets streamed to the client as SQLite
+produces the rows, COM_PING, COM_INIT_DB, COM_RESET_CONNECTION and
+COM_QUIT; transactions follow the session's autocommit setting and the
+OK packet carries the in-transaction flag, affected rows (rows matched,
+as with CLIENT_FOUND_ROWS) and the first id of a multi-row INSERT.
+
+The SQL is passed to SQLite after a few rewrites: MySQL string escapes,
+backtick identifiers, INT ... AUTO_INCREMENT, LAST_INSERT_ID() and SHOW
+TABLES LIKE. That covers what the todo apps and tools send; anything else
+is answered with the SQLite error as a MySQL ERR packet. Prepared
+statements (COM_STMT_*) are not supported.
+
+connect_delay adds a sleep before the greeting, to stand in for the
+authentication and TLS setup of a real server when comparing
+connect-per-request with pooled connections.
+"""
+
+CLIENT_FOUND_ROWS = 0x2
+CAPABILITIES = (0x1 | CLIENT_FOUND_ROWS | 0x4 | 0x8  # long password, found rows, long flag, connect with db
+                | 0x200 | 0x2000 | 0x8000          # protocol 41, transactions, secure connection
+                | 0x20000 | 0x80000 | 0x200000)    # multi results, plugin auth, lenenc auth data
+SERVER_STATUS_IN_TRANS = 0x1
+SERVER_STATUS_AUTOCOMMIT = 0x2
+UTF8MB4, BINARY = 255, 63
+TYPE_DOUBLE, TYPE_LONGLONG, TYPE_BLOB, TYPE_VAR_STRING = 0x05, 0x08, 0xfc, 0xfd
+COM_QUIT, COM_INIT_DB, COM_QUERY, COM_PING, COM_RESET_CONNECTION = 0x01, 0x02, 0x03, 0x0e, 0x1f
+FLUSH_BYTES = 64 << 10
+FETCH_ROWS = 256
+
+_MYSQL_ESCAPES = {"0": "\0", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a", "b": "\b"}
+_REWRITES = [
+    (re.compile(r"\bINT(EGER)?(\s+NOT\s+NULL)?\s+PRIMARY\s+KEY\s+AUTO_INCREMENT\b", re.I),
+     "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bAUTO_INCREMENT\b", re.I), ""),
+]
+_SHOW_TABLES = re.compile(r"^\s*SHOW\s+TABLES(\s+LIKE\s+(?P<like>'.*'))?\s*$", re.I | re.S)
+_AUTOCOMMIT = re.compile(r"autocommit\s*=\s*(?P<value>\w+)", re.I)
+_LAST_INSERT_ID = re.compile(r"\bLAST_INSERT_ID\(\)", re.I)
+_VARIABLE = re.compile(r"@@(?:session\.|global\.)?(\w+)", re.I)
+
+
+def lenenc_int(n: int) -> bytes:
+    if n < 251:
+        return bytes([n])
+    if n < 1 << 16:
+        return b"\xfc" + struct.pack("<H", n)
+    if n < 1 << 24:
+        return b"\xfd" + struct.pack("<I", n)[:3]
+    return b"\xfe" + struct.pack("<Q", n)
+
+
+def lenenc_str(value: bytes) -> bytes:
+    return lenenc_int(len(value)) + value
+
+
+def translate(sql: str, last_insert_id: int = 0, variables=None) -> str:
+    """Rewrite the MySQL dialect the clients send into SQLite's.
+
+    @@variables are replaced by their value in `variables` (NULL if absent).
+    """
+    variables = variables or {}
+    out, i, n = [], 0, len(sql)
+    plain = []
+
+    def flush_plain():
+        text = "".join(plain)
+        for pattern, replacement in _REWRITES:
+            text = pattern.sub(replacement, text)
+        text = _VARIABLE.sub(lambda m: str(variables.get(m.group(1).lower(), "NULL")), text)
+        out.append(_LAST_INSERT_ID.sub(str(last_insert_id), text))
+        plain.clear()
+
+    while i < n:
+        c = sql[i]
+        if c in "'\"":
+            flush_plain()
+            value, i = [], i + 1
+            while i < n:
+                ch = sql[i]
+                if ch == "\\" and i + 1 < n:
+                    value.append(_MYSQL_ESCAPES.get(sql[i + 1], sql[i + 1]))
+                    i += 2
+                elif ch == c and i + 1 < n and sql[i + 1] == c:
+                    value.append(c)
+                    i += 2
+                elif ch == c:
+                    i += 1
+                    break
+                else:
+                    value.append(ch)
+                    i += 1
+            out.append("'" + "".join(value).replace("'", "''") + "'")
+        elif c == "`":
+            end = sql.index("`", i + 1)
+            plain.append('"' + sql[i + 1:end] + '"')
+            i = end + 1
+        else:
+            plain.append(c)
+            i += 1
+    flush_plain()
+    return "".join(out)
+
+
+class _Session(socketserver.BaseRequestHandler):
+    server: "_Server"
+
+    def setup(self):
+        with self.server.lock:
+            self.server.sessions.add(self.request)
+        self.seq = 0
+        self.out = bytearray()
+        self.autocommit = False
+        self.last_insert_id = 0
+        self.db = sqlite3.connect(self.server.path, isolation_level="DEFERRED")
+        self.db.execute("PRAGMA busy_timeout = 5000")
+
+    def finish(self):
+        with self.server.lock:
+            self.server.sessions.discard(self.request)
+        self.db.close()
+
+    # --- Packets ---
+
+    def read_packet(self):
+        header = self._read_exact(4)
+        if header is None:
+            return None
+        length = header[0] | header[1] << 8 | header[2] << 16
+        self.seq = (header[3] + 1) & 0xff
+        return self._read_exact(length)
+
+    def _read_exact(self, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+
+    def write_packet(self, payload: bytes):
+        self.out += struct.pack("<I", len(payload))[:3] + bytes([self.seq]) + payload
+        self.seq = (self.seq + 1) & 0xff
+        if len(self.out) >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.out:
+            self.request.sendall(self.out)
+            self.out.clear()
+
+    def status(self) -> int:
+        return ((SERVER_STATUS_AUTOCOMMIT if self.autocommit else 0)
+                | (SERVER_STATUS_IN_TRANS if self.db.in_transaction else 0))
+
+    def ok(self, affected=0, insert_id=0):
+        self.write_packet(b"\x00" + lenenc_int(affected) + lenenc_int(insert_id)
+                          + struct.pack("<HH", self.status(), 0))
+
+    def eof(self):
+        self.write_packet(b"\xfe" + struct.pack("<HH", 0, self.status()))
+
+    def error(self, code: int, state: str, message: str):
+        self.write_packet(b"\xff" + struct.pack("<H", code) + b"#" + state.encode() + message.encode()[:500])
+
+    # --- Connection ---
+
+    def handle(self):
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+        with self.server.lock:
+            self.server.connections += 1
+            conn_id = self.server.connections
+        salt = os.urandom(20)
+        self.write_packet(b"\x0a" + b"8.0.36-stub\x00" + struct.pack("<I", conn_id) + salt[:8] + b"\x00"
+                          + struct.pack("<HBHH", CAPABILITIES & 0xffff, UTF8MB4, SERVER_STATUS_AUTOCOMMIT,
+                                        CAPABILITIES >> 16)
+                          + bytes([21]) + b"\x00" * 10 + salt[8:] + b"\x00" + b"caching_sha2_password\x00")
+        self.flush()
+        response = self.read_packet()
+        if response is None:
+            return
+        self.autocommit = True  # the server default; clients turn it off with SET
+        self.db.isolation_level = None
+        self.ok()
+        self.flush()
+        while True:
+            packet = self.read_packet()
+            if not packet or packet[0] == COM_QUIT:
+                return
+            self.seq = 1
+            command = packet[0]
+            if command in (COM_PING, COM_INIT_DB):
+                self.ok()
+            elif command == COM_RESET_CONNECTION:
+                if self.db.in_transaction:
+                    self.db.rollback()
+                self.ok()
+            elif command == COM_QUERY:
+                with self.server.lock:
+                    self.server.queries += 1
+                self.query(packet[1:].decode("utf-8", "surrogateescape"))
+            else:
+                self.error(1047, "08S01", f"command {command:#x} is not supported by the stub")
+            self.flush()
+
+    # --- Queries ---
+
+    def query(self, sql: str):
+        words = sql.strip().rstrip(";").split(None, 2)
+        keyword = words[0].upper() if words else ""
+        try:
+            if keyword == "SET":
+                self.set(sql)
+            elif keyword in ("COMMIT", "ROLLBACK"):
+                if self.db.in_transaction:
+                    self.db.execute(keyword)
+                self.ok()
+            elif keyword == "BEGIN" or (keyword == "START" and len(words) > 1 and words[1].upper() == "TRANSACTION"):
+                if not self.db.in_transaction:
+                    self.db.execute("BEGIN")
+                self.ok()
+            else:
+                self.execute(sql, keyword)
+        except sqlite3.IntegrityError as e:
+            self.error(1062, "23000", str(e))
+        except sqlite3.Error as e:
+            code, state = (1146, "42S02") if "no such table" in str(e) else (1064, "42000")
+            self.error(code, state, str(e))
+
+    def set(self, sql: str):
+        match = _AUTOCOMMIT.search(sql)
+        if match:
+            self.autocommit = match.group("value").upper() in ("1", "ON", "TRUE")
+            if self.autocommit and self.db.in_transaction:
+                self.db.commit()
+            self.db.isolation_level = None if self.autocommit else "DEFERRED"
+        self.ok()
+
+    def execute(self, sql: str, keyword: str):
+        show = _SHOW_TABLES.match(sql)
+        if show:
+            sql = "SELECT name AS Tables_in_db FROM sqlite_master WHERE type = 'table'"
+            if show.group("like"):
+                sql += " AND name LIKE " + show.group("like")
+        cursor = self.db.execute(translate(sql, self.last_insert_id, {"autocommit": int(self.autocommit)}))
+        if cursor.description is None:
+            affected = max(cursor.rowcount, 0)
+            insert_id = 0
+            if keyword in ("INSERT", "REPLACE") and affected:
+                # MySQL reports the first id of a multi-row insert, SQLite the last
+                insert_id = self.last_insert_id = cursor.lastrowid - affected + 1
+            self.ok(affected, insert_id)
+            return
+        self.result_set(cursor)
+
+    def result_set(self, cursor):
+        rows = cursor.fetchmany(FETCH_ROWS)
+        names = [d[0] for d in cursor.description]
+        self.write_packet(lenenc_int(len(names)))
+        for index, name in enumerate(names):
+            sample = next((row[index] for row in rows if row[index] is not None), "")
+            if isinstance(sample, bool) or isinstance(sample, int):
+                column_type, charset = TYPE_LONGLONG, BINARY
+            elif isinstance(sample, float):
+                column_type, charset = TYPE_DOUBLE, BINARY
+            elif isinstance(sample, bytes):
+                column_type, charset = TYPE_BLOB, BINARY
+            else:
+                column_type, charset = TYPE_VAR_STRING, UTF8MB4
+            encoded = name.encode()
+            self.write_packet(lenenc_str(b"def") + lenenc_str(b"") + lenenc_str(b"") + lenenc_str(b"")
+                              + lenenc_str(encoded) + lenenc_str(encoded) + b"\x0c"
+                              + struct.pack("<HIBHB", charset, 255, column_type, 0, 0) + b"\x00\x00")
+        self.eof()
+        while rows:
+            for row in rows:
+                payload = bytearray()
+                for value in row:
+                    if value is None:
+                        payload += b"\xfb"
+                    elif isinstance(value, bytes):
+                        payload += lenenc_str(value)
+                    else:
+                        payload += lenenc_str(str(value).encode("utf-8", "surrogateescape"))
+                self.write_packet(bytes(payload))
+            rows = cursor.fetchmany(FETCH_ROWS)
+        self.eof()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # clients that hang up mid-result (e.g. closing an unread cursor) are not an error here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MySQLStub:
+    """A MySQL stand-in listening on host:port (port 0 picks a free one), data in the SQLite file `path`."""
+
+    def __init__(self, path: str, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0):
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode = wal")
+        conn.close()
+        self.server = _Server((host, port), _Session)
+        self.server.path = path
+        self.server.connect_delay = connect_delay
+        self.server.connections = 0
+        self.server.queries = 0
+        self.server.lock = threading.Lock()
+        self.server.sessions = set()
+        self.host, self.port = self.server.server_address[:2]
+        self._thread = None
+
+    def start(self) -> "MySQLStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), name="mysql-stub",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self._thread.join()
+
+    def disconnect_all(self) -> None:
+        """Drop every client connection, as a server restart or wait_timeout would."""
+        with self.server.lock:
+            sessions = list(self.server.sessions)
+        for sock in sessions:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {"connections": self.server.connections, "queries": self.server.queries}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a SQLite file over the MySQL protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3307)
+    parser.add_argument("--db", default="mysql_stub.db", help="SQLite file holding the data (default: mysql_stub.db)")
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0, help="sleep before each handshake")
+    args = parser.parse_args(argv)
+    stub = MySQLStub(args.db, args.host, args.port, args.connect_delay_ms / 1000)
+    print(f"MySQL stub on {stub.host}:{stub.port}, data in {args.db}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
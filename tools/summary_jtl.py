@@ -1,51 +1,1201 @@
+import argparse
 import csv
+import glob
+import json
+import math
+import mmap
+import os
+import shutil
 import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import compress, repeat
+from operator import and_, eq, not_
 
 """
 Simple summarizer for JMeter .jtl result files.
 
 Usage:
   python summary_jtl.py /path/to/results.jtl
+  python summary_jtl.py 'shards/*.jtl' bookstore/*.jtl food_ordering/*.jtl --jobs 8
+  python summary_jtl.py results.jtl --by-label --timeline timeline.csv [--bucket 1]
+  python summary_jtl.py results.jtl --follow [--interval 5] [--window 60]
+  python summary_jtl.py results.jtl --label "POST Login" --since 2024-05-01T10:00 --failures-only
 
-The script prints total samples, number of failures, and average elapsed time in ms.
+The script prints total samples, number of failures, average elapsed time in ms
+and p50/p90/p95/p99/max percentiles for the elapsed, latency and connect times.
 It attempts to read common JTL column names like 'elapsed' or 't' and 'success' or 's'.
+
+Percentiles are estimated in a single pass with a log-linear (HDR-style)
+histogram, so memory stays bounded no matter how large the JTL file is.
+
+The column layout is resolved once from the header; rows are then read in
+blocks of CHUNK_BYTES into typed arrays (JtlChunk) and folded into the summary
+with whole-column operations instead of a dict per row.
+
+Several files (paths or glob patterns) are summarized into one combined
+report. Large files are split into byte ranges aligned to row boundaries and
+the ranges are summarized in a process pool; the partial JtlSummary objects
+(counts, sums, histograms) merge exactly, so the combined percentiles are the
+same as a single sequential pass.
+
+--by-label prints one line per sampler label and --timeline writes per-label,
+per-time-bucket throughput, error rate and elapsed percentiles as CSV or JSON
+(chosen by the file extension), bucketed on the sample timeStamp.
+
+--follow tails a JTL that JMeter is still writing. Only complete rows are
+consumed (a partially written last line is left for the next poll), rolling
+window statistics are printed every --interval seconds, and the byte offset
+plus cumulative totals are checkpointed so a restarted summarizer resumes
+where it stopped instead of re-reading the file.
+
+--cache (implied by --label, --since, --until and --failures-only) parses the
+JTL once into a sidecar directory <jtl>.cache of typed binary columns plus a
+label dictionary and a per-block time index. Later runs memory-map those
+columns and answer label, time-range and failure filters without reading the
+CSV. The cache is rebuilt when the JTL's size or mtime changes.
 """
 
+# Candidate column names for each field, CSV name first, XML-style short name second.
+TIMESTAMP_KEYS = ("timeStamp", "ts")
+LABEL_KEYS = ("label", "lb")
+SUCCESS_KEYS = ("success", "s")
+METRIC_KEYS = {
+    "elapsed": ("elapsed", "t"),
+    "latency": ("Latency", "lt"),
+    "connect": ("Connect", "ct"),
+}
+PERCENTILES = (50, 90, 95, 99)
+
+
+
+class _SuccessValues(dict):
+    """Success cell -> 1 (pass) or 0, for map(_SUCCESS_VALUES.__getitem__, cells).
+
+    The usual spellings are plain lookups; any other cell is compared
+    case-insensitively against "true" and "1", as the row-by-row summary
+    did, so "tRue" passes and an empty cell fails. None marks a row that
+    ended before its success column, which is not counted as a failure.
+    """
+
+    def __missing__(self, value):
+        return 1 if value.lower() in ("true", "1") else 0
+
+
+_SUCCESS_VALUES = _SuccessValues({"true": 1, "True": 1, "TRUE": 1, "1": 1, "false": 0, "False": 0, "FALSE": 0,
+                                  None: 1})
+_INT64 = 1 << 63
+CHUNK_BYTES = 8 << 20
+READ_BUFFER = 1 << 20
+# Files are only split for the process pool in ranges of at least this size.
+MIN_RANGE_BYTES = 32 << 20
+# How often --follow checks the file for new rows.
+FOLLOW_POLL_SECONDS = 0.5
+# Column cache layout: rows per time-index block and array typecode per column.
+CACHE_VERSION = 3
+CACHE_BLOCK_ROWS = 8192
+CACHE_COLUMNS = {"timestamps": "q", "success": "b", "labels": "i",
+                 "elapsed": "d", "latency": "d", "connect": "d",
+                 "elapsed_missing": "b", "latency_missing": "b", "connect_missing": "b"}
+
+# Values below 2**SUB_BUCKET_BITS ms are stored exactly; above that each
+# power-of-two range is split into 2**(SUB_BUCKET_BITS - 1) linear buckets,
+# which bounds the relative error of a reported value to about 0.1%.
+SUB_BUCKET_BITS = 11
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + ((value >> shift) - SUB_BUCKET_HALF)
+
+
+def _bucket_upper_value(index: int) -> int:
+    """Highest value that maps to the given bucket index."""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift, offset = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+    shift += 1
+    return ((offset + SUB_BUCKET_HALF) << shift) + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """Streaming histogram of non-negative millisecond values.
+
+    Only bucket counts are kept (a sparse dict), so memory is bounded by the
+    number of distinct buckets rather than by the number of samples. Two
+    histograms can be combined exactly with merge().
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value, n: int = 1) -> None:
+        value = int(value)
+        if value < 0:
+            value = 0
+        idx = _bucket_index(value)
+        self.counts[idx] = self.counts.get(idx, 0) + n
+        self.count += n
+        self.total += value * n
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def record_counts(self, counts) -> None:
+        """Record a {value: occurrences} mapping, e.g. a Counter of a column."""
+        for value, n in counts.items():
+            self.record(value, n)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for idx, n in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def buckets(self):
+        """Return [(value, count), ...] in ascending order of value."""
+        return [(min(_bucket_upper_value(idx), self.max), self.counts[idx]) for idx in sorted(self.counts)]
+
+    def to_state(self) -> dict:
+        """JSON-serializable snapshot, see from_state()."""
+        return {"counts": [[idx, n] for idx, n in sorted(self.counts.items())],
+                "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "LatencyHistogram":
+        hist = cls()
+        hist.counts = {idx: n for idx, n in state["counts"]}
+        hist.count, hist.total = state["count"], state["total"]
+        hist.min, hist.max = state["min"], state["max"]
+        return hist
+
+    def percentile(self, pct: float):
+        """Return the value at the given percentile (0-100), or None if empty."""
+        if not self.count:
+            return None
+        # nearest-rank definition, same as JMeter's aggregate report
+        rank = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= rank:
+                return min(_bucket_upper_value(idx), self.max)
+        return self.max
+
+
+class JtlSummary:
+    """Aggregate statistics for a set of JTL samples."""
+
+    def __init__(self):
+        self.total = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.metrics = {name: LatencyHistogram() for name in METRIC_KEYS}
+        self.timeline = None
+
+    def merge(self, other: "JtlSummary") -> None:
+        self.total += other.total
+        self.failures += other.failures
+        self.total_time += other.total_time
+        for name, hist in other.metrics.items():
+            self.metrics[name].merge(hist)
+        if other.timeline is not None:
+            if self.timeline is None:
+                self.timeline = Timeline(other.timeline.bucket_ms)
+            self.timeline.merge(other.timeline)
+
+    def to_state(self) -> dict:
+        """JSON-serializable snapshot of the totals (the timeline is not kept)."""
+        return {"total": self.total, "failures": self.failures, "total_time": self.total_time,
+                "metrics": {name: hist.to_state() for name, hist in self.metrics.items()}}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "JtlSummary":
+        summary = cls()
+        summary.total, summary.failures = state["total"], state["failures"]
+        summary.total_time = state["total_time"]
+        for name, hist in state["metrics"].items():
+            if name in summary.metrics:
+                summary.metrics[name] = LatencyHistogram.from_state(hist)
+        return summary
+
+    def as_dict(self) -> dict:
+        out = {
+            "total": self.total,
+            "failures": self.failures,
+            "avg_elapsed": self.total_time / self.total if self.total else None,
+        }
+        for name, hist in self.metrics.items():
+            if not hist.count:
+                continue
+            stats = {f"p{p}": hist.percentile(p) for p in PERCENTILES}
+            stats["min"] = hist.min
+            stats["max"] = hist.max
+            out[name] = stats
+        return out
+
+
+class BucketStats:
+    """Sample count, failures and elapsed histogram for one group of samples."""
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.elapsed = LatencyHistogram()
+
+    def merge(self, other: "BucketStats") -> None:
+        self.count += other.count
+        self.failures += other.failures
+        self.elapsed.merge(other.elapsed)
+
+
+class Timeline:
+    """Per-label, per-time-bucket statistics.
+
+    Buckets are keyed by (label, bucket start in epoch ms). Labels are stored
+    by name so timelines built in different processes merge directly.
+    """
+
+    TOTAL = "TOTAL"
+    FIELDS = ["label", "time", "timestamp_ms", "samples", "throughput", "errors", "error_rate",
+              "avg", *[f"p{p}" for p in PERCENTILES], "max"]
+
+    def __init__(self, bucket_ms: int = 1000):
+        self.bucket_ms = bucket_ms
+        self.buckets = {}
+
+    def _bucket(self, key) -> BucketStats:
+        stats = self.buckets.get(key)
+        if stats is None:
+            stats = self.buckets[key] = BucketStats()
+        return stats
+
+    def add_chunk(self, chunk: "JtlChunk", names) -> None:
+        width = self.bucket_ms
+        if chunk.timestamps is not None:
+            starts = [ts - ts % width for ts in chunk.timestamps]
+        else:
+            starts = [0] * chunk.size
+        keys = list(zip(chunk.labels, starts))
+        failed = Counter(compress(keys, map(not_, chunk.success)))
+        elapsed = chunk.metrics.get("elapsed")
+        if elapsed is None:
+            for (code, start), n in Counter(keys).items():
+                self._bucket((names[code], start)).count += n
+        else:
+            missing = chunk.missing.get("elapsed") or repeat(0)
+            for ((code, start), value, gone), n in Counter(zip(keys, elapsed, missing)).items():
+                stats = self._bucket((names[code], start))
+                stats.count += n
+                if not gone and math.isfinite(value):
+                    stats.elapsed.record(value, n)
+        for (code, start), n in failed.items():
+            self._bucket((names[code], start)).failures += n
+
+    def merge(self, other: "Timeline") -> None:
+        for key, stats in other.buckets.items():
+            self._bucket(key).merge(stats)
+
+    def per_label(self) -> dict:
+        """Collapse the time dimension: {label: BucketStats}."""
+        out = {}
+        for (label, _), stats in self.buckets.items():
+            out.setdefault(label, BucketStats()).merge(stats)
+        return dict(sorted(out.items()))
+
+    def rows(self, include_total: bool = True):
+        """Yield one dict per (label, bucket), ordered by time then label.
+
+        With include_total, a TOTAL row per bucket aggregates every label.
+        """
+        by_time = {}
+        for (label, start), stats in self.buckets.items():
+            by_time.setdefault(start, {})[label] = stats
+        seconds = self.bucket_ms / 1000
+        for start in sorted(by_time):
+            group = dict(sorted(by_time[start].items()))
+            if include_total:
+                total = BucketStats()
+                for stats in group.values():
+                    total.merge(stats)
+                group[self.TOTAL] = total
+            for label, stats in group.items():
+                hist = stats.elapsed
+                mean = hist.mean()
+                row = {
+                    "label": label,
+                    "time": datetime.fromtimestamp(start / 1000, timezone.utc).isoformat(timespec="milliseconds"),
+                    "timestamp_ms": start,
+                    "samples": stats.count,
+                    "throughput": round(stats.count / seconds, 3),
+                    "errors": stats.failures,
+                    "error_rate": round(stats.failures / stats.count, 4) if stats.count else 0.0,
+                    "avg": round(mean, 2) if mean is not None else None,
+                }
+                for p in PERCENTILES:
+                    row[f"p{p}"] = hist.percentile(p)
+                row["max"] = hist.max
+                yield row
+
+    def write(self, path: str) -> None:
+        """Write the timeline as JSON (*.json) or CSV (anything else)."""
+        rows = self.rows()
+        with open(path, "w", newline="") as f:
+            if path.lower().endswith(".json"):
+                json.dump({"bucket_ms": self.bucket_ms, "rows": list(rows)}, f, indent=1)
+                f.write("\n")
+            else:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+class LabelTable:
+    """Interns sampler labels into small integer codes."""
+
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+
+    def code(self, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.names)
+            self.names.append(label)
+        return code
+
+    def encode(self, labels) -> array:
+        codes = self.codes
+        try:
+            return array("i", map(codes.__getitem__, labels))
+        except KeyError:
+            return array("i", map(self.code, labels))
+
+
+class JtlLayout:
+    """Column positions of a CSV JTL, resolved once from its header row."""
+
+    def __init__(self, header, delimiter: str = ","):
+        self.header = list(header)
+        self.delimiter = delimiter
+        self.width = len(self.header)
+        pos = {name: i for i, name in enumerate(self.header)}
+
+        def find(keys):
+            for k in keys:
+                if k in pos:
+                    return pos[k]
+            return None
+
+        self.timestamp = find(TIMESTAMP_KEYS)
+        self.label = find(LABEL_KEYS)
+        self.success = find(SUCCESS_KEYS)
+        self.metrics = {name: find(keys) for name, keys in METRIC_KEYS.items()}
+
+
+class JtlChunk:
+    """A batch of samples stored column-wise in typed arrays.
+
+    Metric columns are integer arrays unless a cell has a fractional or
+    non-finite value, in which case the whole column is kept as floats.
+    Missing or unparsable cells are stored as 0 and flagged in
+    missing[name] (0/1 per row); a metric with no such cells has no entry.
+    """
+
+    def __init__(self, size, timestamps, success, labels, metrics, missing=None):
+        self.size = size
+        self.timestamps = timestamps
+        self.success = success
+        self.labels = labels
+        self.metrics = metrics
+        self.missing = missing or {}
+
+
+def _parse_number(value, floats: bool):
+    """One cell as an int, or (with floats) a float; None if it is missing or unparsable."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is not None and -_INT64 <= number < _INT64:
+        return number
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number.is_integer() and -_INT64 <= number < _INT64:
+        return int(number)
+    if floats:
+        return number  # fractional, inf or nan: averaged as the row-by-row summary did
+    return int(number) if math.isfinite(number) and -_INT64 <= number < _INT64 else None
+
+
+def _parse_numbers_slow(values, floats: bool):
+    """Parse cell by cell into (numbers, missing); a float cell turns the numbers into a float array."""
+    out = array("q")
+    missing = None
+    for i, value in enumerate(values):
+        number = _parse_number(value, floats)
+        if number is None:
+            if missing is None:
+                missing = array("b", bytes(len(values)))
+            missing[i] = 1
+            number = 0
+        elif type(number) is float and out.typecode == "q":
+            out = array("d", out)
+        out.append(number)
+    return out, missing
+
+
+def _int_column(col) -> array:
+    try:
+        return array("q", map(int, col))
+    except (TypeError, ValueError, OverflowError):
+        return _parse_numbers_slow(col, floats=False)[0]
+
+
+def _number_column(col):
+    """(values, missing) for a metric column; fractional values (e.g. elapsed 12.5) are kept for the average."""
+    try:
+        return array("q", map(int, col)), None
+    except (TypeError, ValueError, OverflowError):
+        return _parse_numbers_slow(col, floats=True)
 
-def summarize(jtl_path: str) -> None:
-    total = 0
-    failures = 0
-    total_time = 0.0
-    with open(jtl_path, newline='') as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            total += 1
-            # success flag may be 'success' or 's'
-            success = None
-            for k in ("success", "s"):
-                if k in r:
-                    success = r[k]
+
+def _split_rows(text: str, delimiter: str):
+    """Split decoded JTL text into rows of cells, honouring CSV quoting."""
+    rows = []
+    pending = None
+    for line in text.split("\n"):
+        if pending is not None:
+            pending += "\n" + line
+            if pending.count('"') % 2 == 0:
+                rows.extend(csv.reader([pending], delimiter=delimiter))
+                pending = None
+        elif not line:
+            continue
+        elif '"' not in line:
+            rows.append(line.split(delimiter))
+        elif line.count('"') % 2:
+            pending = line
+        else:
+            rows.extend(csv.reader([line], delimiter=delimiter))
+    if pending is not None:
+        rows.extend(csv.reader([pending], delimiter=delimiter))
+    return rows
+
+
+def _split_columns(text: str, layout: JtlLayout, wanted):
+    """Return (row_count, {column index: list of cells}) for decoded JTL text.
+
+    Fast path: when the block has no quotes and every row has exactly
+    layout.width cells, the whole block is split once into a flat list and
+    each column is a strided slice of it. Anything else falls back to
+    per-row splitting.
+    """
+    width = layout.width
+    if '"' not in text and text.endswith("\n") and "\n\n" not in text:
+        n = text.count("\n")
+        flat = text[:-1].replace("\n", layout.delimiter).split(layout.delimiter)
+        if len(flat) == n * width:
+            return n, {i: flat[i::width] for i in wanted}
+    rows = _split_rows(text, layout.delimiter)
+    if rows and min(map(len, rows)) < width:
+        pad = [""] * width
+        if layout.success is not None:
+            pad[layout.success] = None  # cut short before success: not a failure (see _SUCCESS_VALUES)
+        rows = [r if len(r) >= width else r + pad[len(r):] for r in rows]
+    return len(rows), {i: [r[i] for r in rows] for i in wanted}
+
+
+def _build_chunk(text: str, layout: JtlLayout, labels: LabelTable):
+    wanted = [i for i in (layout.timestamp, layout.success, layout.label, *layout.metrics.values()) if i is not None]
+    n, cols = _split_columns(text, layout, wanted)
+    if not n:
+        return None
+    timestamps = _int_column(cols[layout.timestamp]) if layout.timestamp is not None else None
+    if layout.success is not None:
+        success = array("b", map(_SUCCESS_VALUES.__getitem__, cols[layout.success]))
+    else:
+        success = array("b", bytes([1]) * n)
+    if layout.label is not None:
+        codes = labels.encode(cols[layout.label])
+    else:
+        codes = array("i", bytes(4 * n))
+    metrics, missing = {}, {}
+    for name, idx in layout.metrics.items():
+        if idx is not None:
+            metrics[name], flags = _number_column(cols[idx])
+            if flags is not None:
+                missing[name] = flags
+    return JtlChunk(n, timestamps, success, codes, metrics, missing)
+
+
+def iter_chunks(f, layout: JtlLayout, labels: LabelTable, end: int = None, chunk_bytes: int = CHUNK_BYTES):
+    """Yield JtlChunks from a binary file object positioned at a row boundary.
+
+    Reads roughly chunk_bytes at a time, always extended to a whole row. When
+    end is given, stops at the first row boundary at or after that offset.
+    """
+    while True:
+        size = chunk_bytes
+        if end is not None:
+            size = min(size, end - f.tell())
+            if size <= 0:
+                return
+        block = f.read(size)
+        if not block:
+            return
+        if not block.endswith(b"\n"):
+            block += f.readline()
+        # an odd number of quotes means a quoted cell continues on the next line
+        while block.count(b'"') % 2:
+            more = f.readline()
+            if not more:
+                break
+            block += more
+        text = block.decode("utf-8", "replace")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        chunk = _build_chunk(text, layout, labels)
+        if chunk is not None:
+            yield chunk
+
+
+def summarize_chunk(summary: JtlSummary, chunk: JtlChunk) -> None:
+    """Fold one chunk into summary using whole-column operations."""
+    summary.total += chunk.size
+    summary.failures += chunk.size - sum(chunk.success)
+    for name, values in chunk.metrics.items():
+        if name == "elapsed":
+            summary.total_time += sum(values)  # missing cells are 0, as in the row-by-row summary
+        flags = chunk.missing.get(name)
+        if flags is not None:
+            values = compress(values, map(not_, flags))
+        counts = Counter(values)
+        summary.metrics[name].record_counts({v: n for v, n in counts.items() if math.isfinite(v)})
+
+
+def open_jtl(jtl_path: str):
+    """Open a JTL file in binary mode and resolve its layout from the header.
+
+    Returns (file, layout) with the file positioned at the first sample row.
+    """
+    f = open(jtl_path, "rb", buffering=READ_BUFFER)
+    return f, _layout_from_header(f.readline())
+
+
+def _layout_from_header(line: bytes) -> JtlLayout:
+    line = line.decode("utf-8-sig", "replace").rstrip("\r\n")
+    delimiter = "\t" if "\t" in line and "," not in line else ","
+    header = next(csv.reader([line], delimiter=delimiter), [])
+    return JtlLayout(header, delimiter)
+
+
+def summarize_file(jtl_path: str, chunk_bytes: int = CHUNK_BYTES) -> JtlSummary:
+    """Summarize a JTL file without printing anything."""
+    summary = JtlSummary()
+    labels = LabelTable()
+    f, layout = open_jtl(jtl_path)
+    with f:
+        for chunk in iter_chunks(f, layout, labels, chunk_bytes=chunk_bytes):
+            summarize_chunk(summary, chunk)
+    return summary
+
+
+def _is_row_start(line: bytes, layout: JtlLayout) -> bool:
+    # A quoted cell may contain newlines; when the first column is the
+    # numeric timestamp, a continuation line is recognisable because it does
+    # not start with digits followed by the delimiter.
+    if layout.timestamp != 0:
+        return True
+    head = line.split(layout.delimiter.encode(), 1)[0]
+    return head.isdigit()
+
+
+def split_ranges(jtl_path: str, parts: int, min_range: int = None):
+    """Split a JTL into at most parts byte ranges that each start on a row.
+
+    Returns a list of (start, end) offsets covering every sample row once.
+    """
+    min_range = min_range or MIN_RANGE_BYTES
+    f, layout = open_jtl(jtl_path)
+    with f:
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        parts = max(1, min(parts, (size - data_start) // min_range))
+        step = (size - data_start) // parts
+        offsets = [data_start]
+        for i in range(1, parts):
+            f.seek(data_start + i * step)
+            f.readline()  # skip the (probably partial) row we landed in
+            while True:
+                pos = f.tell()
+                line = f.readline()
+                if not line or _is_row_start(line, layout):
                     break
-            if success is not None and str(success).lower() not in ("true", "1"):
-                failures += 1
-            # elapsed time may be 'elapsed' or 't'
-            elapsed_val = 0
-            for k in ("elapsed", "t"):
-                if k in r and r[k] != "":
-                    try:
-                        elapsed_val = float(r[k])
-                        break
-                    except Exception:
-                        elapsed_val = 0
-            total_time += elapsed_val
-    print(f"total samples: {total}")
-    print(f"failures: {failures}")
-    if total:
-        print(f"avg elapsed (ms): {total_time/total:.2f}")
+            if pos > offsets[-1] and pos < size:
+                offsets.append(pos)
+        offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def summarize_range(jtl_path: str, start: int, end: int, bucket_ms: int = None) -> JtlSummary:
+    """Summarize the rows of jtl_path that start within [start, end).
+
+    With bucket_ms, the summary also carries a per-label Timeline.
+    """
+    summary = JtlSummary()
+    if bucket_ms:
+        summary.timeline = Timeline(bucket_ms)
+    labels = LabelTable()
+    f, layout = open_jtl(jtl_path)
+    with f:
+        f.seek(start)
+        for chunk in iter_chunks(f, layout, labels, end=end):
+            summarize_chunk(summary, chunk)
+            if summary.timeline is not None:
+                summary.timeline.add_chunk(chunk, labels.names)
+    return summary
+
+
+def expand_paths(patterns):
+    """Expand glob patterns; plain paths are kept even if they do not match."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def summarize_paths(patterns, jobs: int = None, bucket_ms: int = None) -> JtlSummary:
+    """Summarize many JTL files (or globs) into one combined JtlSummary.
+
+    Work is split into byte ranges and run on up to jobs processes
+    (default: one per CPU). With jobs=1 everything runs in this process.
+    bucket_ms enables the per-label timeline (see summarize_range).
+    """
+    jobs = jobs or os.cpu_count() or 1
+    tasks = []
+    for path in expand_paths(patterns):
+        tasks.extend((path, start, end, bucket_ms) for start, end in split_ranges(path, jobs))
+    summary = JtlSummary()
+    if bucket_ms:
+        summary.timeline = Timeline(bucket_ms)
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            summary.merge(summarize_range(*task))
+        return summary
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        for partial in pool.map(summarize_range, *zip(*tasks)):
+            summary.merge(partial)
+    return summary
+
+
+class JtlFollower:
+    """Incrementally summarizes a JTL file that is still being written.
+
+    Each poll() consumes the complete rows appended since the last call.
+    Cumulative totals live in self.summary; the last window_s seconds of
+    samples (by timeStamp) are kept as one-second buckets in self.window.
+    """
+
+    def __init__(self, jtl_path: str, window_s: float = 60, checkpoint: str = None):
+        self.path = jtl_path
+        self.window_ms = max(1000, int(window_s * 1000))
+        self.checkpoint = checkpoint
+        self._reset()
+        if checkpoint:
+            self._load_checkpoint()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.layout = None
+        self.labels = LabelTable()
+        self.summary = JtlSummary()
+        self.window = Timeline(1000)
+        self.newest = None
+
+    def _load_checkpoint(self) -> None:
+        try:
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+            size = os.path.getsize(self.path)
+        except (OSError, ValueError):
+            return
+        if state.get("path") != os.path.abspath(self.path) or size < state["offset"]:
+            return  # different or truncated file: start from the beginning
+        self.offset = state["offset"]
+        self.layout = JtlLayout(state["header"], state["delimiter"])
+        self.summary = JtlSummary.from_state(state["summary"])
+
+    def save_checkpoint(self) -> None:
+        if not self.checkpoint or self.layout is None:
+            return
+        state = {
+            "path": os.path.abspath(self.path),
+            "offset": self.offset,
+            "header": self.layout.header,
+            "delimiter": self.layout.delimiter,
+            "summary": self.summary.to_state(),
+        }
+        tmp = self.checkpoint + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint)
+
+    def poll(self, chunk_bytes: int = CHUNK_BYTES) -> int:
+        """Consume newly appended complete rows; returns how many were read."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        if size < self.offset:
+            self._reset()  # the file was truncated or replaced
+        new_rows = 0
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            if self.layout is None:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    return 0
+                self.layout = _layout_from_header(line)
+                self.offset = f.tell()
+            while self.offset < size:
+                data = f.read(min(chunk_bytes, size - self.offset))
+                end = data.rfind(b"\n") + 1
+                # never stop inside a quoted cell that spans lines
+                while end and data.count(b'"', 0, end) % 2:
+                    end = data.rfind(b"\n", 0, end - 1) + 1
+                if not end:
+                    if len(data) < chunk_bytes:
+                        break  # only a partial row so far
+                    chunk_bytes *= 2
+                    f.seek(self.offset)
+                    continue
+                text = data[:end].decode("utf-8", "replace")
+                if "\r" in text:
+                    text = text.replace("\r\n", "\n")
+                self.offset += end
+                f.seek(self.offset)
+                chunk = _build_chunk(text, self.layout, self.labels)
+                if chunk is not None:
+                    self._add(chunk)
+                    new_rows += chunk.size
+        return new_rows
+
+    def _add(self, chunk: JtlChunk) -> None:
+        summarize_chunk(self.summary, chunk)
+        self.window.add_chunk(chunk, self.labels.names)
+        if chunk.timestamps:
+            newest = max(chunk.timestamps)
+            if self.newest is None or newest > self.newest:
+                self.newest = newest
+        if self.newest is not None:
+            cutoff = self.newest - self.window_ms
+            for key in [k for k in self.window.buckets if k[1] <= cutoff]:
+                del self.window.buckets[key]
+
+    def window_stats(self) -> dict:
+        """{label: BucketStats} over the rolling window, plus a TOTAL entry."""
+        per_label = self.window.per_label()
+        total = BucketStats()
+        for stats in per_label.values():
+            total.merge(stats)
+        per_label[Timeline.TOTAL] = total
+        return per_label
+
+    def window_seconds(self) -> float:
+        """Width of the data actually covered by the window, at most window_s."""
+        if not self.window.buckets:
+            return self.window_ms / 1000
+        oldest = min(start for _, start in self.window.buckets)
+        return min(self.window_ms, self.newest - oldest + 1000) / 1000
+
+
+def print_follow_report(follower: JtlFollower) -> None:
+    stats = follower.window_stats()
+    total = stats[Timeline.TOTAL]
+    seconds = follower.window_seconds()
+    stamp = time.strftime("%H:%M:%S")
+    err = 100 * total.failures / total.count if total.count else 0.0
+    print(f"[{stamp}] total={follower.summary.total} failures={follower.summary.failures} | "
+          f"last {seconds:.0f}s: {total.count / seconds:.1f} req/s, err {err:.2f}%, "
+          + " ".join(f"p{p}={total.elapsed.percentile(p)}" for p in PERCENTILES))
+    if len(stats) > 2:
+        print_labels(stats)
+    sys.stdout.flush()
+
+
+def write_follow_report(follower: JtlFollower, path: str) -> None:
+    """Write the current rolling-window statistics to path as JSON."""
+    seconds = follower.window_seconds()
+    labels = {}
+    for label, stats in follower.window_stats().items():
+        hist = stats.elapsed
+        labels[label] = {
+            "samples": stats.count,
+            "throughput": round(stats.count / seconds, 3),
+            "errors": stats.failures,
+            "error_rate": round(stats.failures / stats.count, 4) if stats.count else 0.0,
+            **{f"p{p}": hist.percentile(p) for p in PERCENTILES},
+            "max": hist.max,
+        }
+    report = {"generated": time.time(), "window_s": seconds, "newest_timestamp_ms": follower.newest,
+              "cumulative": follower.summary.as_dict(), "window": labels}
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp, path)
+
+
+def follow(jtl_path: str, interval: float = 5, window_s: float = 60, checkpoint: str = None,
+           output: str = None, idle_exit: float = None) -> JtlFollower:
+    """Tail jtl_path, reporting rolling statistics every interval seconds.
+
+    Runs until interrupted, or until the file has not grown for idle_exit
+    seconds when that is set.
+    """
+    follower = JtlFollower(jtl_path, window_s, checkpoint)
+    if follower.offset:
+        print(f"resuming {jtl_path} at byte {follower.offset} ({follower.summary.total} samples)")
+    next_report = time.monotonic() + interval
+    last_growth = time.monotonic()
+    try:
+        while True:
+            if follower.poll():
+                last_growth = time.monotonic()
+            now = time.monotonic()
+            if now >= next_report:
+                print_follow_report(follower)
+                if output:
+                    write_follow_report(follower, output)
+                follower.save_checkpoint()
+                next_report = now + interval
+            if idle_exit is not None and now - last_growth >= idle_exit:
+                break
+            time.sleep(FOLLOW_POLL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.save_checkpoint()
+    print_follow_report(follower)
+    if output:
+        write_follow_report(follower, output)
+    return follower
+
+
+class JtlCache:
+    """Memory-mapped columnar copy of a JTL file.
+
+    The sidecar directory holds one raw array file per column (see
+    CACHE_COLUMNS) and meta.json with the source file's size and mtime, the
+    label dictionary and, per block of CACHE_BLOCK_ROWS rows, the minimum
+    and maximum timeStamp and the label codes present. Queries only visit
+    blocks that can match and read the columns through memoryviews, so
+    nothing is copied until rows are selected.
+    """
+
+    def __init__(self, directory: str, meta: dict):
+        self.directory = directory
+        self.meta = meta
+        self.rows = meta["rows"]
+        self.label_names = meta["labels"]
+        self._maps = []
+        self.columns = {}
+        for name in meta["columns"]:
+            self.columns[name] = self._map(name, CACHE_COLUMNS[name])
+
+    def _map(self, name: str, typecode: str):
+        if not self.rows:
+            return memoryview(array(typecode))
+        with open(os.path.join(self.directory, name + ".bin"), "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        raw = memoryview(mm)
+        self._maps.append((mm, raw))
+        return raw.cast(typecode)
+
+    def close(self) -> None:
+        for view in self.columns.values():
+            view.release()
+        for mm, raw in self._maps:
+            raw.release()
+            mm.close()
+        self.columns, self._maps = {}, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def path_for(jtl_path: str) -> str:
+        return jtl_path + ".cache"
+
+    @staticmethod
+    def _source_stamp(jtl_path: str) -> dict:
+        st = os.stat(jtl_path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    @classmethod
+    def open(cls, jtl_path: str):
+        """Open the cache for jtl_path, or return None if missing or stale."""
+        directory = cls.path_for(jtl_path)
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+            stamp = cls._source_stamp(jtl_path)
+        except (OSError, ValueError):
+            return None
+        if (meta.get("version") != CACHE_VERSION or meta.get("byteorder") != sys.byteorder
+                or meta.get("source") != stamp):
+            return None
+        return cls(directory, meta)
+
+    @classmethod
+    def build(cls, jtl_path: str) -> "JtlCache":
+        """Parse jtl_path once and write its column cache."""
+        directory = cls.path_for(jtl_path)
+        tmp = directory + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        stamp = cls._source_stamp(jtl_path)
+        labels = LabelTable()
+        rows = 0
+        f, layout = open_jtl(jtl_path)
+        metric_names = [m for m, idx in layout.metrics.items() if idx is not None]
+        names = ["timestamps", "success", "labels"] + metric_names + [m + "_missing" for m in metric_names]
+        outs = {name: open(os.path.join(tmp, name + ".bin"), "wb") for name in names}
+        try:
+            with f:
+                for chunk in iter_chunks(f, layout, labels):
+                    timestamps = chunk.timestamps
+                    if timestamps is None:
+                        timestamps = array("q", bytes(8 * chunk.size))
+                    timestamps.tofile(outs["timestamps"])
+                    chunk.success.tofile(outs["success"])
+                    chunk.labels.tofile(outs["labels"])
+                    for name, values in chunk.metrics.items():
+                        if values.typecode != CACHE_COLUMNS[name]:
+                            values = array(CACHE_COLUMNS[name], values)
+                        values.tofile(outs[name])
+                        flags = chunk.missing.get(name)
+                        if flags is None:
+                            flags = array("b", bytes(chunk.size))
+                        flags.tofile(outs[name + "_missing"])
+                    rows += chunk.size
+        finally:
+            for out in outs.values():
+                out.close()
+        meta = {"version": CACHE_VERSION, "byteorder": sys.byteorder, "source": stamp,
+                "rows": rows, "labels": labels.names, "columns": names, "blocks": []}
+        cache = cls(tmp, meta)
+        try:
+            ts, codes = cache.columns["timestamps"], cache.columns["labels"]
+            for start in range(0, rows, CACHE_BLOCK_ROWS):
+                end = min(rows, start + CACHE_BLOCK_ROWS)
+                meta["blocks"].append([start, end, min(ts[start:end]), max(ts[start:end]),
+                                       sorted(set(codes[start:end]))])
+        finally:
+            cache.close()
+        with open(os.path.join(tmp, "meta.json"), "w") as out:
+            json.dump(meta, out)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        return cls(directory, meta)
+
+    @classmethod
+    def load_or_build(cls, jtl_path: str) -> "JtlCache":
+        cache = cls.open(jtl_path)
+        return cache if cache is not None else cls.build(jtl_path)
+
+    def iter_chunks(self, labels=None, start_ms: int = None, end_ms: int = None, failures_only: bool = False):
+        """Yield JtlChunks for the rows matching every given filter.
+
+        labels is a collection of label names, start_ms/end_ms bound the
+        timeStamp as [start_ms, end_ms), failures_only keeps failed samples.
+        """
+        codes = None
+        if labels is not None:
+            codes = {self.label_names.index(name) for name in labels if name in self.label_names}
+            if not codes:
+                return
+        cols = self.columns
+        metric_names = [name for name in METRIC_KEYS if name in cols]
+        missing_names = [name for name in metric_names if name + "_missing" in cols]
+        for first, last, lo, hi, present in self.meta["blocks"]:
+            if start_ms is not None and hi < start_ms or end_ms is not None and lo >= end_ms:
+                continue
+            if codes is not None and codes.isdisjoint(present):
+                continue
+            masks = []
+            ts = cols["timestamps"][first:last]
+            if start_ms is not None and lo < start_ms or end_ms is not None and hi >= end_ms:
+                low = start_ms if start_ms is not None else lo
+                high = end_ms if end_ms is not None else hi + 1
+                masks.append([low <= t < high for t in ts])
+            if codes is not None and not codes.issuperset(present):
+                block_labels = cols["labels"][first:last]
+                if len(codes) == 1:
+                    masks.append(list(map(eq, block_labels, repeat(next(iter(codes))))))
+                else:
+                    masks.append([c in codes for c in block_labels])
+            if failures_only:
+                masks.append(list(map(not_, cols["success"][first:last])))
+            missing = {name: cols[name + "_missing"][first:last] for name in missing_names}
+            missing = {name: flags for name, flags in missing.items() if 1 in flags.tobytes()}
+            if not masks:
+                yield JtlChunk(last - first, ts, cols["success"][first:last], cols["labels"][first:last],
+                               {name: cols[name][first:last] for name in metric_names}, missing)
+                continue
+            mask = masks[0]
+            for other in masks[1:]:
+                mask = list(map(and_, mask, other))
+            n = sum(mask)
+            if not n:
+                continue
+            yield JtlChunk(n, list(compress(ts, mask)), list(compress(cols["success"][first:last], mask)),
+                           list(compress(cols["labels"][first:last], mask)),
+                           {name: list(compress(cols[name][first:last], mask)) for name in metric_names},
+                           {name: list(compress(flags, mask)) for name, flags in missing.items()})
+
+    def query(self, labels=None, start_ms: int = None, end_ms: int = None, failures_only: bool = False,
+              bucket_ms: int = None) -> JtlSummary:
+        """Summarize the cached rows matching the filters (see iter_chunks)."""
+        summary = JtlSummary()
+        if bucket_ms:
+            summary.timeline = Timeline(bucket_ms)
+        for chunk in self.iter_chunks(labels, start_ms, end_ms, failures_only):
+            summarize_chunk(summary, chunk)
+            if summary.timeline is not None:
+                summary.timeline.add_chunk(chunk, self.label_names)
+        return summary
+
+
+def parse_time_ms(value: str) -> int:
+    """Parse epoch milliseconds or an ISO 8601 date/time (local time if naive)."""
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def print_summary(summary: JtlSummary) -> None:
+    print(f"total samples: {summary.total}")
+    print(f"failures: {summary.failures}")
+    if summary.total:
+        print(f"avg elapsed (ms): {summary.total_time/summary.total:.2f}")
+    for name, hist in summary.metrics.items():
+        if not hist.count:
+            continue
+        parts = [f"p{p}={hist.percentile(p)}" for p in PERCENTILES]
+        parts.append(f"max={hist.max}")
+        print(f"{name} (ms): " + " ".join(parts))
+
+
+def print_labels(per_label: dict) -> None:
+    """Print a {label: BucketStats} mapping as a table."""
+    print(f"{'label':<30} {'samples':>9} {'errors':>7} {'err%':>6} {'avg':>8} "
+          + " ".join(f"{'p' + str(p):>6}" for p in PERCENTILES) + f" {'max':>7}")
+    for label, stats in per_label.items():
+        hist = stats.elapsed
+        err = 100 * stats.failures / stats.count if stats.count else 0.0
+        mean = hist.mean()
+        print(f"{label[:30]:<30} {stats.count:>9} {stats.failures:>7} {err:>6.2f} "
+              f"{mean if mean is not None else 0:>8.1f} "
+              + " ".join(f"{hist.percentile(p) or 0:>6}" for p in PERCENTILES) + f" {hist.max or 0:>7}")
+
+
+def summarize(jtl_path: str) -> JtlSummary:
+    summary = summarize_file(jtl_path)
+    print_summary(summary)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize JMeter .jtl result files.")
+    parser.add_argument("paths", nargs="+", help="JTL files or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU, 1 disables the pool)")
+    parser.add_argument("--by-label", action="store_true", help="print statistics per sampler label")
+    parser.add_argument("--timeline", metavar="FILE",
+                        help="write per-label, per-bucket statistics to FILE (.json for JSON, otherwise CSV)")
+    parser.add_argument("--bucket", type=float, default=1.0, metavar="SECONDS",
+                        help="timeline bucket width in seconds (default: 1)")
+    parser.add_argument("-f", "--follow", action="store_true",
+                        help="tail a JTL that is still being written and report rolling statistics")
+    parser.add_argument("--interval", type=float, default=5.0, metavar="SECONDS",
+                        help="--follow: report every SECONDS (default: 5)")
+    parser.add_argument("--window", type=float, default=60.0, metavar="SECONDS",
+                        help="--follow: rolling window width (default: 60)")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="--follow: offset checkpoint file (default: <jtl>.follow.json)")
+    parser.add_argument("--output", metavar="FILE", help="--follow: also write each report to FILE as JSON")
+    parser.add_argument("--idle-exit", type=float, metavar="SECONDS",
+                        help="--follow: stop once the file has not grown for SECONDS")
+    parser.add_argument("--cache", action="store_true",
+                        help="read through the <jtl>.cache column cache, building it on first use")
+    parser.add_argument("--label", action="append", metavar="NAME",
+                        help="only samples with this label (repeatable; implies --cache)")
+    parser.add_argument("--since", type=parse_time_ms, metavar="TIME",
+                        help="only samples with timeStamp >= TIME (epoch ms or ISO 8601; implies --cache)")
+    parser.add_argument("--until", type=parse_time_ms, metavar="TIME",
+                        help="only samples with timeStamp < TIME (implies --cache)")
+    parser.add_argument("--failures-only", action="store_true", help="only failed samples (implies --cache)")
+    args = parser.parse_args(argv)
+    if args.follow:
+        if len(args.paths) != 1:
+            parser.error("--follow takes exactly one JTL path")
+        path = args.paths[0]
+        follow(path, args.interval, args.window, args.checkpoint or path + ".follow.json",
+               args.output, args.idle_exit)
+        return 0
+    paths = expand_paths(args.paths)
+    if not paths:
+        print("no JTL files matched", file=sys.stderr)
+        return 1
+    if len(paths) > 1:
+        print(f"files: {len(paths)}")
+    bucket_ms = max(1, int(args.bucket * 1000)) if args.by_label or args.timeline else None
+    if args.cache or args.label or args.since is not None or args.until is not None or args.failures_only:
+        summary = JtlSummary()
+        if bucket_ms:
+            summary.timeline = Timeline(bucket_ms)
+        for path in paths:
+            with JtlCache.load_or_build(path) as cache:
+                summary.merge(cache.query(args.label, args.since, args.until, args.failures_only, bucket_ms))
+    else:
+        summary = summarize_paths(paths, args.jobs, bucket_ms)
+    print_summary(summary)
+    if args.by_label:
+        print()
+        print_labels(summary.timeline.per_label())
+    if args.timeline:
+        summary.timeline.write(args.timeline)
+        print(f"timeline written to {args.timeline}")
+    return 0
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("usage: python summary_jtl.py /path/to/results.jtl")
-        sys.exit(1)
-    summarize(sys.argv[1])
+    sys.exit(main())
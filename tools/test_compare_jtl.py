@@ -0,0 +1,88 @@
+import argparse
+import random
+
+import pytest
+
+import compare_jtl
+from test_summary_jtl import write_jtl
+
+
+def make_run(path, seed, login_factor=1.0, login_error=0.01):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(6000):
+        label = ("GET Catalogue", "POST Login")[i % 2]
+        elapsed = int(rng.lognormvariate(4, 0.5) * (login_factor if label == "POST Login" else 1))
+        ok = rng.random() > (login_error if label == "POST Login" else 0.01)
+        rows.append((1700000000000 + i * 10, elapsed, label, ok, elapsed, 1))
+    write_jtl(path, rows)
+    return str(path)
+
+
+def test_compare_passes_for_equivalent_runs(tmp_path, capsys):
+    base = make_run(tmp_path / "base.jtl", 1)
+    cand = make_run(tmp_path / "cand.jtl", 2)
+    assert compare_jtl.main([base, cand, "--jobs", "1"]) == 0
+    assert "PASS" in capsys.readouterr().out
+
+
+def test_compare_fails_on_significant_latency_and_error_regressions(tmp_path, capsys):
+    base = make_run(tmp_path / "base.jtl", 1)
+    cand = make_run(tmp_path / "cand.jtl", 2, login_factor=1.5, login_error=0.08)
+    report_path = tmp_path / "report.json"
+    assert compare_jtl.main([base, cand, "--jobs", "1", "--json", str(report_path)]) == 1
+    assert "FAIL: regression in POST Login" in capsys.readouterr().out
+    report = compare_jtl.json.loads(report_path.read_text())
+    login = report["labels"]["POST Login"]
+    assert login["p95"]["ci_ms"][0] > 0
+    assert any(r.startswith("error rate") for r in login["regressions"])
+    assert report["labels"]["GET Catalogue"]["regressions"] == []
+
+
+def test_bootstrap_replicates_center_on_the_estimate():
+    hist = compare_jtl.LatencyHistogram()
+    for v in range(1, 1001):
+        hist.record(v)
+    reps = compare_jtl.bootstrap_percentiles(hist, 500, random.Random(0))
+    lo, hi = compare_jtl._interval(reps[95], 0.95)
+    assert lo < 950 < hi
+    assert hi - lo < 40
+
+
+def test_label_without_elapsed_samples_is_reported_not_compared(tmp_path, capsys):
+    base = make_run(tmp_path / "base.jtl", 1)
+    cand = make_run(tmp_path / "cand.jtl", 2)
+    with open(cand, "a") as f:  # a label whose rows all lack elapsed, e.g. cut-short transaction rows
+        for i in range(40):
+            f.write(f"{1700000060000 + i},,GET Broken,200,OK,Users 1-1,text,true,,100,50,1,1,http://localhost/,,0,\n")
+    with open(base, "a") as f:
+        f.write("1700000060000,12,GET Broken,200,OK,Users 1-1,text,true,,100,50,1,1,http://localhost/,10,0,1\n")
+    assert compare_jtl.main([base, cand, "--jobs", "1", "--min-samples", "1"]) == 0
+    out = capsys.readouterr().out
+    assert "PASS" in out and "no samples" in out
+    assert compare_jtl.bootstrap_percentiles(compare_jtl.LatencyHistogram(), 10, random.Random(0)) == \
+        {50: [], 95: [], 99: []}
+
+
+def test_error_rate_interval_keeps_a_width_without_failures(tmp_path):
+    base = make_run(tmp_path / "base.jtl", 1, login_error=0.0)
+    cand = make_run(tmp_path / "cand.jtl", 2, login_error=0.0)
+    args = argparse.Namespace(confidence=0.95, iterations=500, max_latency_increase=10.0,
+                              max_error_rate_increase=1.0, max_throughput_drop=None, min_samples=30)
+    login = compare_jtl.compare_label(compare_jtl.load_run([base])[0]["POST Login"],
+                                      compare_jtl.load_run([cand])[0]["POST Login"], 1.0, 1.0, args,
+                                      random.Random(0))
+    assert login["error_rate"]["delta_pp"] == 0
+    lo, hi = login["error_rate"]["ci_pp"]
+    assert lo < 0 < hi
+    assert login["regressions"] == []
+
+
+@pytest.mark.parametrize("option", [["--iterations", "0"], ["--iterations", "-5"], ["--confidence", "1"],
+                                    ["--confidence", "0"]])
+def test_bad_bootstrap_options_are_usage_errors(tmp_path, option, capsys):
+    base = make_run(tmp_path / "base.jtl", 1)
+    with pytest.raises(SystemExit) as exit_info:
+        compare_jtl.main([base, base, *option])
+    assert exit_info.value.code == 2
+    assert "must be" in capsys.readouterr().err
@@ -0,0 +1,106 @@
+import asyncio
+import csv
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import loadgen
+import summary_jtl
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    bodies = []
+    cookies = []
+    connections = 0
+
+    def setup(self):
+        Handler.connections += 1
+        super().setup()
+
+    def _reply(self, code, body=b"ok"):
+        self.send_response(code)
+        if self.path == "/login":
+            self.send_header("Set-Cookie", "session=abc; HttpOnly; Path=/")
+            self.send_header("Set-Cookie", "theme=dark; Path=/")
+        elif self.path == "/logout":
+            self.send_header("Set-Cookie", "session=; Max-Age=0; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        Handler.cookies.append(self.headers.get("Cookie"))
+        self._reply(200, b"<html>tasks</html>")
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        Handler.bodies.append(self.rfile.read(length))
+        self._reply(201, b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.bodies = []
+    Handler.cookies = []
+    Handler.connections = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+
+
+def test_closed_model_writes_standard_jtl(server, tmp_path):
+    out = tmp_path / "fs.jtl"
+    assert loadgen.main(["fullstack_sqlite", "--host", "127.0.0.1", "--port", str(server),
+                         "--threads", "3", "--ramp", "0", "--loops", "2", "-o", str(out)]) == 0
+    with open(out, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == loadgen.JTL_FIELDS
+    assert len(rows) == 3 * 2 * 3
+    assert {r["label"] for r in rows} == {"GET Home", "GET Tasks", "POST AddTask"}
+    assert all(r["success"] == "true" for r in rows)
+    # keep-alive: connections are reused across samples
+    assert Handler.connections <= 3
+    assert b'{"text":"Load task 1"}' in Handler.bodies
+    assert summary_jtl.summarize_file(str(out)).total == 18
+
+
+def test_open_model_and_connection_errors(tmp_path):
+    out = tmp_path / "down.jtl"
+    # nothing listens on port 9: every sample fails but is still recorded
+    loadgen.main(["food", "--host", "127.0.0.1", "--port", "9", "--rate", "20", "--duration", "0.2", "-o", str(out)])
+    summary = summary_jtl.summarize_file(str(out))
+    assert summary.total == summary.failures > 0
+
+
+def test_cookies_last_one_iteration_and_expected_codes(server, tmp_path):
+    scenario = loadgen.Scenario("cookies", server, str(tmp_path / "none.csv"), [], [
+        loadgen.Step("GET Before", "GET", "/"),
+        loadgen.Step("POST Login", "POST", "/login", form={"u": "ann"}, expect=200),
+        loadgen.Step("GET After", "GET", "/"),
+        loadgen.Step("GET Logout", "GET", "/logout", expect=302),
+        loadgen.Step("GET Gone", "GET", "/"),
+    ])
+    (tmp_path / "none.csv").write_text("")
+    jtl = loadgen.JtlWriter(str(tmp_path / "c.jtl"))
+    runner = loadgen.LoadRunner(scenario, "127.0.0.1", server, jtl, 5)
+
+    async def two_iterations():
+        await runner.iteration("Users 1-1")
+        await runner.iteration("Users 1-1")
+        runner.pool.close()
+
+    asyncio.run(two_iterations())
+    jtl.close()
+    # sent back until deleted, and forgotten at the end of the iteration
+    assert Handler.cookies == [None, "session=abc; theme=dark", "session=abc; theme=dark", "theme=dark"] * 2
+    with open(tmp_path / "c.jtl", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["success"] for r in rows[:5]] == ["true", "false", "true", "false", "true"]  # POST answers 201
+    assert rows[1]["failureMessage"] == "Response code was 201, expected 200"
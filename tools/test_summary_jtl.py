@@ -0,0 +1,250 @@
+import json
+import random
+
+import pytest
+
+import summary_jtl
+from summary_jtl import LatencyHistogram
+
+HEADER = "timeStamp,elapsed,label,responseCode,responseMessage,threadName,dataType,success,failureMessage,bytes,sentBytes,grpThreads,allThreads,URL,Latency,IdleTime,Connect\n"
+
+
+def write_jtl(path, rows):
+    """rows: iterable of (timeStamp, elapsed, label, success, latency, connect)."""
+    with open(path, "w", newline="") as f:
+        f.write(HEADER)
+        for ts, elapsed, label, success, latency, connect in rows:
+            f.write(f"{ts},{elapsed},{label},200,OK,Users 1-1,text,{str(success).lower()},,100,50,1,1,http://localhost/,{latency},0,{connect}\n")
+
+
+@pytest.fixture
+def sample_jtl(tmp_path):
+    path = tmp_path / "results.jtl"
+    write_jtl(path, [(1700000000000 + i * 10, i + 1, "GET Home", i % 10 != 0, i, 1) for i in range(100)])
+    return str(path)
+
+
+def test_histogram_exact_for_small_values():
+    hist = LatencyHistogram()
+    for v in range(1, 101):
+        hist.record(v)
+    assert hist.percentile(50) == 50
+    assert hist.percentile(95) == 95
+    assert hist.percentile(100) == 100
+    assert hist.mean() == 50.5
+
+
+def test_histogram_relative_error_is_bounded():
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(8, 1.5)) for _ in range(20000)]
+    hist = LatencyHistogram()
+    for v in values:
+        hist.record(v)
+    values.sort()
+    for p in (50, 95, 99):
+        exact = values[-(-len(values) * p // 100) - 1]
+        assert abs(hist.percentile(p) - exact) <= exact / 1000 + 1
+
+
+def test_histogram_merge_matches_single_pass():
+    a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for v in range(0, 50000, 7):
+        (a if v % 2 else b).record(v)
+        both.record(v)
+    a.merge(b)
+    assert a.counts == both.counts
+    assert (a.count, a.min, a.max) == (both.count, both.min, both.max)
+
+
+def test_summarize_reports_percentiles(sample_jtl, capsys):
+    summary = summary_jtl.summarize(sample_jtl)
+    out = capsys.readouterr().out
+    assert "total samples: 100" in out
+    assert "failures: 10" in out
+    assert "avg elapsed (ms): 50.50" in out
+    stats = summary.as_dict()
+    assert stats["elapsed"]["p95"] == 95
+    assert stats["latency"]["max"] == 99
+    assert stats["connect"]["p50"] == 1
+
+
+def test_engine_handles_quoted_cells_and_small_chunks(tmp_path):
+    path = tmp_path / "quoted.jtl"
+    with open(path, "w", newline="") as f:
+        f.write(HEADER)
+        for i in range(50):
+            message = '"Non HTTP response, code: ""refused""\nline two"' if i % 7 == 0 else "OK"
+            f.write(f"{1700000000000 + i},{i},POST Login,200,{message},Users 1-1,text,{'false' if i % 7 == 0 else 'true'},,1,1,1,1,http://localhost/,{i},0,0\r\n")
+    expected = summary_jtl.summarize_file(str(path))
+    assert (expected.total, expected.failures) == (50, 8)
+    assert expected.metrics["elapsed"].max == 49
+    chunked = summary_jtl.summarize_file(str(path), chunk_bytes=64)
+    assert chunked.as_dict() == expected.as_dict()
+
+
+def test_fractional_elapsed_and_short_rows_match_the_row_by_row_summary(tmp_path):
+    path = tmp_path / "odd.jtl"
+    with open(path, "w", newline="") as f:
+        f.write(HEADER)
+        for i in range(30):
+            f.write(f"{1700000000000 + i},{i + 0.25},GET Home,200,OK,Users 1-1,text,{str(i % 5 != 0).lower()},,1,1,1,1,"
+                    f"http://localhost/,{i},0,0\n")
+        f.write("1700000000100,7,GET Home,200\n")  # cut short before success: counted, not a failure
+        f.write("1700000000101,x,GET Home,200,OK,Users 1-1,text,true,,1,1,1,1,http://localhost/,1,0,0\n")
+    expected_time = sum(i + 0.25 for i in range(30)) + 7  # the unparsable elapsed counts as 0
+    for chunk_bytes in (summary_jtl.CHUNK_BYTES, 64):
+        summary = summary_jtl.summarize_file(str(path), chunk_bytes=chunk_bytes)
+        assert (summary.total, summary.failures) == (32, 6)
+        assert abs(summary.as_dict()["avg_elapsed"] - expected_time / 32) < 1e-9
+    with summary_jtl.JtlCache.build(str(path)) as cache:
+        assert sum(cache.columns["elapsed"]) == expected_time
+        assert list(cache.columns["elapsed_missing"]) == [0] * 31 + [1]
+
+
+@pytest.mark.parametrize("chunk_bytes", [summary_jtl.CHUNK_BYTES, 64])
+def test_odd_success_spellings_and_extreme_elapsed_values_match_the_row_by_row_summary(tmp_path, chunk_bytes):
+    path = tmp_path / "extreme.jtl"
+    with open(path, "w", newline="") as f:
+        f.write(HEADER)
+        for elapsed, success in [(5, "tRue"), (-1, "TRUE"), (2, "yes"), ("", "1")]:
+            f.write(f"1700000000000,{elapsed},GET Home,200,OK,Users 1-1,text,{success},,1,1,1,1,http://localhost/,1,0,0\n")
+    summary = summary_jtl.summarize_file(str(path), chunk_bytes=chunk_bytes)
+    assert (summary.total, summary.failures) == (4, 1)
+    assert summary.as_dict()["avg_elapsed"] == (5 - 1 + 2 + 0) / 4  # a real -1 is averaged, the empty cell is 0
+    assert summary.metrics["elapsed"].count == 3
+
+    with open(path, "a", newline="") as f:
+        f.write("1700000000001,inf,GET Home,200,OK,Users 1-1,text,true,,1,1,1,1,http://localhost/,1,0,0\n")
+    summary = summary_jtl.summarize_file(str(path), chunk_bytes=chunk_bytes)
+    assert summary.as_dict()["avg_elapsed"] == float("inf")
+    assert summary.metrics["elapsed"].count == 3  # the histogram only takes finite values
+    with summary_jtl.JtlCache.build(str(path)) as cache:
+        assert cache.query().as_dict() == summary.as_dict()
+
+
+def test_layout_resolves_columns_once(tmp_path):
+    path = tmp_path / "tabs.jtl"
+    path.write_text("timeStamp\telapsed\tlabel\tsuccess\n1\t10\tGET Menu\ttrue\n2\t30\tGET Menu\tfalse\n")
+    f, layout = summary_jtl.open_jtl(str(path))
+    with f:
+        assert layout.delimiter == "\t"
+        assert (layout.timestamp, layout.label, layout.success) == (0, 2, 3)
+        assert layout.metrics["latency"] is None
+        labels = summary_jtl.LabelTable()
+        chunk, = summary_jtl.iter_chunks(f, layout, labels)
+    assert list(chunk.metrics["elapsed"]) == [10, 30]
+    assert list(chunk.success) == [1, 0]
+    assert labels.names == ["GET Menu"]
+
+
+def test_split_ranges_cover_every_row(tmp_path):
+    path = tmp_path / "big.jtl"
+    write_jtl(path, [(1700000000000 + i, i % 500, "GET Catalogue", True, i % 97, 0) for i in range(3000)])
+    ranges = summary_jtl.split_ranges(str(path), 7, min_range=1000)
+    assert len(ranges) == 7
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    partials = [summary_jtl.summarize_range(str(path), start, end) for start, end in ranges]
+    assert sum(p.total for p in partials) == 3000
+
+
+def test_summarize_paths_merges_exactly(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_jtl, "MIN_RANGE_BYTES", 2000)
+    rng = random.Random(3)
+    for name in ("bookstore", "food", "fullstack_sqlite"):
+        write_jtl(tmp_path / f"{name}.jtl",
+                  [(1700000000000 + i, int(rng.expovariate(1 / 80)), name, rng.random() > 0.05, 3, 1) for i in range(2000)])
+    sequential = summary_jtl.JtlSummary()
+    for name in ("bookstore", "food", "fullstack_sqlite"):
+        sequential.merge(summary_jtl.summarize_file(str(tmp_path / f"{name}.jtl")))
+    parallel = summary_jtl.summarize_paths([str(tmp_path / "*.jtl")], jobs=4)
+    assert parallel.total == 6000
+    assert parallel.as_dict() == sequential.as_dict()
+
+
+def test_timeline_groups_by_label_and_second(tmp_path):
+    path = tmp_path / "timeline.jtl"
+    rows = []
+    for i in range(40):
+        label = "POST Login" if i % 2 else "GET Catalogue"
+        # second 0 is healthy, second 1 has every login failing
+        ok = not (i >= 20 and label == "POST Login")
+        rows.append((1700000000000 + i * 50, 10 * (i + 1), label, ok, 0, 0))
+    write_jtl(path, rows)
+    summary = summary_jtl.summarize_paths([str(path)], jobs=1, bucket_ms=1000)
+    by_key = {(r["label"], r["timestamp_ms"]): r for r in summary.timeline.rows()}
+    assert by_key[("POST Login", 1700000000000)]["errors"] == 0
+    login = by_key[("POST Login", 1700000001000)]
+    assert (login["samples"], login["errors"], login["error_rate"]) == (10, 10, 1.0)
+    assert login["throughput"] == 10.0
+    assert login["p50"] == 300
+    total = by_key[("TOTAL", 1700000001000)]
+    assert (total["samples"], total["errors"]) == (20, 10)
+
+    per_label = summary.timeline.per_label()
+    assert list(per_label) == ["GET Catalogue", "POST Login"]
+    assert per_label["POST Login"].failures == 10
+
+    out = tmp_path / "timeline.json"
+    summary.timeline.write(str(out))
+    assert len(json.loads(out.read_text())["rows"]) == 6
+    out = tmp_path / "timeline.csv"
+    summary.timeline.write(str(out))
+    assert out.read_text().splitlines()[0].startswith("label,time,timestamp_ms,samples,throughput")
+
+
+def test_follower_consumes_only_complete_rows_and_resumes(tmp_path):
+    path = tmp_path / "live.jtl"
+    checkpoint = str(tmp_path / "live.follow.json")
+    line = "{ts},{elapsed},GET Menu,200,OK,Users 1-1,text,true,,1,1,1,1,http://localhost/,1,0,0\n"
+    path.write_text(HEADER[:40])  # header still being written
+
+    follower = summary_jtl.JtlFollower(str(path), window_s=2, checkpoint=checkpoint)
+    assert follower.poll() == 0
+    with open(path, "a") as f:
+        f.write(HEADER[40:] + line.format(ts=1000, elapsed=5) + line.format(ts=2000, elapsed=7)[:12])
+    assert follower.poll() == 1
+    with open(path, "a") as f:
+        f.write(line.format(ts=2000, elapsed=7)[12:])
+        for i in range(3, 6):
+            f.write(line.format(ts=i * 1000, elapsed=i))
+    assert follower.poll() == 4
+    assert follower.summary.total == 5
+    # only the buckets within 2s of the newest sample (5000) remain
+    window = follower.window_stats()["TOTAL"]
+    assert window.count == 2
+    follower.save_checkpoint()
+
+    with open(path, "a") as f:
+        f.write(line.format(ts=6000, elapsed=9))
+    resumed = summary_jtl.JtlFollower(str(path), checkpoint=checkpoint)
+    assert resumed.offset == follower.offset
+    assert resumed.poll() == 1
+    assert resumed.summary.total == 6
+    assert resumed.summary.metrics["elapsed"].max == 9
+
+
+def test_cache_answers_filters_without_the_csv(tmp_path):
+    path = tmp_path / "cached.jtl"
+    rng = random.Random(5)
+    rows = [(1700000000000 + i * 3, rng.randint(1, 900), rng.choice(["GET Menu", "POST Order", "POST Pay"]),
+             rng.random() > 0.1, 2, 1) for i in range(20000)]
+    write_jtl(path, rows)
+    with summary_jtl.JtlCache.build(str(path)) as cache:
+        assert cache.rows == 20000
+        assert len(cache.meta["blocks"]) == 3
+
+    with summary_jtl.JtlCache.open(str(path)) as cache:
+        everything = cache.query()
+        assert everything.as_dict() == summary_jtl.summarize_file(str(path)).as_dict()
+        start, end = 1700000010000, 1700000030000
+        filtered = cache.query(labels=["POST Order"], start_ms=start, end_ms=end, failures_only=True)
+    expected = [r for r in rows if r[2] == "POST Order" and start <= r[0] < end and not r[3]]
+    assert filtered.total == filtered.failures == len(expected)
+    assert filtered.metrics["elapsed"].max == max(r[1] for r in expected)
+
+    # touching the source invalidates the cache
+    with open(path, "a") as f:
+        f.write(f"1700000090000,5,GET Menu,200,OK,Users 1-1,text,true,,1,1,1,1,http://localhost/,1,0,0\n")
+    assert summary_jtl.JtlCache.open(str(path)) is None
+    with summary_jtl.JtlCache.load_or_build(str(path)) as cache:
+        assert cache.rows == 20001